@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 from .service import Service
+from .transport import Transport, RequestsTransport, LocalTransport
+from .retry import RetryPolicy, RetryStats
+from .codec import JsonCodec, get_codec
+from .batch_sizer import AdaptiveBatchSizer
+from .records import Record, make_record_type
 from .user import User
 from .group import Group
 from .object_bucket import ObjectBucket
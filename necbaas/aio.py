@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio support module.
+
+This module requires Python 3.5+ and 'aiohttp' library (pip install necbaas[async]).
+It is not imported by 'necbaas' package automatically, import it explicitly::
+
+    from necbaas.aio import AsyncService, AsyncObjectBucket
+"""
+import asyncio
+from types import FunctionType
+import aiohttp
+from .service import Service
+from .object_bucket import ObjectBucket
+from .file_bucket import FileBucket
+from .user import User
+from .group import Group
+from .apigw import Apigw
+
+
+# Service parameters of features implemented only by synchronous Service/ObjectBucket
+_UNSUPPORTED_PARAMS = ("writeCoalescing", "queryCache", "etagCache")
+
+
+def _sync_methods_unsupported(cls):
+    """
+    Class decorator of asyncio version of API classes.
+    Public methods inherited from synchronous base class and not overridden by coroutine
+    raise TypeError, instead of returning broken results.
+    """
+    sync_base = cls.__bases__[0]
+    names = set()
+    for klass in sync_base.__mro__[:-1]:  # except object
+        names.update(name for name, value in vars(klass).items()
+                     if not name.startswith("_") and isinstance(value, (staticmethod, classmethod, FunctionType)))
+    for name in names:
+        if name not in vars(cls):
+            setattr(cls, name, staticmethod(_unsupported(cls.__name__, name)))
+    return cls
+
+
+def _unsupported(class_name, name):
+    # type: (str, str) -> Callable
+    def method(*args, **kwargs):
+        raise TypeError("{}.{}() is not supported by asyncio version".format(class_name, name))
+    method.__name__ = name
+    method.__doc__ = "Not supported by asyncio version, raises TypeError."
+    return method
+
+
+class AsyncService(Service):
+    """
+    BaaS access service class for asyncio.
+
+    URL, headers and parameters are same as Service, but REST API is called by
+    coroutine with 'aiohttp' library, and the HTTP connections are shared by the session.
+
+    Examples:
+        ::
+
+            async with AsyncService(param) as service:
+                bucket = AsyncObjectBucket(service, "bucket1")
+                results = await bucket.query(where={"product_name": "orange"})
+
+    Args:
+        param (dict): Parameters, same as Service.
+            'connectionPool' parameter is applied to connector of aiohttp
+            (poolConnections * poolMaxsize: total limit, poolMaxsize: limit per host, idleTimeout: keep-alive timeout).
+        transport (AiohttpTransport): Asynchronous transport (optional).
+            If not specified, AiohttpTransport is created on first request and closed by close().
+        session (aiohttp.ClientSession): aiohttp session used by default transport (optional).
+
+    Raises:
+        ValueError: 'writeCoalescing', 'queryCache' or 'etagCache' parameter is specified (not supported)
+    """
+
+    def __init__(self, param=None, transport=None, session=None):
+        # type: (dict, AiohttpTransport, aiohttp.ClientSession) -> None
+        if transport is None and session is not None:
+            transport = AiohttpTransport(session=session)
+        super(AsyncService, self).__init__(param, transport=transport)
+
+        unsupported = [name for name in _UNSUPPORTED_PARAMS if self.param.get(name) is not None]
+        if unsupported:
+            raise ValueError("Not supported by AsyncService: {}".format(", ".join(unsupported)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def execute_rest(self, method, path, query=None, data=None, json=None, headers=None, stream=False):
+        # (str, str, dict, Any, dict, dict) -> aiohttp.ClientResponse
+        """
+        Call REST API (coroutine).
+
+        Note:
+            This is low level and internal method, so you should not use this.
+
+        Args:
+            method (str): HTTP method name
+            path (str): Path. The part after '/1/{tenantId}' of full path.
+            query (dict): Query parameters in dictionary.
+            data (data): Request body, in dict (form-encoded), bytes or file-like object.
+                This overrides 'json' argument.
+            json (dict): Request JSON in dictionary.
+            headers (dict): headers
+            stream (bool): Stream flag. If True, response body is not read,
+                and you must release the response after reading content.
+
+        Returns:
+            aiohttp.ClientResponse: Response
+        """
+        args = self._build_request_args(path, query=query, data=data, json=json, headers=headers, stream=stream)
+        return await self._do_request(method, **args)
+
+    async def _do_request(self, method, **kwargs):
+        # type: (str, **dict) -> aiohttp.ClientResponse
+        self.logger.debug("HTTP request: method=%s, url=%s", method, kwargs["url"])
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise Exception('Unsupported method: ' + method)
+
+        stream = kwargs.pop("stream", False)
+
+        policy = self.retry_policy
+        if policy is not None and not self._is_rewindable(kwargs.get("data")):
+            policy = None
+
+        body_pos = self._get_body_position(kwargs.get("data"))
+        retries = 0
+        elapsed = 0.0
+        while True:
+            try:
+                res = await self._get_transport().request(method, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = None if policy is None else policy.get_retry_delay(method, retries, elapsed, error=True)
+                if delay is None:
+                    self.retry_stats.record(retries, False)
+                    raise
+                self.logger.warning("HTTP request failed, retry after %.3f sec: %s", delay, e)
+            else:
+                status = res.status
+                if status < 400:
+                    self.logger.debug("HTTP response: status=%d", status)
+                    self.retry_stats.record(retries, True)
+                    if not stream:
+                        await res.read()  # connection is released after reading body
+                    return res
+
+                delay = None if policy is None else \
+                    policy.get_retry_delay(method, retries, elapsed, status=status,
+                                           retry_after=res.headers.get("Retry-After"))
+                body = await res.read()
+                if delay is None:
+                    self.logger.warning("HTTP request error: status=%d, body=%s", status, body)
+                    self.retry_stats.record(retries, False)
+                    res.raise_for_status()
+                self.logger.warning("HTTP request error: status=%d, retry after %.3f sec", status, delay)
+
+            await asyncio.sleep(delay)
+            elapsed += delay
+            retries += 1
+            if body_pos is not None:
+                kwargs["data"].seek(body_pos)
+
+    def _get_transport(self):
+        # type: () -> AiohttpTransport
+        if self.transport is None:
+            pool_connections, pool_maxsize, idle_timeout = self._get_pool_args()
+            self.transport = AiohttpTransport(pool_connections, pool_maxsize, idle_timeout)
+            self._own_transport = True
+        return self.transport
+
+    async def close(self):
+        # type: () -> None
+        """
+        Close transport (coroutine).
+        Transport passed by constructor is not closed.
+        """
+        if self.transport is not None and self._own_transport:
+            await self.transport.close()
+            self.transport = None
+
+
+class AiohttpTransport(object):
+    """
+    Asynchronous transport using 'aiohttp' library, used by AsyncService.
+
+    Other asynchronous transports must implement request() and close() coroutines of same signature.
+
+    Args:
+        pool_connections (int): Number of host pools (total connection limit is pool_connections * pool_maxsize)
+        pool_maxsize (int): Max number of connections per host
+        idle_timeout (float): Keep-alive timeout in seconds (None: aiohttp default)
+        session (aiohttp.ClientSession): aiohttp session (optional).
+            If not specified, session is created on first request and closed by close().
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, idle_timeout=None, session=None):
+        # type: (int, int, float, aiohttp.ClientSession) -> None
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._session = session
+        self._own_session = session is None
+
+    async def request(self, method, url, **kwargs):
+        # type: (str, str, **dict) -> aiohttp.ClientResponse
+        """
+        Send HTTP request (coroutine).
+
+        Args:
+            method (str): HTTP method name (upper case)
+            url (str): URL
+            **kwargs: Keyword arguments of 'requests' library
+                (params, headers, data, json, proxies, verify, timeout)
+
+        Returns:
+            aiohttp.ClientResponse: Response, body is not read. HTTP error status is not raised.
+        """
+        return await self._get_session().request(method, url, **self._to_aiohttp_args(url, kwargs))
+
+    @staticmethod
+    def _to_aiohttp_args(url, kwargs):
+        # type: (str, dict) -> dict
+        """
+        Convert request arguments of 'requests' library to 'aiohttp'.
+        """
+        args = {
+            "headers": kwargs["headers"]
+        }
+
+        params = kwargs.get("params")
+        if params:
+            # aiohttp accepts only str/int/float values
+            args["params"] = {k: v if isinstance(v, str) else str(v) for k, v in params.items() if v is not None}
+
+        if "data" in kwargs:
+            args["data"] = kwargs["data"]
+        elif "json" in kwargs:
+            args["json"] = kwargs["json"]
+
+        proxies = kwargs.get("proxies")
+        if proxies:
+            scheme = "https" if url.startswith("https:") else "http"
+            proxy = proxies.get(scheme)
+            if proxy is not None:
+                args["proxy"] = proxy if "://" in proxy else "http://" + proxy
+
+        if kwargs.get("verify") is False:
+            args["ssl"] = False
+
+        timeout = kwargs.get("timeout")
+        if isinstance(timeout, tuple):
+            args["timeout"] = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            args["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        return args
+
+    def _get_session(self):
+        # type: () -> aiohttp.ClientSession
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_connections * self.pool_maxsize,
+                                             limit_per_host=self.pool_maxsize,
+                                             keepalive_timeout=self.idle_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        return self._session
+
+    async def close(self):
+        # type: () -> None
+        """
+        Close session (coroutine).
+        Session passed by constructor is not closed.
+        """
+        if self._session is not None and self._own_session:
+            await self._session.close()
+        self._session = None
+
+
+async def _read_json(service, r):
+    # type: (AsyncService, aiohttp.ClientResponse) -> Any
+    return service.json_codec.loads(await r.read())
+
+
+@_sync_methods_unsupported
+class AsyncObjectBucket(ObjectBucket):
+    """
+    JSON Object Storage Bucket for asyncio.
+    Methods are coroutine version of ObjectBucket.
+    Other methods of ObjectBucket (ex. update, remove, count, bulk_insert) are not supported, and raise TypeError.
+
+    Args:
+        service (AsyncService): Service
+        bucket_name (str): Bucket name
+    """
+
+    async def query(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False):
+        # type: (dict, str, int, int, dict, bool) -> list
+        """
+        Query objects in this bucket (coroutine). See ObjectBucket.query().
+        """
+        res = await self._query(where=where, order=order, skip=skip, limit=limit, projection=projection,
+                                delete_mark=delete_mark)
+        return res["results"]
+
+    async def query_with_count(self, where=None, order=None, skip=0, limit=None, projection=None,
+                               delete_mark=False):
+        # type: (dict, str, int, int, dict, bool) -> (list, int)
+        """
+        Query objects in this bucket with count query (coroutine). See ObjectBucket.query_with_count().
+        """
+        res = await self._query(where=where, order=order, skip=skip, limit=limit, projection=projection,
+                                delete_mark=delete_mark, count=True)
+        return res["results"], res["count"]
+
+    async def _query(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False,
+                     count=False):
+        method, path, kwargs = self._query_request(where=where, order=order, skip=skip, limit=limit,
+                                                   projection=projection, delete_mark=delete_mark, count=count)
+        r = await self.service.execute_rest(method, path, **kwargs)
+        return await _read_json(self.service, r)
+
+    async def insert(self, data):
+        # type: (dict) -> dict
+        """
+        Insert JSON Object (coroutine). See ObjectBucket.insert().
+        """
+        r = await self.service.execute_rest("POST", "/objects/{}".format(self.bucket_name), json=data)
+        return await _read_json(self.service, r)
+
+    async def batch(self, requests, soft_delete=False):
+        # type: (list, bool) -> list
+        """
+        Batch operation (coroutine). See ObjectBucket.batch().
+        """
+        query = {"deleteMark": 1 if soft_delete else 0}
+        body_json = {
+            "requests": requests
+        }
+        r = await self.service.execute_rest("POST", "/objects/{}/_batch".format(self.bucket_name),
+                                            json=body_json, query=query)
+        res = await _read_json(self.service, r)
+        return res["results"]
+
+    async def aggregate(self, pipeline, options=None):
+        # type: (list, dict) -> list
+        """
+        Aggregation operation (coroutine). See ObjectBucket.aggregate().
+        """
+        body = {"pipeline": pipeline}
+        if options is not None:
+            body["options"] = options
+
+        r = await self.service.execute_rest("POST", "/objects/{}/_aggregate".format(self.bucket_name), json=body)
+        res = await _read_json(self.service, r)
+        return res["results"]
+
+
+@_sync_methods_unsupported
+class AsyncFileBucket(FileBucket):
+    """
+    File Bucket for asyncio.
+    Methods are coroutine version of FileBucket.
+    Other methods of FileBucket are not supported, and raise TypeError.
+
+    Args:
+        service (AsyncService): Service
+        bucket_name (str): Bucket name
+    """
+
+    async def create(self, filename, data, content_type="application/octet-stream", acl=None):
+        # type: (str, any, str, dict) -> dict
+        """
+        Upload and create new file (coroutine). See FileBucket.create().
+        """
+        headers = self._get_upload_headers(content_type, acl)
+        r = await self.service.execute_rest("POST", self._get_file_path(filename), data=data, headers=headers)
+        return await _read_json(self.service, r)
+
+    async def download(self, filename, stream=False):
+        # type: (str, bool) -> aiohttp.ClientResponse
+        """
+        Download file (coroutine).
+
+        Example:
+            ::
+
+                r = await bucket.download("file1.json")
+                binary = await r.read()
+
+                r = await bucket.download("file2.zip", stream=True)
+                async with r:
+                    async for chunk in r.content.iter_chunked(65536):
+                        # Do things with the chunk here
+
+        Args:
+            filename (str): Filename
+            stream (bool): Stream flag (optional, default=False)
+
+        Returns:
+            aiohttp.ClientResponse: Response (aiohttp library)
+        """
+        return await self.service.execute_rest("GET", self._get_file_path(filename), stream=stream)
+
+
+@_sync_methods_unsupported
+class AsyncUser(User):
+    """
+    User for asyncio.
+    Only login() is supported, other methods of User raise TypeError.
+    """
+
+    @staticmethod
+    async def login(service, username=None, email=None, password=None, params=None):
+        # type: (AsyncService, str, str, str, dict) -> dict
+        """
+        Login (coroutine). See User.login().
+        """
+        params = User._get_login_params(username, email, password, params)
+
+        r = await service.execute_rest("POST", "/login", json=params)
+        res = await _read_json(service, r)
+
+        service.session_token = res["sessionToken"]
+        service.session_token_expire = res["expire"]
+        return res
+
+
+@_sync_methods_unsupported
+class AsyncGroup(Group):
+    """
+    Group for asyncio.
+    Methods are coroutine version of Group.
+    Other methods of Group are not supported, and raise TypeError.
+
+    Args:
+        service (AsyncService): Service
+        group_name (str): Group name
+    """
+
+    @staticmethod
+    async def query(service):
+        # type: (AsyncService) -> list
+        """
+        Query groups (coroutine). See Group.query().
+        """
+        r = await service.execute_rest("GET", "/groups")
+        res = await _read_json(service, r)
+        return res["results"]
+
+    async def get(self):
+        # type: () -> dict
+        """
+        Query group (coroutine). See Group.get().
+        """
+        r = await self.service.execute_rest("GET", "/groups/{}".format(self.group_name))
+        return await _read_json(self.service, r)
+
+
+@_sync_methods_unsupported
+class AsyncApigw(Apigw):
+    """
+    API Gateway instance for asyncio.
+    """
+
+    async def execute(self, data=None, json=None, query=None, headers=None):
+        # type: (any, dict, dict, dict) -> aiohttp.ClientResponse
+        """
+        Execute API Gateway (coroutine).
+        Return value is 'ClientResponse' object of 'aiohttp' library, body is already read.
+
+        Example:
+            ::
+
+                res = await api.execute(json={"temperature": 26.3})
+                status = res.status  # get status code
+                json = await res.json()  # response body of JSON as dict
+
+        Args:
+            See Apigw.execute().
+
+        Returns:
+            aiohttp.ClientResponse: Response of 'aiohttp' library.
+        """
+        return await self.service.execute_rest(self.method, self._get_path(), query=query, data=data, json=json,
+                                               headers=headers)
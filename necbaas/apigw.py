@@ -61,7 +61,12 @@ class Apigw(object):
         Returns:
             Response: Response of 'requests' library.
         """
+        return self.service.execute_rest(self.method, self._get_path(), query=query, data=data, json=json,
+                                         headers=headers)
+
+    def _get_path(self):
+        # type: () -> str
         path = "api/" + self.apiname
         if self.subpath is not None:
             path = path + "/" + self.subpath
-        return self.service.execute_rest(self.method, path, query=query, data=data, json=json, headers=headers)
+        return path
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive batch sizing module
+"""
+import threading
+import time
+
+
+class AdaptiveBatchSizer(object):
+    """
+    Adaptive batch size controller for bulk operations (ex. ObjectBucket.bulk_insert()).
+
+    Batch size is adjusted from measured latency and throughput of each batch request:
+
+    - If latency exceeds target_latency, batch size is decreased by shrink_factor.
+    - Otherwise batch size is increased by growth_factor, while throughput (docs/sec) improves.
+      If throughput drops after growing, batch size is reverted.
+
+    Batch size is also limited by max_bytes, using observed average serialized size of documents.
+
+    docs_per_sec is wall-clock throughput since the first request started, which includes
+    all concurrent requests. request_docs_per_sec is throughput of each request, it is lower
+    than docs_per_sec if requests are sent in parallel.
+
+    Examples:
+        ::
+
+            sizer = necbaas.AdaptiveBatchSizer(initial_size=100, max_size=1000, target_latency=2.0)
+            bucket.bulk_insert(objects, sizer=sizer)
+            print(sizer.to_dict())
+
+    Args:
+        initial_size (int): Initial batch size (default: 100)
+        min_size (int): Min batch size (default: 10)
+        max_size (int): Max batch size (default: 1000)
+        max_bytes (int): Max serialized size of one batch request (default: 1MB)
+        target_latency (float): Target max latency of one batch request in seconds (default: 1.0)
+        growth_factor (float): Multiplier to increase batch size (default: 1.5)
+        shrink_factor (float): Multiplier to decrease batch size (default: 0.5)
+        smoothing (float): Weight of new sample of exponential moving average (default: 0.3)
+
+    Attributes:
+        batch_size (int): Current batch size
+        docs_per_sec (float): Wall-clock throughput of all requests (documents / sec)
+        request_docs_per_sec (float): Moving average of throughput of each request (documents / sec)
+        avg_latency (float): Moving average of latency (sec)
+        avg_doc_bytes (float): Moving average of serialized size of document (bytes)
+        batches (int): Number of batches recorded
+        docs (int): Number of documents recorded
+    """
+
+    def __init__(self, initial_size=100, min_size=10, max_size=1000, max_bytes=1024 * 1024, target_latency=1.0,
+                 growth_factor=1.5, shrink_factor=0.5, smoothing=0.3):
+        # type: (int, int, int, int, float, float, float, float) -> None
+        if not 0 < min_size <= initial_size <= max_size:
+            raise ValueError("Bad batch size limits")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.growth_factor = growth_factor
+        self.shrink_factor = shrink_factor
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self.batch_size = initial_size
+        self.docs_per_sec = None
+        self.request_docs_per_sec = None
+        self.avg_latency = None
+        self.avg_doc_bytes = None
+        self.batches = 0
+        self.docs = 0
+        self._prev_size = None
+        self._prev_rate = None
+        self._start = None
+
+    def record(self, count, latency, nbytes=None):
+        # type: (int, float, int) -> int
+        """
+        Record result of a batch request, and adjust batch size.
+
+        Args:
+            count (int): Number of documents in the batch
+            latency (float): Latency of the batch request in seconds
+            nbytes (int): Serialized size of the batch (optional)
+
+        Returns:
+            int: New batch size
+        """
+        if count <= 0:
+            return self.batch_size
+        latency = max(latency, 1e-6)
+        rate = count / latency
+        now = time.time()
+
+        with self._lock:
+            self.batches += 1
+            self.docs += count
+            if self._start is None or now - latency < self._start:
+                self._start = now - latency
+            self.docs_per_sec = self.docs / max(now - self._start, 1e-6)
+            self.request_docs_per_sec = self._average(self.request_docs_per_sec, rate)
+            self.avg_latency = self._average(self.avg_latency, latency)
+            if nbytes is not None:
+                self.avg_doc_bytes = self._average(self.avg_doc_bytes, float(nbytes) / count)
+
+            size = self.batch_size
+            if latency > self.target_latency:
+                size = int(size * self.shrink_factor)
+                self._prev_size = None
+            elif count >= self.batch_size:
+                # grow only when the batch was full, short batch (end of data) says nothing
+                if self._prev_size is not None and rate < self._prev_rate * 0.9:
+                    size = self._prev_size  # growing made it worse, revert
+                    self._prev_size = None
+                else:
+                    self._prev_size = size
+                    self._prev_rate = rate
+                    size = int(size * self.growth_factor) + 1
+
+            self.batch_size = self._clamp(size)
+            return self.batch_size
+
+    def _average(self, current, value):
+        # type: (float, float) -> float
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+    def _clamp(self, size):
+        # type: (int) -> int
+        if self.max_bytes is not None and self.avg_doc_bytes:
+            size = min(size, int(self.max_bytes / self.avg_doc_bytes))
+        return max(self.min_size, min(self.max_size, size))
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Get status as dict.
+
+        Returns:
+            dict: Status
+        """
+        with self._lock:
+            return {
+                "batchSize": self.batch_size,
+                "docsPerSec": self.docs_per_sec,
+                "requestDocsPerSec": self.request_docs_per_sec,
+                "avgLatency": self.avg_latency,
+                "avgDocBytes": self.avg_doc_bytes,
+                "batches": self.batches,
+                "docs": self.docs
+            }
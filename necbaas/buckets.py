@@ -52,7 +52,7 @@ class Buckets(object):
             body["noAcl"] = no_acl
 
         r = self.service.execute_rest("PUT", "buckets/{}/{}".format(self.bucket_type, name), json=body)
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     def query(self):
         # type: () -> list
@@ -64,7 +64,7 @@ class Buckets(object):
 
         """
         r = self.service.execute_rest("GET", "buckets/{}".format(self.bucket_type))
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res["results"]
 
     def get(self, name):
@@ -79,7 +79,7 @@ class Buckets(object):
             dict: Bucket info
         """
         r = self.service.execute_rest("GET", "buckets/{}/{}".format(self.bucket_type, name))
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     def remove(self, name):
         # type: (str) -> dict
@@ -93,4 +93,4 @@ class Buckets(object):
             dict: Bucket info
         """
         r = self.service.execute_rest("DELETE", "buckets/{}/{}".format(self.bucket_type, name))
-        return r.json()
+        return self.service.json_codec.loads(r.content)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered writer module
+"""
+import atexit
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+_CLOSE = object()
+
+
+class _Op(object):
+    """Queued operation."""
+
+    __slots__ = ("request", "size", "future")
+
+    def __init__(self, request, size):
+        # type: (dict, int) -> None
+        self.request = request
+        self.size = size
+        self.future = Future()
+
+
+class BufferedWriter(object):
+    """
+    Write-behind buffer of ObjectBucket.
+
+    Insert, update and remove operations are queued, and sent as batch requests
+    from background thread. A batch is sent when max_docs or max_bytes is reached,
+    or max_delay seconds have passed since the first operation of the batch is queued.
+
+    Each operation returns concurrent.futures.Future, which is resolved with the batch result
+    of the operation (dict, check 'result' field), or the exception if the batch request failed.
+    Use Future.add_done_callback() to get result by callback.
+
+    If the queue is full, operations block until the queue has room (backpressure).
+    Queued operations are flushed on close(), and on interpreter exit.
+
+    Examples:
+        ::
+
+            with bucket.buffered_writer(max_docs=500, max_delay=0.5) as writer:
+                for event in events:
+                    writer.insert(event)
+
+    Args:
+        bucket (ObjectBucket): Bucket
+        max_docs (int): Max number of operations in one batch request (default: 500)
+        max_bytes (int): Max serialized size of one batch request (default: 1MB)
+        max_delay (float): Max delay in seconds before sending queued operations (default: 1.0)
+        max_queue (int): Max number of queued operations (default: 10000)
+        soft_delete (bool): Soft delete on remove (default: False)
+
+    Attributes:
+        batches (int): Number of batch requests sent
+        ops (int): Number of operations sent
+        errors (int): Number of failed batch requests
+    """
+
+    def __init__(self, bucket, max_docs=500, max_bytes=1024 * 1024, max_delay=1.0, max_queue=10000,
+                 soft_delete=False):
+        # type: (ObjectBucket, int, int, float, int, bool) -> None
+        if max_docs <= 0 or max_queue <= 0:
+            raise ValueError("Bad max_docs or max_queue")
+        self.bucket = bucket
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.soft_delete = soft_delete
+        self.batches = 0
+        self.ops = 0
+        self.errors = 0
+
+        self._queue = queue.Queue(max_queue)
+        self._pending = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="necbaas-buffered-writer")
+        self._thread.daemon = True
+        self._thread.start()
+        _writers.add(self)
+
+    def insert(self, data, timeout=None):
+        # type: (dict, float) -> Future
+        """
+        Queue insert operation.
+
+        Args:
+            data (dict): Data (JSON)
+            timeout (float): Max time to wait for queue space in seconds (optional, default: no limit)
+
+        Returns:
+            Future: Future of batch result
+
+        Raises:
+            queue.Full: Queue is full after timeout
+        """
+        return self._put({"op": "insert", "data": data}, timeout)
+
+    def update(self, oid, data, etag=None, timeout=None):
+        # type: (str, dict, str, float) -> Future
+        """
+        Queue update operation.
+
+        Args:
+            oid (str): Object ID
+            data (dict): Data (JSON)
+            etag (str): ETag (optional)
+            timeout (float): Max time to wait for queue space in seconds (optional, default: no limit)
+
+        Returns:
+            Future: Future of batch result
+        """
+        request = {"op": "update", "_id": oid, "data": data}
+        if etag is not None:
+            request["etag"] = etag
+        return self._put(request, timeout)
+
+    def remove(self, oid, etag=None, timeout=None):
+        # type: (str, str, float) -> Future
+        """
+        Queue remove operation.
+
+        Args:
+            oid (str): Object ID
+            etag (str): ETag (optional)
+            timeout (float): Max time to wait for queue space in seconds (optional, default: no limit)
+
+        Returns:
+            Future: Future of batch result
+        """
+        if not oid:  # fail-safe, same as ObjectBucket.remove()
+            raise ValueError("No oid")
+        request = {"op": "delete", "_id": oid}
+        if etag is not None:
+            request["etag"] = etag
+        return self._put(request, timeout)
+
+    def flush(self, timeout=None):
+        # type: (float) -> None
+        """
+        Send all queued operations, and wait for completion.
+
+        Args:
+            timeout (float): Max time to wait in seconds (optional, default: no limit)
+        """
+        marker = Future()
+        if not self._enqueue(marker, timeout):
+            return
+        marker.result(timeout)
+
+    def close(self):
+        # type: () -> None
+        """
+        Send all queued operations and stop background thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._thread.join()
+        _writers.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _put(self, request, timeout):
+        # type: (dict, float) -> Future
+        op = _Op(request, len(self.bucket.service.json_codec.dumps(request)))
+        if not self._enqueue(op, timeout):
+            raise ValueError("Writer is closed")
+        return op.future
+
+    def _enqueue(self, item, timeout):
+        # type: (Any, float) -> bool
+        """
+        Put item to queue unless closed. Returns False if closed.
+        Checked under the lock with close(), so that no item is queued after the close sentinel.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            self._queue.put(item, timeout=timeout)
+            return True
+
+    def _run(self):
+        # type: () -> None
+        closing = False
+        while not closing:
+            batch = []
+            markers = []
+            closing = self._collect(batch, markers)
+            if batch:
+                self._send(batch)
+            for marker in markers:
+                marker.set_result(None)
+
+    def _collect(self, batch, markers):
+        # type: (list, list) -> bool
+        """
+        Collect operations of next batch. Returns True if the writer is closing.
+        """
+        nbytes = 0
+        deadline = None
+        while True:
+            if self._pending is not None:
+                item, self._pending = self._pending, None
+            elif deadline is None:
+                item = self._queue.get()
+            else:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    return False
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    return False
+
+            if item is _CLOSE:
+                return True
+            if isinstance(item, Future):  # flush marker
+                markers.append(item)
+                return False
+
+            if batch and self.max_bytes is not None and nbytes + item.size > self.max_bytes:
+                self._pending = item  # send in next batch
+                return False
+            batch.append(item)
+            nbytes += item.size
+            if deadline is None:
+                deadline = time.time() + self.max_delay
+            if len(batch) >= self.max_docs:
+                return False
+
+    def _send(self, batch):
+        # type: (list) -> None
+        try:
+            results = self.bucket.batch([op.request for op in batch], soft_delete=self.soft_delete)
+        except Exception as e:
+            self.errors += 1
+            self.bucket.service.logger.warning("Buffered write failed: %s", e)
+            for op in batch:
+                op.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.ops += len(batch)
+        for op, result in zip(batch, results):
+            op.future.set_result(result)
+        for op in batch[len(results):]:
+            op.future.set_exception(ValueError("No batch result"))
+
+
+_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_all():
+    for writer in list(_writers):
+        writer.close()
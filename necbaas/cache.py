@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Cache module
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    Thread-safe LRU cache with expiration time (TTL) of entries.
+
+    Number of entries and total size of entries (given by put()) are bounded,
+    least recently used entries are evicted.
+
+    Examples:
+        ::
+
+            cache = TTLCache(ttl=10.0, max_entries=1000)
+            cache.put("key", value)
+            value = cache.get("key")  # None if expired
+
+    Args:
+        ttl (float): Default time to live of entries in seconds (default: 60.0)
+        max_entries (int): Max number of entries (default: 1000)
+        max_bytes (int): Max total size of entries in bytes (default: unlimited)
+
+    Attributes:
+        ttl (float): Default time to live of entries in seconds
+        max_entries (int): Max number of entries
+        max_bytes (int): Max total size of entries in bytes
+        hits (int): Number of cache hits
+        misses (int): Number of cache misses (including expired entries)
+        evictions (int): Number of entries evicted by max_entries or max_bytes
+    """
+
+    def __init__(self, ttl=60.0, max_entries=1000, max_bytes=None):
+        # type: (float, int, int) -> None
+        if max_entries <= 0:
+            raise ValueError("Bad max_entries")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()  # key -> (expire time, value, size), in LRU order
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        # type: (Hashable, Any) -> Any
+        """
+        Get value of entry.
+
+        Args:
+            key (Hashable): Key
+            default (Any): Value returned if the entry does not exist or expired (default: None)
+
+        Returns:
+            Any: Value
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._bytes -= entry[2]
+                self.misses += 1
+                return default
+            self._entries[key] = entry  # most recently used
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl=None, size=0):
+        # type: (Hashable, Any, float, int) -> None
+        """
+        Put entry.
+
+        Args:
+            key (Hashable): Key
+            value (Any): Value
+            ttl (float): Time to live in seconds (optional, default: ttl of this cache)
+            size (int): Size of the value in bytes, for max_bytes (optional, default=0)
+        """
+        with self._lock:
+            self._put(key, value, ttl, size)
+
+    def _put(self, key, value, ttl, size):
+        # type: (Hashable, Any, float, int) -> None
+        """Put entry, with lock held (internal)."""
+        self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or \
+                (self.max_bytes is not None and self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[2]
+            self.evictions += 1
+
+    def _remove(self, key):
+        # type: (Hashable) -> None
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate(self, predicate=None):
+        # type: (Callable) -> int
+        """
+        Remove entries.
+
+        Args:
+            predicate (Callable): Function to select keys to remove (optional, default: all entries)
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            if predicate is None:
+                count = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return count
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Get statistics as dict, for metrics.
+
+        Returns:
+            dict: Statistics
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": float(self.hits) / requests if requests > 0 else None
+            }
+
+
+class QueryCache(TTLCache):
+    """
+    Cache of ObjectBucket query responses, enabled by 'queryCache' service parameter.
+
+    Entries are keyed by bucket name and normalized query parameters, and invalidated
+    when objects of the bucket are written by ObjectBucket of the same service.
+    Changes by other clients are not reflected until entries expire.
+
+    Args:
+        ttl (float): Time to live of entries in seconds (default: 60.0)
+        max_entries (int): Max number of entries (default: 1000)
+        max_bytes (int): Max total size of cached response bodies in bytes (default: 16MB)
+    """
+
+    def __init__(self, ttl=60.0, max_entries=1000, max_bytes=16 * 1024 * 1024):
+        # type: (float, int, int) -> None
+        super(QueryCache, self).__init__(ttl, max_entries, max_bytes)
+        self._generations = {}
+
+    @staticmethod
+    def from_config(config):
+        # type: (dict) -> QueryCache
+        """
+        Create query cache from 'queryCache' service parameter.
+
+        Args:
+            config (dict): Cache parameters, must have following dict format (all optional)::
+
+                ttl: Time to live of entries in seconds
+                maxEntries: Max number of entries
+                maxBytes: Max total size of cached response bodies in bytes
+
+        Returns:
+            QueryCache: Query cache
+        """
+        keys = {
+            "ttl": "ttl",
+            "maxEntries": "max_entries",
+            "maxBytes": "max_bytes"
+        }
+        return QueryCache(**{keys[k]: v for k, v in config.items() if k in keys})
+
+    def generation(self, bucket_name):
+        # type: (str) -> int
+        """
+        Get write generation of the bucket. Get this before query, and pass to put_query().
+
+        Args:
+            bucket_name (str): Bucket name
+
+        Returns:
+            int: Generation
+        """
+        with self._lock:
+            return self._generations.get(bucket_name, 0)
+
+    def put_query(self, bucket_name, generation, key, value, size):
+        # type: (str, int, Hashable, Any, int) -> None
+        """
+        Put query response, if the bucket is not written since generation() is called.
+
+        Args:
+            bucket_name (str): Bucket name
+            generation (int): Generation before the query
+            key (Hashable): Key, first item must be bucket name
+            value (Any): Value
+            size (int): Size of the value in bytes
+        """
+        with self._lock:
+            if self._generations.get(bucket_name, 0) == generation:
+                self._put(key, value, None, size)
+
+    def invalidate_bucket(self, bucket_name):
+        # type: (str) -> int
+        """
+        Remove entries of the bucket, and update write generation.
+
+        Args:
+            bucket_name (str): Bucket name
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            self._generations[bucket_name] = self._generations.get(bucket_name, 0) + 1
+        return self.invalidate(lambda key: key[0] == bucket_name)
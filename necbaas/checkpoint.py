@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoint file module
+"""
+import json
+import os
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def load_checkpoint(path):
+    # type: (str) -> dict
+    """
+    Load checkpoint file.
+
+    Args:
+        path (str): Checkpoint file path
+
+    Returns:
+        dict: Checkpoint data, or None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, data):
+    # type: (str, dict) -> None
+    """
+    Save checkpoint file atomically (write temporary file and rename).
+
+    Args:
+        path (str): Checkpoint file path
+        data (dict): Checkpoint data (JSON)
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    _replace(tmp_path, path)
+
+
+def remove_checkpoint(path):
+    # type: (str) -> None
+    """
+    Remove checkpoint file if exists.
+
+    Args:
+        path (str): Checkpoint file path
+    """
+    if os.path.exists(path):
+        os.remove(path)
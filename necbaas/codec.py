@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+JSON codec module
+"""
+import json
+
+
+class JsonCodec(object):
+    """
+    JSON encoder/decoder used by Service and buckets.
+    Default implementation uses 'json' standard library.
+
+    To use another JSON library, subclass this and override dumps(), dumps_bytes() and loads(),
+    or use one of the bundled codecs via get_codec().
+
+    Examples:
+        ::
+
+            service.json_codec = necbaas.get_codec("orjson")
+    """
+
+    name = "json"
+    # type: str
+
+    def dumps(self, obj):
+        # type: (Any) -> str
+        """
+        Encode object to JSON string.
+
+        Args:
+            obj (Any): Object
+
+        Returns:
+            str: JSON string
+        """
+        return json.dumps(obj)
+
+    def dumps_bytes(self, obj):
+        # type: (Any) -> bytes
+        """
+        Encode object to UTF-8 JSON bytes, for request body.
+
+        Args:
+            obj (Any): Object
+
+        Returns:
+            bytes: JSON bytes
+        """
+        return self.dumps(obj).encode("utf-8")
+
+    def loads(self, s):
+        # type: (bytes or str) -> Any
+        """
+        Decode JSON.
+
+        Args:
+            s (bytes or str): JSON in bytes (UTF-8) or str
+
+        Returns:
+            Any: Decoded object
+        """
+        if isinstance(s, bytes):
+            s = s.decode("utf-8")
+        return json.loads(s)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON codec using 'orjson' library.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        # type: () -> None
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj).decode("utf-8")
+
+    def dumps_bytes(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, s):
+        return self._orjson.loads(s)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    JSON codec using 'ujson' library.
+    """
+
+    name = "ujson"
+
+    def __init__(self):
+        # type: () -> None
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False)
+
+    def loads(self, s):
+        return self._ujson.loads(s)
+
+
+_CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    UjsonCodec.name: UjsonCodec
+}
+
+
+def get_codec(name):
+    # type: (str) -> JsonCodec
+    """
+    Get bundled JSON codec by name.
+
+    Args:
+        name (str): Codec name, "json", "orjson" or "ujson"
+
+    Returns:
+        JsonCodec: JSON codec
+
+    Raises:
+        ValueError: Unknown codec name
+        ImportError: Library is not installed
+    """
+    if name not in _CODECS:
+        raise ValueError("Unknown JSON codec: " + name)
+    return _CODECS[name]()
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar result module
+"""
+from array import array
+
+_bool_type = bool
+_int_types = (int,) if str is not bytes else (int, long)  # noqa: F821
+_str_types = (str,) if str is not bytes else (str, unicode)  # noqa: F821
+
+
+def _int_typecode():
+    # type: () -> str
+    """Get 64bit int typecode of array. 'q' is not available on Python 2, fall back to 'l' or list."""
+    for typecode in ("q", "l"):
+        try:
+            if array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            pass
+    return None
+
+
+# dtype name -> array typecode (None: stored in list)
+_TYPECODES = {
+    "int": _int_typecode(),
+    "float": "d",
+    "bool": "b",
+    "str": None,
+    "object": None
+}
+
+_NUMPY_DTYPES = {
+    "int": "int64",
+    "float": "float64",
+    "bool": "bool",
+    "str": "object",
+    "object": "object"
+}
+
+_MISSING = object()
+
+
+def _infer_dtype(value):
+    # type: (Any) -> str
+    if isinstance(value, _bool_type):
+        return "bool"
+    if isinstance(value, _int_types):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, _str_types):
+        return "str"
+    return "object"
+
+
+class _Column(object):
+    """Column storage. Numeric values are stored in array.array, others in list."""
+
+    __slots__ = ("dtype", "fixed", "values", "pending")
+
+    def __init__(self, dtype):
+        # type: (str) -> None
+        self.fixed = dtype is not None
+        self.dtype = dtype
+        self.values = None if dtype is None else self._new_values(dtype)
+        self.pending = 0  # number of missing values before dtype is inferred
+
+    @staticmethod
+    def _new_values(dtype):
+        # type: (str) -> Any
+        typecode = _TYPECODES[dtype]
+        return array(typecode) if typecode is not None else []
+
+    def append(self, value):
+        # type: (Any) -> None
+        if self.dtype is None:
+            if value is _MISSING or value is None:
+                self.pending += 1
+                return
+            self.dtype = _infer_dtype(value)
+            self.values = self._new_values(self.dtype)
+            for _ in range(self.pending):
+                self._append_missing()
+            self.pending = 0
+
+        if value is _MISSING or value is None:
+            self._append_missing()
+            return
+
+        dtype = self.dtype
+        if dtype == "int" and isinstance(value, _int_types) and not isinstance(value, _bool_type):
+            self.values.append(value)
+        elif dtype == "float" and isinstance(value, (float,) + _int_types) and not isinstance(value, _bool_type):
+            self.values.append(value)
+        elif dtype == "bool" and isinstance(value, _bool_type):
+            self.values.append(value)
+        elif dtype in ("str", "object") and (dtype == "object" or isinstance(value, _str_types)):
+            self.values.append(value)
+        elif self.fixed:
+            raise ValueError("Bad value for {} column: {!r}".format(dtype, value))
+        else:
+            # inferred dtype does not fit, promote
+            if dtype == "int" and isinstance(value, float):
+                self._convert("float")
+            else:
+                self._convert("object")
+            self.append(value)
+
+    def _append_missing(self):
+        # type: () -> None
+        if self.dtype == "float":
+            self.values.append(float("nan"))
+        elif self.dtype in ("str", "object"):
+            self.values.append(None)
+        elif self.fixed:
+            raise ValueError("Missing value for {} column".format(self.dtype))
+        else:
+            # int/bool can't represent missing value
+            self._convert("float" if self.dtype == "int" else "object")
+            self._append_missing()
+
+    def _convert(self, dtype):
+        # type: (str) -> None
+        old = self.values
+        if self.dtype == "bool":
+            old = [bool(v) for v in old]
+        values = self._new_values(dtype)
+        values.extend(list(old))
+        self.values = values
+        self.dtype = dtype
+
+    def finish(self):
+        # type: () -> Any
+        if self.dtype is None:
+            # no values at all
+            self.dtype = "object"
+            self.values = [None] * self.pending
+            self.pending = 0
+        return self.values
+
+
+class ColumnBuilder(object):
+    """
+    Builder of columnar arrays from JSON objects.
+
+    Numeric and boolean columns are stored in array.array (int: 'q', float: 'd', bool: 'b'),
+    which is much smaller than list of dict. String and other columns are stored in list.
+
+    If dtype of a field is not specified, it is inferred from values:
+    int column is promoted to float if it has float or missing values, and
+    other mismatched columns are promoted to object. Missing value is NaN for float, None for str and object.
+
+    Examples:
+        ::
+
+            builder = ColumnBuilder(["name", "score"], {"score": "float"})
+            for obj in objects:
+                builder.append(obj)
+            columns = builder.to_dict()
+
+    Args:
+        fields (list): List of field names. Dotted name (ex. "a.b") can be used for nested field.
+        dtypes (dict): dtype of fields, "int", "float", "bool", "str" or "object" (optional, default: inferred)
+
+    Attributes:
+        fields (list): List of field names
+        count (int): Number of rows
+    """
+
+    def __init__(self, fields, dtypes=None):
+        # type: (list, dict) -> None
+        dtypes = dtypes or {}
+        for field, dtype in dtypes.items():
+            if dtype not in _TYPECODES:
+                raise ValueError("Unknown dtype: {}".format(dtype))
+        self.fields = list(fields)
+        self.count = 0
+        self._columns = [_Column(dtypes.get(field)) for field in self.fields]
+        self._paths = [field.split(".") for field in self.fields]
+
+    def append(self, obj):
+        # type: (dict) -> None
+        """
+        Append row.
+
+        Args:
+            obj (dict): JSON object
+        """
+        for column, path in zip(self._columns, self._paths):
+            value = obj
+            for key in path:
+                if isinstance(value, dict) and key in value:
+                    value = value[key]
+                else:
+                    value = _MISSING
+                    break
+            column.append(value)
+        self.count += 1
+
+    def extend(self, objects):
+        # type: (Iterable[dict]) -> None
+        """
+        Append rows.
+
+        Args:
+            objects (Iterable[dict]): JSON objects
+        """
+        for obj in objects:
+            self.append(obj)
+
+    @property
+    def dtypes(self):
+        # type: () -> dict
+        """
+        dtype of fields (None if not inferred yet).
+        """
+        return {field: column.dtype for field, column in zip(self.fields, self._columns)}
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Get columns.
+
+        Returns:
+            dict: Dict of field name and column (array.array or list)
+        """
+        return {field: column.finish() for field, column in zip(self.fields, self._columns)}
+
+    def to_numpy(self):
+        # type: () -> dict
+        """
+        Get columns as NumPy arrays. Numeric columns are converted without copy.
+        Requires 'numpy' library.
+
+        Returns:
+            dict: Dict of field name and numpy.ndarray
+        """
+        import numpy
+        result = {}
+        for field, column in zip(self.fields, self._columns):
+            values = column.finish()
+            dtype = _NUMPY_DTYPES[column.dtype]
+            if isinstance(values, array):
+                result[field] = numpy.frombuffer(values, dtype="int8" if dtype == "bool" else dtype)
+                if dtype == "bool":
+                    result[field] = result[field].view("bool")
+            elif dtype != "object":
+                result[field] = numpy.array(values, dtype=dtype)
+            else:
+                arr = numpy.empty(len(values), dtype="object")
+                arr[:] = values
+                result[field] = arr
+        return result
+
+    def to_dataframe(self):
+        # type: () -> pandas.DataFrame
+        """
+        Get columns as pandas DataFrame. Requires 'pandas' library.
+
+        Returns:
+            pandas.DataFrame: DataFrame, columns are in order of fields
+        """
+        import pandas
+        return pandas.DataFrame(self.to_numpy(), columns=self.fields)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+ETag revalidation cache module
+"""
+import re
+import threading
+import time
+from .cache import TTLCache
+from .transport import Transport, make_response
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+# Metadata endpoints cached by default (FileBucket.query/get_metadata, Group.get, Buckets.get, User.get).
+# File bodies (FileBucket.download) are not cached.
+DEFAULT_POLICIES = {
+    "/files/": {"match": r"^/files/[^/]+(/.+/meta)?$"},
+    "/groups/": {},
+    "/buckets/": {},
+    "/users/": {}
+}
+# type: dict
+
+# Request headers which change the response (ACL)
+_VARY_HEADERS = ("X-Application-Id", "X-Session-Token")
+
+# Response headers not valid for decoded body
+_BODY_HEADERS = ("content-length", "content-encoding", "transfer-encoding")
+
+
+class _Entry(object):
+    """Cached response."""
+
+    __slots__ = ("etag", "headers", "content", "validated")
+
+    def __init__(self, etag, headers, content, validated):
+        # type: (str, dict, bytes, float) -> None
+        self.etag = etag
+        self.headers = headers
+        self.content = content
+        self.validated = validated
+
+
+class ETagCacheTransport(Transport):
+    """
+    Transport wrapper caching GET responses with ETag, and revalidating them with If-None-Match.
+
+    If the server responds 304 (Not Modified), the cached response is returned.
+    Only GET requests to paths matching policies are cached, and only 200 responses
+    with ETag header are stored. Cache entries are keyed by URL, application ID and session token.
+    Non-GET requests to a path remove cached entries of the path, its sub paths and parent paths.
+
+    Policy is selected by longest matching prefix of path (after "/1/{tenantId}"), with following keys:
+
+    - maxAge: Seconds to serve cached response without revalidation (default: 0, always revalidate)
+    - match: Regular expression which path must match to be cached (optional)
+
+    Policy None disables cache of the prefix.
+
+    This is enabled by 'etagCache' service parameter, see Service.
+
+    Args:
+        transport (Transport): Transport to send requests
+        url_prefix (str): URL prefix of API, "{baseUrl}/1/{tenantId}"
+        policies (dict): Dict of path prefix and policy (optional, default: DEFAULT_POLICIES)
+        ttl (float): Max time to keep entries in seconds (default: 3600)
+        max_entries (int): Max number of entries (default: 1000)
+        max_bytes (int): Max total size of cached response bodies in bytes (default: 16MB)
+
+    Attributes:
+        transport (Transport): Transport to send requests
+        cache (TTLCache): Cache of responses
+        fresh_hits (int): Number of responses served from cache without request
+        revalidated (int): Number of 304 responses served from cache
+    """
+
+    def __init__(self, transport, url_prefix, policies=None, ttl=3600.0, max_entries=1000,
+                 max_bytes=16 * 1024 * 1024):
+        # type: (Transport, str, dict, float, int, int) -> None
+        self.transport = transport
+        self.url_prefix = url_prefix.rstrip("/")
+        self.policies = sorted((policies if policies is not None else DEFAULT_POLICIES).items(),
+                               key=lambda item: len(item[0]), reverse=True)
+        self.cache = TTLCache(ttl, max_entries, max_bytes)
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(transport, url_prefix, config):
+        # type: (Transport, str, dict) -> ETagCacheTransport
+        """
+        Create from 'etagCache' service parameter.
+
+        Args:
+            transport (Transport): Transport to send requests
+            url_prefix (str): URL prefix of API
+            config (dict): Cache parameters, must have following dict format (all optional)::
+
+                policies: Dict of path prefix and policy
+                ttl: Max time to keep entries in seconds
+                maxEntries: Max number of entries
+                maxBytes: Max total size of cached response bodies in bytes
+
+        Returns:
+            ETagCacheTransport: Transport
+        """
+        keys = {
+            "policies": "policies",
+            "ttl": "ttl",
+            "maxEntries": "max_entries",
+            "maxBytes": "max_bytes"
+        }
+        return ETagCacheTransport(transport, url_prefix, **{keys[k]: v for k, v in config.items() if k in keys})
+
+    def request(self, method, url, **kwargs):
+        # type: (str, str, **dict) -> Response
+        path = self._get_path(url)
+        if method != "GET":
+            if path is not None:
+                self.cache.invalidate(lambda key: ETagCacheTransport._is_related(key[0], path))
+            return self.transport.request(method, url, **kwargs)
+
+        policy = self._get_policy(path)
+        if policy is None or kwargs.get("stream"):
+            return self.transport.request(method, url, **kwargs)
+
+        headers = kwargs.get("headers") or {}
+        key = (path, url, tuple(headers.get(name) for name in _VARY_HEADERS),
+               tuple(sorted((kwargs.get("params") or {}).items())))
+        entry = self.cache.get(key)
+        if entry is not None:
+            if time.time() - entry.validated < policy.get("maxAge", 0):
+                with self._lock:
+                    self.fresh_hits += 1
+                return make_response(200, entry.content, entry.headers)
+            kwargs["headers"] = dict(headers, **{"If-None-Match": entry.etag})
+
+        res = self.transport.request(method, url, **kwargs)
+        if res.status_code == 304 and entry is not None:
+            res.close()
+            entry.validated = time.time()
+            self.cache.put(key, entry, size=len(entry.content))
+            with self._lock:
+                self.revalidated += 1
+            return make_response(200, entry.content, entry.headers)
+
+        etag = res.headers.get("ETag")
+        if res.status_code == 200 and etag is not None:
+            content = res.content
+            headers = {k: v for k, v in res.headers.items() if k.lower() not in _BODY_HEADERS}
+            self.cache.put(key, _Entry(etag, headers, content, time.time()), size=len(content))
+        return res
+
+    def _get_path(self, url):
+        # type: (str) -> str
+        """Get API path from URL, None if the URL is not API of the tenant."""
+        if not url.startswith(self.url_prefix):
+            return None
+        return urlsplit(url[len(self.url_prefix):]).path
+
+    @staticmethod
+    def _is_related(cached_path, path):
+        # type: (str, str) -> bool
+        """Check if the cached path is the path, its sub path or its parent path."""
+        return cached_path == path or cached_path.startswith(path + "/") or path.startswith(cached_path + "/")
+
+    def _get_policy(self, path):
+        # type: (str) -> dict
+        if path is None:
+            return None
+        for prefix, policy in self.policies:
+            if path.startswith(prefix):
+                if policy is not None and "match" in policy and not re.search(policy["match"], path):
+                    return None
+                return policy
+        return None
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Get statistics as dict, for metrics. "hits" of cache includes revalidated entries.
+
+        Returns:
+            dict: Statistics
+        """
+        stats = self.cache.to_dict()
+        with self._lock:
+            stats["freshHits"] = self.fresh_hits
+            stats["revalidated"] = self.revalidated
+        return stats
@@ -2,7 +2,6 @@
 """
 File bucket module
 """
-import json
 from .service import Service
 from requests import Response
 
@@ -34,7 +33,7 @@ class FileBucket(object):
             list: List of file metadata JSON
         """
         r = self.service.execute_rest("GET", "/files/{}".format(self.bucket_name))
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res["results"]
 
     def get_metadata(self, filename):
@@ -49,7 +48,7 @@ class FileBucket(object):
             dict: File Metadata
         """
         r = self.service.execute_rest("GET", "/files/{}/{}/meta".format(self.bucket_name, filename))
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def update_metadata(self, filename, meta, etag=None):
@@ -71,7 +70,7 @@ class FileBucket(object):
 
         r = self.service.execute_rest("PUT", "/files/{}/{}/meta".format(self.bucket_name, filename),
                                       json=meta, query=query)
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def create(self, filename, data, content_type="application/octet-stream", acl=None):
@@ -122,15 +121,19 @@ class FileBucket(object):
 
     def _upload(self, filename, data, content_type, method, acl=None, query=None):
         # type: (str, any, str, str, dict, dict) -> dict
+        headers = self._get_upload_headers(content_type, acl)
+        r = self.service.execute_rest(method, self._get_file_path(filename), data=data, query=query, headers=headers)
+        res = self.service.json_codec.loads(r.content)
+        return res
+
+    def _get_upload_headers(self, content_type, acl=None):
+        # type: (str, dict) -> dict
         headers = {
             "Content-Type": content_type
         }
         if acl is not None:
-            headers["X-ACL"] = json.dumps(acl)
-
-        r = self.service.execute_rest(method, self._get_file_path(filename), data=data, query=query, headers=headers)
-        res = r.json()
-        return res
+            headers["X-ACL"] = self.service.json_codec.dumps(acl)
+        return headers
 
     def _get_file_path(self, filename):
         # type: (str) -> str
@@ -180,5 +183,5 @@ class FileBucket(object):
             dict: Response JSON (empty JSON)
         """
         r = self.service.execute_rest("DELETE", self._get_file_path(filename))
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res
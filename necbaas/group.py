@@ -50,7 +50,7 @@ class Group(object):
             body["ACL"] = acl
 
         r = self.service.execute_rest("PUT", "/groups/{}".format(self.group_name), query=query, json=body)
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     @staticmethod
     def query(service):
@@ -62,7 +62,7 @@ class Group(object):
             list: List of group info
         """
         r = service.execute_rest("GET", "/groups")
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res["results"]
 
     def get(self):
@@ -74,7 +74,7 @@ class Group(object):
             dict: Group info
         """
         r = self.service.execute_rest("GET", "/groups/{}".format(self.group_name))
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     def remove(self):
         # type: () -> dict
@@ -85,7 +85,7 @@ class Group(object):
             dict: Response json
         """
         r = self.service.execute_rest("DELETE", "/groups/{}".format(self.group_name))
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     def add_members(self, users=None, groups=None):
         # type: (list, list) -> dict
@@ -106,7 +106,7 @@ class Group(object):
             body["groups"] = groups
 
         r = self.service.execute_rest("PUT", "/groups/{}/addMembers".format(self.group_name), json=body)
-        return r.json()
+        return self.service.json_codec.loads(r.content)
 
     def remove_members(self, users=None, groups=None):
         # type: (list, list) -> dict
@@ -127,4 +127,4 @@ class Group(object):
             body["groups"] = groups
 
         r = self.service.execute_rest("PUT", "/groups/{}/removeMembers".format(self.group_name), json=body)
-        return r.json()
+        return self.service.json_codec.loads(r.content)
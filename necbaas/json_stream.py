@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming JSON decoder module
+"""
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonArrayStream(object):
+    """
+    Incremental decoder of JSON object which contains a large array,
+    such as query response '{"results": [...], "count": N}'.
+
+    Elements of the array are decoded and yielded one by one as chunks arrive,
+    so the whole response is not held in memory.
+    Other members of the top level object are stored in 'extras'.
+
+    Examples:
+        ::
+
+            stream = JsonArrayStream(response.iter_content(65536), "results")
+            for obj in stream:
+                print(obj)
+            print(stream.extras.get("count"))
+
+    Args:
+        chunks (Iterable[bytes]): Iterable of UTF-8 encoded chunks of JSON
+        field (str): Field name of the array (default: "results")
+
+    Attributes:
+        extras (dict): Other members of the top level object.
+            Members after the array are available after the iteration.
+    """
+
+    def __init__(self, chunks, field="results"):
+        # type: (Iterable[bytes], str) -> None
+        self.field = field
+        self.extras = {}
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        # type: () -> Iterator[Any]
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            if key == self.field and self._peek() == "[":
+                self._pos += 1
+                for value in self._iter_array():
+                    yield value
+            else:
+                self.extras[key] = self._decode_value()
+
+            c = self._peek()
+            self._pos += 1
+            if c == "}":
+                return
+            if c != ",":
+                self._error("',' or '}' expected")
+
+    def _iter_array(self):
+        # type: () -> Iterator[Any]
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            c = self._peek()
+            self._pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                self._error("',' or ']' expected")
+
+    def _read(self):
+        # type: () -> bool
+        """Read next chunk into buffer. Returns False on end of data."""
+        if self._eof:
+            return False
+        # compact buffer
+        if self._pos > 0:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                text = self._text_decoder.decode(chunk)
+                if text:
+                    self._buf += text
+                    return True
+        self._buf += self._text_decoder.decode(b"", True)
+        self._eof = True
+        return True
+
+    def _peek(self):
+        # type: () -> str
+        """Skip whitespaces and get next character."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read():
+                self._error("Unexpected end of data")
+
+    def _expect(self, c):
+        # type: (str) -> None
+        if self._peek() != c:
+            self._error("'{}' expected".format(c))
+        self._pos += 1
+
+    def _decode_value(self):
+        # type: () -> Any
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # number at end of buffer may continue in next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._read()
+
+    def _error(self, message):
+        raise ValueError("{}: at position {}".format(message, self._pos))
+
+
+def iter_json_array(chunks, field="results"):
+    # type: (Iterable[bytes], str) -> Iterator[Any]
+    """
+    Decode elements of array in JSON object incrementally.
+
+    Args:
+        chunks (Iterable[bytes]): Iterable of UTF-8 encoded chunks of JSON
+        field (str): Field name of the array (default: "results")
+
+    Returns:
+        Iterator[Any]: Iterator of elements
+    """
+    return iter(JsonArrayStream(chunks, field))
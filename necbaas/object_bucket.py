@@ -2,12 +2,43 @@
 """
 JSON Object bucket module
 """
+import gzip
 import json
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 try:
-    from urllib.parse import urlencode
+    from urllib.parse import urlencode, quote_plus
+    import queue
 except ImportError:
-    from urllib import urlencode
+    from urllib import urlencode, quote_plus
+    import Queue as queue
+from requests import HTTPError
 from .service import Service
+from .retry import RetryPolicy
+from .transport import make_response
+from .json_stream import iter_json_array
+from .batch_sizer import AdaptiveBatchSizer
+from .buffered_writer import BufferedWriter
+from .columns import ColumnBuilder
+from .records import RecordType, make_record_type
+from .checkpoint import load_checkpoint, save_checkpoint, remove_checkpoint
+from .readers import read_records
+
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_EPOCH = datetime(1970, 1, 1)
+
+# HTTP status code corresponding to 'result' of batch result
+_BATCH_RESULT_STATUS = {
+    "badRequest": 400,
+    "forbidden": 403,
+    "notFound": 404,
+    "conflict": 409,
+    "serverError": 500
+}
 
 
 class ObjectBucket(object):
@@ -81,6 +112,702 @@ class ObjectBucket(object):
                           delete_mark=delete_mark, count=True)
         return res["results"], res["count"]
 
+    def count(self, where=None, delete_mark=False, cache_ttl=None):
+        # type: (dict, bool, float) -> int
+        """
+        Count objects in this bucket.
+
+        Only total count is requested: limit is 1 and only _id is projected,
+        so object data is not downloaded.
+
+        If cache_ttl is specified, the count is cached in Service.count_cache (shared by buckets of the service)
+        for cache_ttl seconds, and requests in the period are served from the cache.
+        Cached count is keyed by session token, as visible objects depend on ACL.
+        Cached count does not reflect changes until it expires.
+
+        Examples:
+            ::
+
+                count = bucket.count(where={"status": "active"}, cache_ttl=30)
+
+        Args:
+            where (dict): Query conditions (JSON) (optional)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            cache_ttl (float): Time to live of cached count in seconds (optional, default: not cached)
+
+        Returns:
+            int: Number of objects
+        """
+        cache_key = None
+        if cache_ttl is not None:
+            cache_key = ("count", self.bucket_name, self.service.session_token, json.dumps(where, sort_keys=True),
+                         delete_mark)
+            count = self.service.count_cache.get(cache_key)
+            if count is not None:
+                return count
+
+        res = self._query(where=where, limit=1, projection={"_id": 1}, delete_mark=delete_mark, count=True)
+        count = res["count"]
+        if cache_key is not None:
+            self.service.count_cache.put(cache_key, count, cache_ttl)
+        return count
+
+    def get_many(self, ids, projection=None, workers=4, group_size=None, delete_mark=False):
+        # type: (Iterable[str], dict, int, int, bool) -> (dict, list)
+        """
+        Get objects by IDs.
+
+        IDs are split into groups queried with '$in' condition, and the groups are fetched concurrently.
+        By default, size of each group is limited so that the query fits in URL (GET request)
+        instead of falling back to POST '_query' API.
+
+        Examples:
+            ::
+
+                (objects, missing) = bucket.get_many(ids, projection={"name": 1})
+                for oid in ids:
+                    if oid in objects:
+                        print(objects[oid]["name"])
+
+        Args:
+            ids (Iterable[str]): Object IDs. Duplicated IDs are fetched once.
+            projection (dict): Projection (JSON) (optional). _id must not be excluded.
+            workers (int): Max number of concurrent requests (optional, default=4)
+            group_size (int): Max number of IDs in one request (optional, default: limited by query size).
+                If the query is too long for URL even without IDs (ex. large projection), IDs are not
+                split unless group_size is specified.
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+
+        Returns:
+            (dict, list): Tuple of dict of object ID and JSON object, and list of IDs not found
+        """
+        if workers <= 0 or (group_size is not None and group_size <= 0):
+            raise ValueError("Bad workers or group_size")
+        projection = ObjectBucket._get_scan_projection(projection, "_id")
+        ids = list(OrderedDict.fromkeys(ids))
+        groups = list(self._split_ids(ids, projection, group_size, delete_mark))
+
+        def fetch(group):
+            return self.query(where={"_id": {"$in": group}}, limit=len(group), projection=projection,
+                              delete_mark=delete_mark)
+
+        objects = {}
+        if len(groups) <= 1 or workers == 1:
+            pages = [fetch(group) for group in groups]
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(workers, len(groups)))
+            try:
+                pages = list(executor.map(fetch, groups))
+            finally:
+                executor.shutdown(wait=True)
+        for page in pages:
+            for result in page:
+                objects[result["_id"]] = result
+
+        missing = [oid for oid in ids if oid not in objects]
+        return objects, missing
+
+    def _split_ids(self, ids, projection, group_size, delete_mark):
+        # type: (list, dict, int, bool) -> Iterator[list]
+        """
+        Split IDs into groups, by group_size and query size (internal).
+        If the query without IDs is already too long for GET (sent by POST), split by group_size only.
+        """
+        dumps = self.service.json_codec.dumps
+        base_size = len(urlencode(self._query_params(where={"_id": {"$in": []}}, limit=999999,
+                                                     projection=projection, delete_mark=delete_mark)))
+        separator_size = len(quote_plus(", "))
+        by_size = group_size is None and base_size < ObjectBucket._MAX_QUERY_SIZE
+
+        group = []
+        size = base_size
+        for oid in ids:
+            id_size = len(quote_plus(dumps(oid))) + separator_size
+            if group and ((group_size is not None and len(group) >= group_size) or
+                          (by_size and size + id_size >= ObjectBucket._MAX_QUERY_SIZE)):
+                yield group
+                group = []
+                size = base_size
+            group.append(oid)
+            size += id_size
+        if group:
+            yield group
+
+    def iter_query(self, where=None, order=None, page_size=100, projection=None, delete_mark=False, skip=0,
+                   limit=None):
+        # type: (dict, str, int, dict, bool, int, int) -> Iterator[dict]
+        """
+        Query objects in this bucket, and iterate over results page by page.
+        Pages are fetched lazily with skip/limit, so memory usage is bounded by page size.
+
+        Specify 'order' to get stable results, because order of objects is undefined otherwise.
+
+        Examples:
+            ::
+
+                for obj in bucket.iter_query(where={"product_name": "orange"}, order="_id", page_size=500):
+                    print(obj["_id"])
+
+        Args:
+            where (dict): Query conditions (JSON) (optional)
+            order (str): Sort conditions (optional)
+            page_size (int): Number of objects fetched by one request (optional, default=100)
+            projection (dict): Projection (JSON) (optional)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            skip (int): Skip count (optional, default=0)
+            limit (int): Max number of objects to iterate (optional, default: all)
+
+        Returns:
+            Iterator[dict]: Iterator of JSON objects
+        """
+        if page_size <= 0:
+            raise ValueError("Bad page_size")
+
+        remain = limit
+        while remain is None or remain > 0:
+            size = page_size if remain is None else min(page_size, remain)
+            results = self.query(where=where, order=order, skip=skip, limit=size, projection=projection,
+                                 delete_mark=delete_mark)
+            for result in results:
+                yield result
+
+            if len(results) < size:
+                return
+            skip += len(results)
+            if remain is not None:
+                remain -= len(results)
+
+    def scan(self, where=None, key="_id", page_size=100, projection=None, delete_mark=False, start_after=None,
+             descending=False):
+        # type: (dict, str, int, dict, bool, Any, bool) -> Iterator[dict]
+        """
+        Scan objects in this bucket with keyset (cursor) pagination.
+
+        Objects are sorted by key (and _id), and each page is fetched with
+        condition 'key > last key of previous page' instead of skip.
+        The cost of each page is constant regardless of scan position, and objects are not duplicated
+        nor missed by concurrent insert/delete.
+        The key field should be indexed. Objects without the key field (or with null key) are not scanned.
+
+        Examples:
+            ::
+
+                for obj in bucket.scan(where={"status": "active"}, page_size=1000):
+                    print(obj["_id"])
+
+        Args:
+            where (dict): Query conditions (JSON) (optional)
+            key (str): Sort key field name (optional, default="_id").
+                If the key is not unique, _id is used as tie-breaker.
+            page_size (int): Number of objects fetched by one request (optional, default=100)
+            projection (dict): Projection (JSON) (optional). Key field and _id must not be excluded.
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            start_after (Any): Resume scan after this object (optional).
+                Last object returned by previous scan (dict), or _id value if key is "_id".
+            descending (bool): Scan in descending order (optional, default=False)
+
+        Returns:
+            Iterator[dict]: Iterator of JSON objects
+        """
+        if page_size <= 0:
+            raise ValueError("Bad page_size")
+        projection = ObjectBucket._get_scan_projection(projection, key)
+
+        last = start_after
+        if last is not None and not isinstance(last, dict):
+            if key != "_id":
+                raise ValueError("start_after must be an object if key is not _id")
+            last = {"_id": last}
+
+        for page in self._scan_pages(where, key, page_size, projection, delete_mark, last, descending):
+            for result in page:
+                yield result
+
+    def _scan_pages(self, where, key, page_size, projection, delete_mark, last=None, descending=False):
+        # type: (dict, str, int, dict, bool, dict, bool) -> Iterator[list]
+        """
+        Scan objects with keyset pagination, and iterate over pages (internal).
+        """
+        if key == "_id":
+            order = "-_id" if descending else "_id"
+        else:
+            order = "-{},-_id".format(key) if descending else "{},_id".format(key)
+            where = ObjectBucket._with_key_condition(where, key)
+
+        while True:
+            query_where = where
+            if last is not None:
+                cond = ObjectBucket._get_keyset_condition(last, key, descending)
+                query_where = cond if not where else {"$and": [where, cond]}
+
+            results = self.query(where=query_where, order=order, limit=page_size, projection=projection,
+                                 delete_mark=delete_mark)
+            if results:
+                yield results
+
+            if len(results) < page_size:
+                return
+            last = results[-1]
+
+    def parallel_scan(self, where=None, partitions=4, workers=None, key="_id", boundaries=None, page_size=100,
+                      projection=None, delete_mark=False, ordered=False, max_pages_in_flight=None):
+        # type: (dict, int, int, str, list, int, dict, bool, bool, int) -> Iterator[dict]
+        """
+        Scan objects in this bucket in parallel.
+
+        The key space is split into disjoint ranges (partitions), and each range is scanned
+        with keyset pagination (see scan()) on a thread pool.
+        Pages fetched ahead are buffered up to max_pages_in_flight, so memory usage is bounded.
+
+        If boundaries is not specified, the range between min and max value of the key is split evenly.
+        This is supported for _id (ObjectId), numeric key and date key (string in "YYYY-MM-DDTHH:MM:SS.sssZ" format).
+
+        Examples:
+            ::
+
+                for obj in bucket.parallel_scan(partitions=8, workers=4, page_size=1000):
+                    print(obj["_id"])
+
+        Args:
+            where (dict): Query conditions (JSON) (optional)
+            partitions (int): Number of partitions (optional, default=4). Ignored if boundaries is specified.
+            workers (int): Number of threads (optional, default: same as number of partitions)
+            key (str): Partition and sort key field name (optional, default="_id")
+            boundaries (list): Sorted list of key values to split partitions (optional).
+                N values make N+1 partitions: [-inf, b0), [b0, b1), ... [bN-1, +inf)
+            page_size (int): Number of objects fetched by one request (optional, default=100)
+            projection (dict): Projection (JSON) (optional). Key field and _id must not be excluded.
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            ordered (bool): Iterate in key order (optional, default=False).
+                If False, objects are returned in order of arrival.
+            max_pages_in_flight (int): Max number of pages buffered (optional, default: workers * 2)
+
+        Returns:
+            Iterator[dict]: Iterator of JSON objects
+        """
+        if page_size <= 0:
+            raise ValueError("Bad page_size")
+        if partitions <= 0:
+            raise ValueError("Bad partitions")
+        projection = ObjectBucket._get_scan_projection(projection, key)
+
+        if boundaries is None:
+            boundaries = self._get_partition_boundaries(where, key, partitions, delete_mark)
+        ranges = list(zip([None] + list(boundaries), list(boundaries) + [None]))
+
+        workers = min(workers or len(ranges), len(ranges))
+        max_pages = max(max_pages_in_flight or workers * 2, workers)
+        if ordered:
+            queues = [queue.Queue(max(1, max_pages // workers)) for _ in ranges]
+        else:
+            queues = [queue.Queue(max_pages)] * len(ranges)
+        cancelled = threading.Event()
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for index, (low, high) in enumerate(ranges):
+                cond = {}
+                if low is not None:
+                    cond["$gte"] = low
+                if high is not None:
+                    cond["$lt"] = high
+                range_where = where
+                if cond:
+                    range_where = {key: cond} if not where else {"$and": [where, {key: cond}]}
+                executor.submit(self._scan_partition, queues[index], cancelled,
+                                range_where, key, page_size, projection, delete_mark)
+
+            remain = len(ranges)
+            index = 0
+            while remain > 0:
+                page, error = queues[index].get()
+                if error is not None:
+                    raise error
+                if page is None:
+                    remain -= 1
+                    if ordered:
+                        index += 1
+                    continue
+                for result in page:
+                    yield result
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True)
+
+    def _scan_partition(self, out, cancelled, where, key, page_size, projection, delete_mark):
+        # type: (queue.Queue, threading.Event, dict, str, int, dict, bool) -> None
+        """
+        Scan one partition, and put pages to queue (internal). (None, None) is put at the end.
+        """
+        def put(item):
+            while not cancelled.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        if cancelled.is_set():
+            return
+        try:
+            for page in self._scan_pages(where, key, page_size, projection, delete_mark):
+                if not put((page, None)):
+                    return
+            put((None, None))
+        except Exception as e:
+            put((None, e))
+
+    def _get_partition_boundaries(self, where, key, partitions, delete_mark):
+        # type: (dict, str, int, bool) -> list
+        """
+        Get boundaries splitting range of the key evenly (internal).
+        """
+        if partitions == 1:
+            return []
+        values = []
+        key_where = ObjectBucket._with_key_condition(where, key)
+        for order in (key, "-" + key):
+            results = self.query(where=key_where, order=order, limit=1, projection={key: 1},
+                                 delete_mark=delete_mark)
+            if not results:
+                return []
+            value = results[0]
+            for name in key.split("."):
+                value = value.get(name) if isinstance(value, dict) else None
+            values.append(value)
+        low, high = values
+
+        if key == "_id":
+            low, high = int(low, 16), int(high, 16)
+            to_key = "{:024x}".format
+        elif isinstance(low, (int, float)) and isinstance(high, (int, float)) \
+                and not isinstance(low, bool) and not isinstance(high, bool):
+            to_key = float if isinstance(low, float) or isinstance(high, float) else int
+        else:
+            try:
+                low = datetime.strptime(low, _DATE_FORMAT)
+                high = datetime.strptime(high, _DATE_FORMAT)
+            except (TypeError, ValueError):
+                raise ValueError("Can't split range of key '{}', specify boundaries".format(key))
+            to_key = ObjectBucket._format_date
+            low = int(round((low - _EPOCH).total_seconds() * 1000))
+            high = int(round((high - _EPOCH).total_seconds() * 1000))
+
+        boundaries = []
+        for i in range(1, partitions):
+            value = to_key(low + (high - low) * i / float(partitions) if to_key is float
+                           else low + (high - low) * i // partitions)
+            if (not boundaries or value != boundaries[-1]) and value != to_key(low):
+                boundaries.append(value)
+        return boundaries
+
+    @staticmethod
+    def _format_date(msec):
+        # type: (int) -> str
+        date = _EPOCH + timedelta(milliseconds=msec)
+        return date.strftime("%Y-%m-%dT%H:%M:%S.") + "{:03d}Z".format(date.microsecond // 1000)
+
+    @staticmethod
+    def _get_scan_projection(projection, key):
+        # type: (dict, str) -> dict
+        if not projection:
+            return projection
+        if not projection.get("_id", 1) or not projection.get(key, 1):
+            raise ValueError("Projection must not exclude key and _id")
+        if any(v for k, v in projection.items() if k != "_id"):  # inclusion
+            projection = dict(projection)
+            projection[key] = 1
+        return projection
+
+    @staticmethod
+    def _with_key_condition(where, key):
+        # type: (dict, str) -> dict
+        """
+        Add condition to exclude objects without the key (or null), which are sorted first
+        and can't be used as keyset (internal).
+        """
+        if key == "_id":
+            return where
+        has_key = {key: {"$exists": True, "$ne": None}}
+        return has_key if not where else {"$and": [where, has_key]}
+
+    @staticmethod
+    def _get_keyset_condition(last, key, descending):
+        # type: (dict, str, bool) -> dict
+        op = "$lt" if descending else "$gt"
+        if key == "_id":
+            return {"_id": {op: last["_id"]}}
+
+        value = last
+        for name in key.split("."):
+            value = value[name]
+        return {"$or": [
+            {key: {op: value}},
+            {key: value, "_id": {op: last["_id"]}}
+        ]}
+
+    def stream_query(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False,
+                     chunk_size=65536):
+        # type: (dict, str, int, int, dict, bool, int) -> Iterator[dict]
+        """
+        Query objects in this bucket, and decode results incrementally while downloading.
+
+        Unlike query(), the whole response is not held in memory,
+        and processing can be started before the download finishes.
+        Useful for large result set, ex. limit=-1.
+        The request is sent when iteration starts, and the response is closed when iteration ends
+        or the iterator is closed.
+        Note that the response is decoded by 'json' standard library, regardless of service.json_codec.
+
+        Examples:
+            ::
+
+                for obj in bucket.stream_query(where={"product_name": "orange"}, limit=-1):
+                    print(obj["_id"])
+
+        Args:
+            where (dict): Query conditions (JSON) (optional)
+            order (str): Sort conditions (optional)
+            skip (int): Skip count (optional, default=0)
+            limit (int): Limit count (optional)
+            projection (dict): Projection (JSON) (optional)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            chunk_size (int): Read size of response body in bytes (optional, default=65536)
+
+        Returns:
+            Iterator[dict]: Iterator of JSON objects
+        """
+        method, path, kwargs = self._query_request(where=where, order=order, skip=skip, limit=limit,
+                                                   projection=projection, delete_mark=delete_mark)
+        return self._stream_results(method, path, kwargs, chunk_size)
+
+    def stream_aggregate(self, pipeline, options=None, chunk_size=65536):
+        # type: (list, dict, int) -> Iterator[dict]
+        """
+        Aggregation operation, and decode results incrementally while downloading.
+        See aggregate() and stream_query().
+
+        Args:
+            pipeline (list): List of aggregation pipeline stage
+            options (dist): Aggregation option parameter (optional)
+            chunk_size (int): Read size of response body in bytes (optional, default=65536)
+
+        Returns:
+            Iterator[dict]: Iterator of aggregation results
+        """
+        body = {"pipeline": pipeline}
+        if options is not None:
+            body["options"] = options
+
+        return self._stream_results("POST", "/objects/{}/_aggregate".format(self.bucket_name), {"json": body},
+                                    chunk_size)
+
+    def query_to_columns(self, fields, dtypes=None, where=None, order=None, skip=0, limit=None, delete_mark=False,
+                         chunk_size=65536):
+        # type: (list, dict, dict, str, int, int, bool, int) -> dict
+        """
+        Query objects in this bucket, and get results as columnar arrays.
+
+        Only specified fields are requested (projection), and objects are decoded incrementally and
+        appended to typed columns directly (see stream_query() and ColumnBuilder),
+        so the list of dict is not built.
+
+        Examples:
+            ::
+
+                columns = bucket.query_to_columns(["name", "score"], dtypes={"score": "float"}, limit=-1)
+                average = sum(columns["score"]) / len(columns["score"])
+
+        Args:
+            fields (list): List of field names. Dotted name (ex. "a.b") can be used for nested field.
+            dtypes (dict): dtype of fields, "int", "float", "bool", "str" or "object" (optional, default: inferred)
+            where (dict): Query conditions (JSON) (optional)
+            order (str): Sort conditions (optional)
+            skip (int): Skip count (optional, default=0)
+            limit (int): Limit count (optional)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            chunk_size (int): Read size of response body in bytes (optional, default=65536)
+
+        Returns:
+            dict: Dict of field name and column (array.array for int/float/bool, list for others)
+        """
+        return self._build_columns(fields, dtypes, where, order, skip, limit, delete_mark, chunk_size).to_dict()
+
+    def query_to_dataframe(self, fields, dtypes=None, where=None, order=None, skip=0, limit=None, delete_mark=False,
+                           chunk_size=65536):
+        # type: (list, dict, dict, str, int, int, bool, int) -> pandas.DataFrame
+        """
+        Query objects in this bucket, and get results as pandas DataFrame.
+        Requires 'pandas' library. See query_to_columns().
+
+        Returns:
+            pandas.DataFrame: DataFrame
+        """
+        return self._build_columns(fields, dtypes, where, order, skip, limit, delete_mark, chunk_size).to_dataframe()
+
+    def query_records(self, fields, where=None, order=None, skip=0, limit=None, delete_mark=False,
+                      chunk_size=65536):
+        # type: (Union[list, RecordType], dict, str, int, int, bool, int) -> List[Record]
+        """
+        Query objects in this bucket, and get results as compact records.
+
+        Only fields of the record type and system fields are requested (projection), and objects are
+        decoded incrementally and converted to tuple based records with __slots__ (see stream_query() and
+        make_record_type()). ACL is kept as shared JSON string and decoded on access.
+        Records use much less memory than dict for large result set.
+
+        Examples:
+            ::
+
+                records = bucket.query_records(["name", "score"], limit=-1)
+                for record in records:
+                    print(record._id, record.name, record.score)
+
+        Args:
+            fields (list or RecordType): List of field names, or record type created by make_record_type()
+            where (dict): Query conditions (JSON) (optional)
+            order (str): Sort conditions (optional)
+            skip (int): Skip count (optional, default=0)
+            limit (int): Limit count (optional)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+            chunk_size (int): Read size of response body in bytes (optional, default=65536)
+
+        Returns:
+            list: List of records
+        """
+        record_type = fields if isinstance(fields, RecordType) else make_record_type(fields)
+        return [record_type(obj) for obj in self.stream_query(where=where, order=order, skip=skip, limit=limit,
+                                                               projection=record_type.projection,
+                                                               delete_mark=delete_mark, chunk_size=chunk_size)]
+
+    def export(self, dest, where=None, projection=None, format="ndjson", compress=None, page_size=1000,
+               checkpoint=None, partitions=None, workers=None, delete_mark=False):
+        # type: (Any, dict, dict, str, bool, int, str, int, int, bool) -> int
+        """
+        Export objects in this bucket to NDJSON (newline delimited JSON) file.
+
+        Objects are fetched page by page in _id order (see scan() and parallel_scan()) and
+        written to the file directly, so memory usage is constant.
+
+        If checkpoint file path is specified, last exported _id and file offset are saved to it
+        after each page. If the export is interrupted, calling export() again with same arguments
+        truncates the file to the checkpoint and resumes after the last exported _id.
+        The checkpoint file is removed when the export is completed.
+        With gzip compression, each page is written as separate gzip member to make resume possible.
+
+        Examples:
+            ::
+
+                count = bucket.export("backup.ndjson.gz", checkpoint="backup.checkpoint", page_size=1000)
+
+        Args:
+            dest (Any): File path, or binary file object
+            where (dict): Query conditions (JSON) (optional)
+            projection (dict): Projection (JSON) (optional). _id must not be excluded.
+            format (str): Output format, only "ndjson" is supported (optional, default="ndjson")
+            compress (bool): Compress with gzip (optional, default: True if dest path ends with ".gz")
+            page_size (int): Number of objects fetched by one request (optional, default=1000)
+            checkpoint (str): Checkpoint file path (optional). dest must be file path.
+            partitions (int): Number of partitions to fetch in parallel (optional, default: no parallel fetch)
+            workers (int): Number of threads of parallel fetch (optional, default: same as partitions)
+            delete_mark (bool): Include soft deleted data (optional, default=False)
+
+        Returns:
+            int: Number of objects exported (by this call)
+        """
+        if format != "ndjson":
+            raise ValueError("Unsupported format: {}".format(format))
+        is_path = not hasattr(dest, "write")
+        if checkpoint is not None and not is_path:
+            raise ValueError("checkpoint requires file path")
+        if compress is None:
+            compress = is_path and dest.endswith(".gz")
+
+        state = load_checkpoint(checkpoint) if checkpoint is not None else None
+        scan_where = where
+        if state is not None:
+            cond = {"_id": {"$gt": state["lastId"]}}
+            scan_where = cond if not where else {"$and": [where, cond]}
+
+        if partitions:
+            results = self.parallel_scan(where=scan_where, partitions=partitions, workers=workers,
+                                         page_size=page_size, projection=projection, delete_mark=delete_mark,
+                                         ordered=True)
+        else:
+            results = self.scan(where=scan_where, page_size=page_size, projection=projection,
+                                delete_mark=delete_mark)
+
+        if is_path:
+            raw = open(dest, "r+b" if state is not None else "wb")
+        else:
+            raw = dest
+        try:
+            if state is not None:
+                raw.seek(state["offset"])
+                raw.truncate()
+            count = self._write_ndjson(results, raw, compress, page_size, checkpoint, state)
+        finally:
+            if is_path:
+                raw.close()
+
+        if checkpoint is not None:
+            remove_checkpoint(checkpoint)
+        return count
+
+    def _write_ndjson(self, results, raw, compress, page_size, checkpoint, state):
+        # type: (Iterator[dict], Any, bool, int, str, dict) -> int
+        """
+        Write objects to NDJSON file, and save checkpoint after each page (internal).
+        """
+        dumps = self.service.json_codec.dumps_bytes
+        total = state["count"] if state is not None else 0
+        count = 0
+        out = None
+        try:
+            for result in results:
+                if out is None:
+                    out = gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw
+                out.write(dumps(result) + b"\n")
+                count += 1
+
+                if checkpoint is not None and count % page_size == 0:
+                    if compress:
+                        out.close()  # end of gzip member, raw file is not closed
+                        out = None
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                    save_checkpoint(checkpoint, {"lastId": result["_id"], "count": total + count,
+                                                 "offset": raw.tell()})
+        finally:
+            if compress and out is not None:
+                out.close()
+        raw.flush()
+        return count
+
+    def _build_columns(self, fields, dtypes, where, order, skip, limit, delete_mark, chunk_size):
+        # type: (list, dict, dict, str, int, int, bool, int) -> ColumnBuilder
+        projection = {field: 1 for field in fields}
+        if "_id" not in projection:
+            projection["_id"] = 0
+        builder = ColumnBuilder(fields, dtypes)
+        builder.extend(self.stream_query(where=where, order=order, skip=skip, limit=limit, projection=projection,
+                                         delete_mark=delete_mark, chunk_size=chunk_size))
+        return builder
+
+    def _stream_results(self, method, path, kwargs, chunk_size):
+        # type: (str, str, dict, int) -> Iterator[dict]
+        """
+        Send streaming request and decode results (internal).
+        The request is sent in the generator, so that the response is always closed by the generator.
+        """
+        r = self.service.execute_rest(method, path, stream=True, **kwargs)
+        try:
+            for result in iter_json_array(r.iter_content(chunk_size), "results"):
+                yield result
+        finally:
+            r.close()
+
     def _query(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False, count=False):
         """
         Query objects (internal).
@@ -97,10 +824,59 @@ class ObjectBucket(object):
         Returns:
             dict: Response in JSON
         """
+        method, path, kwargs = self._query_request(where=where, order=order, skip=skip, limit=limit,
+                                                   projection=projection, delete_mark=delete_mark, count=count)
+        cache = self.service.query_cache
+        if cache is None:
+            r = self.service.execute_rest(method, path, **kwargs)
+            return self.service.json_codec.loads(r.content)
+
+        # response body is cached, and decoded for each call to avoid sharing mutable results
+        key = (self.bucket_name, self.service.session_token,
+               json.dumps([where, order, skip, limit, projection, delete_mark, count], sort_keys=True))
+        content = cache.get(key)
+        if content is None:
+            generation = cache.generation(self.bucket_name)
+            content = self.service.execute_rest(method, path, **kwargs).content
+            cache.put_query(self.bucket_name, generation, key, content, len(content))
+        return self.service.json_codec.loads(content)
+
+    def _query_request(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False,
+                       count=False):
+        # type: (dict, str, int, int, dict, bool, bool) -> (str, str, dict)
+        """
+        Build query request (internal).
+        Long query is sent by POST '_query' API, to avoid too long URL.
+
+        Args:
+            See _query().
+
+        Returns:
+            (str, str, dict): Tuple of HTTP method, path and keyword arguments of execute_rest()
+        """
+        query_params = self._query_params(where, order, skip, limit, projection, delete_mark, count)
+        query_string = urlencode(query_params)
+        if len(query_string) < ObjectBucket._MAX_QUERY_SIZE:
+            return "GET", "/objects/{}".format(self.bucket_name), {"query": query_params}
+        else:
+            return "POST", "/objects/{}/_query".format(self.bucket_name), {"json": query_params}
+
+    def _query_params(self, where=None, order=None, skip=0, limit=None, projection=None, delete_mark=False,
+                      count=False):
+        # type: (dict, str, int, int, dict, bool, bool) -> dict
+        """
+        Build query parameters (internal).
+
+        Args:
+            See _query().
+
+        Returns:
+            dict: Query parameters
+        """
         query_params = {}
 
         if where is not None:
-            query_params["where"] = json.dumps(where)
+            query_params["where"] = self.service.json_codec.dumps(where)
         if order is not None:
             query_params["order"] = order
         if skip > 0:
@@ -108,19 +884,12 @@ class ObjectBucket(object):
         if limit is not None:
             query_params["limit"] = limit
         if projection is not None:
-            query_params["projection"] = json.dumps(projection)
+            query_params["projection"] = self.service.json_codec.dumps(projection)
         if delete_mark:
             query_params["deleteMark"] = 1
         if count:
             query_params["count"] = 1
-
-        query_string = urlencode(query_params)
-        if len(query_string) < ObjectBucket._MAX_QUERY_SIZE:
-            r = self.service.execute_rest("GET", "/objects/{}".format(self.bucket_name), query=query_params)
-        else:
-            r = self.service.execute_rest("POST", "/objects/{}/_query".format(self.bucket_name), json=query_params)
-
-        return r.json()
+        return query_params
 
     def insert(self, data):
         # type: (dict) -> dict
@@ -133,14 +902,21 @@ class ObjectBucket(object):
                 acl = {"r": ["g:authenticated"], "w": ["g:authenticated"]}
                 result = bucket.insert({"name": "foo", "score": 70, "ACL": acl})
 
+        If write coalescing is enabled ('writeCoalescing' service parameter), concurrent insert/update/remove
+        calls on the same bucket are merged into one batch request. In this case 'data' of the batch result
+        is returned, and failure of the operation is raised as HTTPError with status code mapped from the result.
+
         Args:
             data (dict): Data (JSON)
 
         Returns:
             dict: Response JSON
         """
-        r = self.service.execute_rest("POST", "/objects/{}".format(self.bucket_name), json=data)
-        res = r.json()
+        if self.service.write_coalescing is not None:
+            return ObjectBucket._get_coalesced_result(self._get_coalescer().insert(data))
+
+        r = self._execute_write("POST", "/objects/{}".format(self.bucket_name), json=data)
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def update(self, oid, data, etag=None):
@@ -154,15 +930,18 @@ class ObjectBucket(object):
             etag (str): ETag (optional)
 
         Returns:
-            dict: Response JSON
+            dict: Response JSON. Coalesced if enabled, see insert().
         """
+        if self.service.write_coalescing is not None:
+            return ObjectBucket._get_coalesced_result(self._get_coalescer().update(oid, data, etag=etag))
+
         query_params = {}
         if etag is not None:
             query_params["etag"] = etag
 
-        r = self.service.execute_rest("PUT", "/objects/{}/{}".format(self.bucket_name, oid),
-                                      query=query_params, json=data)
-        res = r.json()
+        r = self._execute_write("PUT", "/objects/{}/{}".format(self.bucket_name, oid),
+                                query=query_params, json=data)
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def remove(self, oid, soft_delete=False):
@@ -175,15 +954,59 @@ class ObjectBucket(object):
             soft_delete (bool): Soft delete (optional, default=False)
 
         Returns:
-            dict: Response JSON
+            dict: Response JSON. Coalesced if enabled, see insert().
         """
         if not oid:  # fail-safe: check not None nor empty to avoid remove all objects.
             raise ValueError("No oid")
-        r = self.service.execute_rest("DELETE", "/objects/{}/{}".format(self.bucket_name, oid),
-                                      query={"deleteMark": 1 if soft_delete else 0})
-        res = r.json()
+        if self.service.write_coalescing is not None:
+            return ObjectBucket._get_coalesced_result(self._get_coalescer(soft_delete).remove(oid))
+
+        r = self._execute_write("DELETE", "/objects/{}/{}".format(self.bucket_name, oid),
+                                query={"deleteMark": 1 if soft_delete else 0})
+        res = self.service.json_codec.loads(r.content)
         return res
 
+    def _execute_write(self, method, path, **kwargs):
+        # type: (str, str, **Any) -> Response
+        """
+        Execute write request, and invalidate query cache of this bucket (internal).
+        Cache is invalidated even if the request fails, because objects may have been changed.
+        """
+        try:
+            return self.service.execute_rest(method, path, **kwargs)
+        finally:
+            if self.service.query_cache is not None:
+                self.service.query_cache.invalidate_bucket(self.bucket_name)
+
+    def _get_coalescer(self, soft_delete=False):
+        # type: (bool) -> BufferedWriter
+        """
+        Get write coalescer of this bucket, shared by the service (internal).
+        """
+        service = self.service
+        key = (self.bucket_name, soft_delete)
+        with service._coalescers_lock:
+            writer = service._coalescers.get(key)
+            if writer is None:
+                config = service.write_coalescing
+                writer = BufferedWriter(ObjectBucket(service, self.bucket_name),
+                                        max_docs=config.get("maxDocs", 100),
+                                        max_bytes=config.get("maxBytes", 1024 * 1024),
+                                        max_delay=config.get("maxDelay", 0.005),
+                                        soft_delete=soft_delete)
+                service._coalescers[key] = writer
+            return writer
+
+    @staticmethod
+    def _get_coalesced_result(future):
+        # type: (Future) -> dict
+        result = future.result()
+        if result.get("result") != "ok":
+            status = _BATCH_RESULT_STATUS.get(result.get("result"), 500)
+            raise HTTPError("{} Batch operation failed: {}".format(status, result.get("result")),
+                            response=make_response(status, result))
+        return result.get("data", {})
+
     def remove_with_query(self, where=None, soft_delete=False):
         # type: (dict, bool) -> dict
         """
@@ -200,12 +1023,12 @@ class ObjectBucket(object):
             where = {}
 
         query_params = {
-            "where": json.dumps(where),
+            "where": self.service.json_codec.dumps(where),
             "deleteMark": 1 if soft_delete else 0
         }
         
-        r = self.service.execute_rest("DELETE", "/objects/{}".format(self.bucket_name), query=query_params)
-        res = r.json()
+        r = self._execute_write("DELETE", "/objects/{}".format(self.bucket_name), query=query_params)
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def batch(self, requests, soft_delete=False):
@@ -233,11 +1056,371 @@ class ObjectBucket(object):
         body_json = {
             "requests": requests
         }
-        r = self.service.execute_rest("POST", "/objects/{}/_batch".format(self.bucket_name),
-                                      json=body_json, query=query)
-        res = r.json()
+        r = self._execute_write("POST", "/objects/{}/_batch".format(self.bucket_name),
+                                json=body_json, query=query)
+        res = self.service.json_codec.loads(r.content)
         return res["results"]
 
+    DEFAULT_RETRY_RESULTS = ("serverError",)
+    # type: tuple
+
+    def batch_with_retry(self, requests, soft_delete=False, retry_policy=None, retry_results=DEFAULT_RETRY_RESULTS):
+        # type: (list, bool, RetryPolicy, tuple) -> list
+        """
+        Batch operation, and resend only failed items which are retryable.
+
+        Items whose result is in retry_results are resent with exponential backoff of retry policy
+        (max_retries, backoff_factor, max_backoff and budget are used).
+        Note that retrying insert may cause duplicated objects, if the failed item has been inserted actually.
+
+        Examples:
+            ::
+
+                results = bucket.batch_with_retry(requests, retry_policy=necbaas.RetryPolicy(max_retries=5))
+                failed = [r for r in results if r["result"] != "ok"]
+
+        Args:
+            requests (list): List of batch requests
+            soft_delete (bool): Soft delete (optional, default=False)
+            retry_policy (RetryPolicy): Retry policy (optional, default: service.retry_policy or RetryPolicy())
+            retry_results (tuple): Retryable item results (optional, default: serverError)
+
+        Returns:
+            list: List of batch results, in same order as requests. Last result is set for items failed finally.
+        """
+        policy = retry_policy or self.service.retry_policy or RetryPolicy()
+        results = self.batch(requests, soft_delete=soft_delete)
+        pending = [i for i, result in enumerate(results) if result.get("result") in retry_results]
+
+        retry_count = 0
+        elapsed = 0.0
+        while pending and retry_count < policy.max_retries:
+            delay = policy.get_backoff(retry_count)
+            if policy.budget is not None and elapsed + delay > policy.budget:
+                break
+            self.service.logger.warning("Batch items failed, retry %d items after %.3f sec", len(pending), delay)
+            time.sleep(delay)
+            elapsed += delay
+            retry_count += 1
+
+            retried = self.batch([requests[i] for i in pending], soft_delete=soft_delete)
+            for i, result in zip(pending, retried):
+                results[i] = result
+            pending = [i for i in pending if results[i].get("result") in retry_results]
+        return results
+
+    def bulk_insert(self, iterable, chunk_size=500, max_bytes=1024 * 1024, max_in_flight=4, sizer=None,
+                    retry_policy=None):
+        # type: (Iterable[dict], int, int, int, AdaptiveBatchSizer, RetryPolicy) -> list
+        """
+        Insert many JSON Objects with batch operation.
+        See bulk_insert_iter().
+
+        Examples:
+            ::
+
+                results = bucket.bulk_insert({"key": i} for i in range(10000))
+
+        Args:
+            iterable (Iterable[dict]): Iterable of data (JSON)
+            chunk_size (int): Max number of objects in one batch request (optional, default=500)
+            max_bytes (int): Max serialized size of objects in one batch request (optional, default=1MB)
+            max_in_flight (int): Max number of concurrent batch requests (optional, default=4)
+            sizer (AdaptiveBatchSizer): Adaptive batch size controller (optional).
+                If specified, chunk_size and max_bytes are ignored.
+            retry_policy (RetryPolicy): Retry policy of failed items (optional). See batch_with_retry().
+
+        Returns:
+            list: List of batch results, in same order as input
+        """
+        return [result for _, result in self.bulk_insert_iter(iterable, chunk_size=chunk_size, max_bytes=max_bytes,
+                                                              max_in_flight=max_in_flight, sizer=sizer,
+                                                              retry_policy=retry_policy)]
+
+    def bulk_insert_iter(self, iterable, chunk_size=500, max_bytes=1024 * 1024, max_in_flight=4, sizer=None,
+                         retry_policy=None):
+        # type: (Iterable[dict], int, int, int, AdaptiveBatchSizer, RetryPolicy) -> Iterator[(int, dict)]
+        """
+        Insert many JSON Objects with batch operation, and iterate over results.
+
+        Objects are read from iterable lazily and split into chunks by number and serialized size,
+        and up to max_in_flight batch requests are sent concurrently on a thread pool.
+        Results are returned in same order as input.
+
+        If a batch request fails, the exception is raised and remaining requests are cancelled.
+        Objects in the requests already sent may be inserted.
+
+        Examples:
+            ::
+
+                for index, result in bucket.bulk_insert_iter(read_objects(), max_in_flight=8):
+                    if result["result"] != "ok":
+                        print("failed: {}".format(index))
+
+        Args:
+            iterable (Iterable[dict]): Iterable of data (JSON)
+            chunk_size (int): Max number of objects in one batch request (optional, default=500)
+            max_bytes (int): Max serialized size of objects in one batch request (optional, default=1MB).
+                None for unlimited.
+            max_in_flight (int): Max number of concurrent batch requests (optional, default=4)
+            sizer (AdaptiveBatchSizer): Adaptive batch size controller (optional).
+                If specified, chunk size is decided by the sizer, and chunk_size and max_bytes are ignored.
+            retry_policy (RetryPolicy): Retry policy of failed items (optional).
+                If specified, failed items with serverError are resent, see batch_with_retry().
+
+        Returns:
+            Iterator[(int, dict)]: Iterator of tuple of index of input and batch result
+        """
+        if chunk_size <= 0 or max_in_flight <= 0:
+            raise ValueError("Bad chunk_size or max_in_flight")
+        for results in self._bulk_insert_chunks(iterable, chunk_size, max_bytes, max_in_flight, sizer, retry_policy):
+            for item in results:
+                yield item
+
+    def _bulk_insert_chunks(self, iterable, chunk_size, max_bytes, max_in_flight, sizer, retry_policy):
+        # type: (Iterable[dict], int, int, int, AdaptiveBatchSizer, RetryPolicy) -> Iterator[list]
+        """
+        Insert objects with concurrent batch requests, and iterate over results of each chunk (internal).
+
+        Returns:
+            Iterator[list]: Iterator of list of tuple of index of input and batch result
+        """
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        in_flight = deque()
+        try:
+            for start, chunk, nbytes in self._iter_chunks(iterable, chunk_size, max_bytes, sizer):
+                if len(in_flight) >= max_in_flight:
+                    yield ObjectBucket._get_bulk_results(*in_flight.popleft())
+                requests = [{"op": "insert", "data": data} for data in chunk]
+                in_flight.append((start, executor.submit(self._timed_batch, requests, nbytes, sizer, retry_policy)))
+
+            while in_flight:
+                yield ObjectBucket._get_bulk_results(*in_flight.popleft())
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _get_bulk_results(start, future):
+        # type: (int, Future) -> list
+        return [(start + i, result) for i, result in enumerate(future.result())]
+
+    def import_file(self, path, format=None, chunk_size=500, workers=4, transform=None, checkpoint=None,
+                    progress=None, key=None, max_bytes=1024 * 1024, sizer=None, retry_policy=None, encoding="utf-8"):
+        # type: (str, str, int, int, Callable, str, Callable, str, int, AdaptiveBatchSizer, RetryPolicy, str) -> dict
+        """
+        Import records from NDJSON or CSV file into this bucket.
+
+        Records are read lazily (see necbaas.readers) and inserted with batch requests,
+        up to 'workers' requests in flight (see bulk_insert_iter()).
+        Values of CSV are str, use transform to convert them.
+
+        If checkpoint file path is specified, number of records whose batch results are received, and number
+        of records read to send are saved after each chunk. If the import is interrupted, calling import_file()
+        again with same arguments skips the records already imported. Records of batch requests in flight
+        at the interruption may have been inserted: if 'key' (unique field of records) is specified, such records
+        are looked up by the key and skipped on resume, otherwise they are inserted again.
+        The checkpoint file is removed when the import is completed.
+
+        Progress is reported to 'progress' callback after each chunk, with dict:
+
+        - processed: Number of records processed (including skipped by transform, and previous runs)
+        - inserted: Number of records inserted (including previous runs)
+        - skipped: Number of records skipped on resume, because they were already inserted
+          (found by 'key') but not counted in 'inserted' before interruption
+        - failed: Number of records failed (batch result is not "ok")
+        - elapsed: Elapsed time of this run in seconds
+        - docsPerSec: Throughput of this run (inserted records / sec)
+
+        Examples:
+            ::
+
+                summary = bucket.import_file("products.csv", transform=lambda r: dict(r, price=int(r["price"])),
+                                             checkpoint="products.checkpoint", progress=print)
+
+        Args:
+            path (str): File path. Compressed with gzip if it ends with ".gz".
+            format (str): "ndjson" or "csv" (optional, default: guessed from file extension)
+            chunk_size (int): Max number of records in one batch request (optional, default=500)
+            workers (int): Max number of concurrent batch requests (optional, default=4)
+            transform (Callable): Function to convert each record (dict) to data to insert (optional).
+                If it returns None, the record is skipped.
+            checkpoint (str): Checkpoint file path (optional)
+            progress (Callable): Progress callback, called with dict (optional)
+            key (str): Unique key field name of records, to skip records already inserted on resume (optional)
+            max_bytes (int): Max serialized size of records in one batch request (optional, default=1MB)
+            sizer (AdaptiveBatchSizer): Adaptive batch size controller (optional)
+            retry_policy (RetryPolicy): Retry policy of failed items (optional). See batch_with_retry().
+            encoding (str): File encoding (optional, default="utf-8")
+
+        Returns:
+            dict: Summary, same as progress
+        """
+        records = read_records(path, format, self.service.json_codec.loads, encoding)
+        state = load_checkpoint(checkpoint) if checkpoint is not None else None
+        stats = {
+            "processed": state["processed"] if state is not None else 0,
+            "inserted": state["inserted"] if state is not None else 0,
+            "skipped": state.get("skipped", 0) if state is not None else 0,
+            "failed": state["failed"] if state is not None else 0,
+            "elapsed": 0.0,
+            "docsPerSec": 0.0
+        }
+        start_time = time.time()
+
+        def report():
+            stats["elapsed"] = time.time() - start_time
+            if stats["elapsed"] > 0:
+                stats["docsPerSec"] = (stats["inserted"] - inserted_before) / stats["elapsed"]
+            if checkpoint is not None:
+                data = {k: stats[k] for k in ("processed", "inserted", "skipped", "failed")}
+                data["read"] = read[0]
+                save_checkpoint(checkpoint, data)
+            if progress is not None:
+                progress(dict(stats))
+
+        inserted_before = stats["inserted"]
+        read = [stats["processed"]]  # number of records read from file
+        sources = deque()  # record index of data in flight
+
+        def feed():
+            pairs = self._iter_import_data(records, transform, stats["processed"])
+            if state is not None and key is not None:
+                # records read before interruption may have been sent
+                pairs = self._skip_existing(pairs, key, state["read"], stats)
+            for index, data in pairs:
+                read[0] = index + 1
+                if data is not None:
+                    sources.append(index)
+                    yield data
+
+        if chunk_size <= 0 or workers <= 0:
+            raise ValueError("Bad chunk_size or workers")
+        for results in self._bulk_insert_chunks(feed(), chunk_size, max_bytes, workers, sizer, retry_policy):
+            for _, result in results:
+                stats["processed"] = sources.popleft() + 1
+                if result.get("result") == "ok":
+                    stats["inserted"] += 1
+                else:
+                    stats["failed"] += 1
+            report()
+
+        stats["processed"] = read[0]
+        report()
+        if checkpoint is not None:
+            remove_checkpoint(checkpoint)
+        return stats
+
+    @staticmethod
+    def _iter_import_data(records, transform, skip):
+        # type: (Iterator[dict], Callable, int) -> Iterator[(int, dict)]
+        """
+        Skip and transform records to import (internal).
+
+        Returns:
+            Iterator[(int, dict)]: Iterator of tuple of record index and data (None if skipped by transform)
+        """
+        for index, record in enumerate(records):
+            if index < skip:
+                continue
+            yield index, transform(record) if transform is not None else record
+
+    def _skip_existing(self, pairs, key, end, stats):
+        # type: (Iterator[(int, dict)], str, int, dict) -> Iterator[(int, dict)]
+        """
+        Skip data already inserted in records before index 'end', looked up by key (internal).
+        Number of skipped data is added to stats["skipped"].
+        """
+        head = []
+        for pair in pairs:
+            head.append(pair)
+            if pair[0] + 1 >= end:
+                break
+
+        existing = set()
+        values = [data[key] for _, data in head if data is not None and data.get(key) is not None]
+        for i in range(0, len(values), 100):
+            results = self.query(where={key: {"$in": values[i:i + 100]}}, projection={key: 1}, limit=-1)
+            existing.update(result[key] for result in results if key in result)
+
+        for index, data in head:
+            if data is None or data.get(key) not in existing:
+                yield index, data
+            else:
+                stats["skipped"] += 1
+        for pair in pairs:
+            yield pair
+
+    def buffered_writer(self, max_docs=500, max_bytes=1024 * 1024, max_delay=1.0, max_queue=10000,
+                        soft_delete=False):
+        # type: (int, int, float, int, bool) -> BufferedWriter
+        """
+        Create write-behind buffer, which sends insert/update/remove operations as batch requests
+        from background thread. See BufferedWriter.
+
+        Examples:
+            ::
+
+                with bucket.buffered_writer(max_delay=0.5) as writer:
+                    future = writer.insert({"name": "foo"})
+                    writer.update(oid, {"$set": {"score": 80}})
+
+        Args:
+            max_docs (int): Max number of operations in one batch request (optional, default=500)
+            max_bytes (int): Max serialized size of one batch request (optional, default=1MB)
+            max_delay (float): Max delay in seconds before sending queued operations (optional, default=1.0)
+            max_queue (int): Max number of queued operations (optional, default=10000)
+            soft_delete (bool): Soft delete on remove (optional, default=False)
+
+        Returns:
+            BufferedWriter: Buffered writer
+        """
+        return BufferedWriter(self, max_docs=max_docs, max_bytes=max_bytes, max_delay=max_delay,
+                              max_queue=max_queue, soft_delete=soft_delete)
+
+    def _timed_batch(self, requests, nbytes, sizer, retry_policy=None):
+        # type: (list, int, AdaptiveBatchSizer, RetryPolicy) -> list
+        if retry_policy is not None:
+            batch = lambda: self.batch_with_retry(requests, retry_policy=retry_policy)
+        else:
+            batch = lambda: self.batch(requests)
+        if sizer is None:
+            return batch()
+        start = time.time()
+        results = batch()
+        sizer.record(len(requests), time.time() - start, nbytes)
+        return results
+
+    def _iter_chunks(self, iterable, chunk_size, max_bytes, sizer=None):
+        # type: (Iterable[dict], int, int, AdaptiveBatchSizer) -> Iterator[(int, list, int)]
+        """
+        Split iterable into chunks by number and serialized size (internal).
+        If sizer is specified, chunk_size and max_bytes are taken from the sizer for each chunk.
+
+        Returns:
+            Iterator[(int, list, int)]: Iterator of tuple of start index, chunk and serialized size of chunk
+        """
+        chunk = []
+        chunk_bytes = 0
+        start = 0
+        if sizer is not None:
+            chunk_size, max_bytes = sizer.batch_size, sizer.max_bytes
+        measure = max_bytes is not None or sizer is not None
+        for data in iterable:
+            size = len(self.service.json_codec.dumps(data)) if measure else 0
+            if chunk and (len(chunk) >= chunk_size or (max_bytes is not None and chunk_bytes + size > max_bytes)):
+                yield start, chunk, chunk_bytes
+                start += len(chunk)
+                chunk = []
+                chunk_bytes = 0
+                if sizer is not None:
+                    chunk_size, max_bytes = sizer.batch_size, sizer.max_bytes
+            chunk.append(data)
+            chunk_bytes += size
+        if chunk:
+            yield start, chunk, chunk_bytes
+
     def aggregate(self, pipeline, options=None):
         # type: (list, dict) -> list
         """
@@ -265,5 +1448,5 @@ class ObjectBucket(object):
             body["options"] = options
 
         r = self.service.execute_rest("POST", "/objects/{}/_aggregate".format(self.bucket_name), json=body)
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res["results"]
@@ -25,5 +25,5 @@ class PushSender(object):
             int: Count of matched installations
         """
         r = service.execute_rest("POST", "/push/notifications", json=request)
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res["installations"]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Record file reader module
+"""
+import csv
+import gzip
+import io
+import json
+
+_FORMATS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "ndjson",
+    ".csv": "csv"
+}
+
+
+def guess_format(path):
+    # type: (str) -> str
+    """
+    Guess file format from file extension (".gz" is ignored).
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: "ndjson" or "csv"
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    for ext, format in _FORMATS.items():
+        if name.endswith(ext):
+            return format
+    raise ValueError("Can't guess format of {}, specify format".format(path))
+
+
+def _open(path):
+    # type: (str) -> Any
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def read_ndjson(path, loads=json.loads, encoding="utf-8"):
+    # type: (str, Callable, str) -> Iterator[dict]
+    """
+    Read NDJSON (newline delimited JSON) file lazily. Empty lines are skipped.
+    File is decompressed if the path ends with ".gz".
+
+    Args:
+        path (str): File path
+        loads (Callable): JSON decoder (optional, default: json.loads)
+        encoding (str): Encoding (optional, default="utf-8")
+
+    Returns:
+        Iterator[dict]: Iterator of JSON objects
+    """
+    with _open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield loads(line.decode(encoding))
+
+
+def read_csv(path, encoding="utf-8"):
+    # type: (str, str) -> Iterator[dict]
+    """
+    Read CSV file with header line lazily. All values are str.
+    File is decompressed if the path ends with ".gz".
+
+    Args:
+        path (str): File path
+        encoding (str): Encoding (optional, default="utf-8")
+
+    Returns:
+        Iterator[dict]: Iterator of dict of column name and value
+    """
+    with _open(path) as f:
+        if str is bytes:  # Python 2: csv module does not support unicode
+            for row in csv.DictReader(f):
+                yield {k.decode(encoding): v.decode(encoding) if v is not None else None for k, v in row.items()}
+        else:
+            for row in csv.DictReader(io.TextIOWrapper(f, encoding=encoding, newline="")):
+                yield row
+
+
+def read_records(path, format=None, loads=json.loads, encoding="utf-8"):
+    # type: (str, str, Callable, str) -> Iterator[dict]
+    """
+    Read NDJSON or CSV file lazily.
+
+    Args:
+        path (str): File path
+        format (str): "ndjson" or "csv" (optional, default: guessed from file extension)
+        loads (Callable): JSON decoder of NDJSON (optional, default: json.loads)
+        encoding (str): Encoding (optional, default="utf-8")
+
+    Returns:
+        Iterator[dict]: Iterator of records
+    """
+    format = format or guess_format(path)
+    if format == "ndjson":
+        return read_ndjson(path, loads, encoding)
+    if format == "csv":
+        return read_csv(path, encoding)
+    raise ValueError("Unsupported format: {}".format(format))
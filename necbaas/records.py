@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Compact record module
+"""
+import json
+import re
+from operator import itemgetter
+
+SYSTEM_FIELDS = ("_id", "createdAt", "updatedAt", "etag")
+# type: tuple
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class Record(tuple):
+    """
+    Compact read-only record of JSON object, base class of record types created by make_record_type().
+
+    Values are stored in a tuple, without per-instance dict.
+    Fields can be accessed by attribute (if the name is valid identifier) or by name (record["a.b"]).
+    ACL is stored as compact JSON string (shared by records of same ACL), and decoded on access.
+    """
+
+    __slots__ = ()
+
+    _fields = ()
+    # type: tuple
+
+    _index = {}
+    # type: dict
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, slice)):
+            return tuple.__getitem__(self, key)
+        return tuple.__getitem__(self, self._index[key])
+
+    def get(self, key, default=None):
+        # type: (str, Any) -> Any
+        """
+        Get field value.
+
+        Args:
+            key (str): Field name
+            default (Any): Default value if the field is missing or None
+
+        Returns:
+            Any: Value
+        """
+        if key == "ACL":
+            value = self.ACL
+        elif key in self._index:
+            value = tuple.__getitem__(self, self._index[key])
+        else:
+            return default
+        return default if value is None else value
+
+    @property
+    def ACL(self):
+        # type: () -> dict
+        """
+        ACL (decoded on each access).
+        """
+        acl = tuple.__getitem__(self, 0)
+        return json.loads(acl) if acl is not None else None
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Convert to dict. Missing fields are omitted.
+
+        Returns:
+            dict: JSON object (dotted fields are not nested)
+        """
+        result = {}
+        for name, value in zip(self._fields, self):
+            if value is not None:
+                result[name] = value
+        if "_acl" in result:
+            result["ACL"] = json.loads(result.pop("_acl"))
+        return result
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(name, value) for name, value in zip(self._fields, self) if name != "_acl"))
+
+
+class RecordType(object):
+    """
+    Factory of compact records, see make_record_type().
+
+    Attributes:
+        fields (tuple): User fields
+        record_class (type): Record class
+        projection (dict): Projection to request the fields
+    """
+
+    def __init__(self, fields, name="Record", system_fields=True):
+        # type: (list, str, bool) -> None
+        self.fields = tuple(fields)
+        all_fields = ("_acl",) + (SYSTEM_FIELDS if system_fields else ("_id",))
+        all_fields += tuple(f for f in self.fields if f not in all_fields)
+        self._paths = [("ACL",)] + [tuple(f.split(".")) for f in all_fields[1:]]
+        self._acl_strings = {}
+
+        attrs = {
+            "__slots__": (),
+            "_fields": all_fields,
+            "_index": {f: i for i, f in enumerate(all_fields)}
+        }
+        for i, f in enumerate(all_fields):
+            if i > 0 and _IDENTIFIER.match(f) and not hasattr(Record, f):
+                attrs[f] = property(itemgetter(i))
+        self.record_class = type(str(name), (Record,), attrs)
+
+        self.projection = {f: 1 for f in all_fields[1:]}
+        self.projection["ACL"] = 1
+
+    def __call__(self, obj):
+        # type: (dict) -> Record
+        """
+        Create record from JSON object.
+
+        Args:
+            obj (dict): JSON object
+
+        Returns:
+            Record: Record
+        """
+        values = []
+        for path in self._paths:
+            value = obj
+            for key in path:
+                if isinstance(value, dict):
+                    value = value.get(key)
+                else:
+                    value = None
+                    break
+            values.append(value)
+
+        acl = values[0]
+        if acl is not None:
+            text = json.dumps(acl, separators=(",", ":"), sort_keys=True)
+            values[0] = self._acl_strings.setdefault(text, text)
+        return tuple.__new__(self.record_class, values)
+
+
+def make_record_type(fields, name="Record", system_fields=True):
+    # type: (list, str, bool) -> RecordType
+    """
+    Create compact record type of fixed fields.
+
+    Examples:
+        ::
+
+            Product = necbaas.make_record_type(["name", "price", "stock.count"], "Product")
+            for product in bucket.query_records(Product, limit=-1):
+                print(product.name, product["stock.count"], product.ACL)
+
+    Args:
+        fields (list): List of user field names. Dotted name (ex. "a.b") can be used for nested field.
+        name (str): Class name of records (default: "Record")
+        system_fields (bool): Include system fields _id, createdAt, updatedAt, etag and ACL (default: True).
+            If False, only _id and ACL are included.
+
+    Returns:
+        RecordType: Record type, callable to create record from JSON object
+    """
+    return RecordType(fields, name, system_fields)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Retry policy module
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+
+class RetryPolicy(object):
+    """
+    Retry policy of REST API call.
+
+    Failed requests are retried with capped exponential backoff and full jitter,
+    i.e. random delay between 0 and min(max_backoff, backoff_factor * 2 ** retry_count).
+    If the response has 'Retry-After' header, the delay specified by the server is used.
+
+    Examples:
+        ::
+
+            service.retry_policy = necbaas.RetryPolicy(max_retries=5, budget=30)
+
+    Args:
+        max_retries (int): Max retry count per call (default: 3)
+        statuses (list): Retryable HTTP status codes (default: 429, 502, 503, 504)
+        methods (list): Retryable HTTP methods (default: GET, PUT, DELETE)
+        backoff_factor (float): Base delay in seconds (default: 0.5)
+        max_backoff (float): Max delay of each retry in seconds (default: 30)
+        respect_retry_after (bool): Use Retry-After header (default: True)
+        budget (float): Max total delay of retries per call in seconds (default: None, unlimited)
+        retry_on_connection_error (bool): Retry on connection error or timeout (default: True)
+
+    Attributes:
+        Same as args.
+    """
+
+    DEFAULT_STATUSES = (429, 502, 503, 504)
+    # type: tuple
+
+    DEFAULT_METHODS = ("GET", "PUT", "DELETE")
+    # type: tuple
+
+    def __init__(self, max_retries=3, statuses=DEFAULT_STATUSES, methods=DEFAULT_METHODS, backoff_factor=0.5,
+                 max_backoff=30, respect_retry_after=True, budget=None, retry_on_connection_error=True):
+        # type: (int, list, list, float, float, bool, float, bool) -> None
+        self.max_retries = max_retries
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.respect_retry_after = respect_retry_after
+        self.budget = budget
+        self.retry_on_connection_error = retry_on_connection_error
+
+    @staticmethod
+    def from_config(config):
+        # type: (dict) -> RetryPolicy
+        """
+        Create retry policy from 'retry' service parameter.
+
+        Args:
+            config (dict): Retry parameters, must have following dict format (all optional)::
+
+                maxRetries: Max retry count per call
+                statuses: List of retryable HTTP status codes
+                methods: List of retryable HTTP methods
+                backoffFactor: Base delay in seconds
+                maxBackoff: Max delay of each retry in seconds
+                respectRetryAfter: Use Retry-After header
+                budget: Max total delay of retries per call in seconds
+                retryOnConnectionError: Retry on connection error or timeout
+
+        Returns:
+            RetryPolicy: Retry policy
+        """
+        keys = {
+            "maxRetries": "max_retries",
+            "statuses": "statuses",
+            "methods": "methods",
+            "backoffFactor": "backoff_factor",
+            "maxBackoff": "max_backoff",
+            "respectRetryAfter": "respect_retry_after",
+            "budget": "budget",
+            "retryOnConnectionError": "retry_on_connection_error"
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key not in keys:
+                raise ValueError("Unknown retry parameter: " + key)
+            kwargs[keys[key]] = value
+        return RetryPolicy(**kwargs)
+
+    def get_backoff(self, retry_count):
+        # type: (int) -> float
+        """
+        Get backoff delay with full jitter.
+
+        Args:
+            retry_count (int): Number of retries already done
+
+        Returns:
+            float: Delay in seconds
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** retry_count)))
+
+    def get_retry_delay(self, method, retry_count, elapsed, status=None, retry_after=None, error=False):
+        # type: (str, int, float, int, str, bool) -> float or None
+        """
+        Decide whether to retry and get delay.
+
+        Args:
+            method (str): HTTP method
+            retry_count (int): Number of retries already done in this call
+            elapsed (float): Total delay of retries already done in this call (seconds)
+            status (int): HTTP status code (None if no response)
+            retry_after (str): Value of Retry-After header (optional)
+            error (bool): Connection error or timeout
+
+        Returns:
+            float: Delay in seconds before retry, or None if the request must not be retried.
+        """
+        if retry_count >= self.max_retries or method.upper() not in self.methods:
+            return None
+        if error:
+            if not self.retry_on_connection_error:
+                return None
+        elif status not in self.statuses:
+            return None
+
+        delay = None
+        if self.respect_retry_after and retry_after is not None:
+            delay = self.parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.get_backoff(retry_count)
+
+        if self.budget is not None and elapsed + delay > self.budget:
+            return None
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value):
+        # type: (str) -> float or None
+        """
+        Parse Retry-After header value (delay-seconds or HTTP-date).
+
+        Args:
+            value (str): Header value
+
+        Returns:
+            float: Delay in seconds, or None if the value is invalid.
+        """
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - time.time())
+
+
+class RetryStats(object):
+    """
+    Retry statistics of service, for metrics.
+
+    Attributes:
+        requests (int): Number of REST API calls
+        retries (int): Total number of retries
+        retried_requests (int): Number of calls retried at least once
+        exhausted (int): Number of calls failed after retries
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.retried_requests = 0
+        self.exhausted = 0
+
+    def record(self, retries, success):
+        # type: (int, bool) -> None
+        """
+        Record result of a call.
+
+        Args:
+            retries (int): Number of retries in the call
+            success (bool): True if the call succeeded
+        """
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            if retries > 0:
+                self.retried_requests += 1
+                if not success:
+                    self.exhausted += 1
+
+    def reset(self):
+        # type: () -> None
+        """
+        Reset statistics.
+        """
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+            self.retried_requests = 0
+            self.exhausted = 0
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Get statistics as dict.
+
+        Returns:
+            dict: Statistics
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "retriedRequests": self.retried_requests,
+                "exhausted": self.exhausted
+            }
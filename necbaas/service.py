@@ -11,11 +11,32 @@ import copy
 import json as json_lib
 import yaml
 import time
+import threading
 from requests import Response
+from .retry import RetryPolicy, RetryStats
+from .codec import JsonCodec, get_codec
+from .transport import Transport, RequestsTransport
+from .cache import TTLCache, QueryCache
+from .etag_cache import ETagCacheTransport
+from requests.adapters import DEFAULT_POOLSIZE
 
 _is_py2 = (sys.version_info[0] == 2)
 
 
+class _RequestTemplate(object):
+    """
+    Pre-computed request arguments common to all requests of a service.
+    """
+    __slots__ = ("url_prefix", "headers", "args", "timeout")
+
+    def __init__(self, url_prefix, headers, args, timeout):
+        # type: (str, dict, dict, float or tuple) -> None
+        self.url_prefix = url_prefix
+        self.headers = headers
+        self.args = args
+        self.timeout = timeout
+
+
 class Service(object):
     """
     BaaS access service class.
@@ -44,13 +65,60 @@ class Service(object):
             proxy: (optional)
                 http: Http Proxy (host:port)
                 https: Https Proxy (host:port)
+            connectionPool: (optional)
+                poolConnections: Number of host pools to cache (default: 10)
+                poolMaxsize: Max number of keep-alive connections per host (default: 10)
+                idleTimeout: Idle time in seconds before connections are recycled (default: none)
+                shared: Share connection pool with other services of same pool settings (default: False)
+            retry: Retry policy (optional, see RetryPolicy.from_config()). No retry if not specified.
+                maxRetries: Max retry count per call (default: 3)
+                statuses: Retryable HTTP status codes (default: [429, 502, 503, 504])
+                methods: Retryable HTTP methods (default: [GET, PUT, DELETE])
+                backoffFactor: Base delay of exponential backoff in seconds (default: 0.5)
+                maxBackoff: Max delay of each retry in seconds (default: 30)
+                respectRetryAfter: Use Retry-After header (default: True)
+                budget: Max total delay of retries per call in seconds (default: unlimited)
+            jsonCodec: JSON codec name, "json", "orjson" or "ujson" (optional, default: json)
+            writeCoalescing: Coalesce concurrent ObjectBucket insert/update/remove calls into
+                batch requests (optional, see ObjectBucket.insert()). Not coalesced if not specified.
+                maxDelay: Max delay in seconds to wait for other calls (default: 0.005)
+                maxDocs: Max number of calls in one batch request (default: 100)
+                maxBytes: Max serialized size of one batch request (default: 1MB)
+            queryCache: Cache ObjectBucket query results (optional, see QueryCache). Not cached if not specified.
+                Cached results of a bucket are invalidated on write by ObjectBucket of this service.
+                ttl: Time to live of entries in seconds (default: 60)
+                maxEntries: Max number of entries (default: 1000)
+                maxBytes: Max total size of cached response bodies (default: 16MB)
+            etagCache: Cache GET responses with ETag and revalidate them with If-None-Match
+                (optional, see ETagCacheTransport). Not cached if not specified.
+                policies: Dict of path prefix and policy (default: metadata of files, groups, buckets and users)
+                    maxAge: Seconds to use cached response without revalidation (default: 0)
+                    match: Regular expression which path must match to be cached (optional)
+                ttl: Max time to keep entries in seconds (default: 3600)
+                maxEntries: Max number of entries (default: 1000)
+                maxBytes: Max total size of cached response bodies (default: 16MB)
+
+        transport (Transport): HTTP transport (optional).
+            If not specified, RequestsTransport is created with 'connectionPool' parameter.
 
     Attributes:
         param (dict): Service parameters, passed by constructor argument.
+            To change parameters after construction, set new dict to this attribute
+            (request template is rebuilt only when this attribute or settings below are set).
         session_token (str): Session Token
         session_token_expire (int): Session Token expire time (unix epoch seconds)
         verify_server_cert (bool): Verify server cert (default: True)
         logger (logging.Logger): Logger. You can change log level with setLevel()
+        retry_policy (RetryPolicy): Retry policy (None: no retry)
+        retry_stats (RetryStats): Retry statistics for metrics
+        json_codec (JsonCodec): JSON codec to encode request and decode response
+        write_coalescing (dict): Write coalescing settings ('writeCoalescing' parameter), None if disabled
+        count_cache (TTLCache): Cache of ObjectBucket.count() results (used if cache_ttl is specified)
+        query_cache (QueryCache): Cache of ObjectBucket query results ('queryCache' parameter), None if disabled.
+            Call query_cache.to_dict() to get hit/miss statistics.
+        etag_cache (ETagCacheTransport): ETag revalidation cache ('etagCache' parameter), None if disabled.
+            Call etag_cache.to_dict() to get statistics.
+        transport (Transport): HTTP transport
     """
 
     _config_files = (
@@ -70,8 +138,14 @@ class Service(object):
     _default_timeout = None
     # type: float or tuple
 
-    def __init__(self, param=None):
-        # type: (dict) -> None
+    _shared_transports = {}
+    # type: dict
+
+    _shared_transports_lock = threading.Lock()
+    # type: threading.Lock
+
+    def __init__(self, param=None, transport=None):
+        # type: (dict, Transport) -> None
         """
         Constructor.
         """
@@ -108,6 +182,18 @@ class Service(object):
         self.verify_server_cert = True
         self.logger = logging.getLogger("necbaas")
         self.logger.setLevel(logging.WARNING)
+        self.transport = transport
+        self._own_transport = transport is None
+        self.retry_policy = RetryPolicy.from_config(param["retry"]) if param.get("retry") is not None else None
+        self.retry_stats = RetryStats()
+        self.json_codec = get_codec(param["jsonCodec"]) if "jsonCodec" in param else JsonCodec()
+        self.write_coalescing = param.get("writeCoalescing")
+        self._coalescers = {}
+        self._coalescers_lock = threading.Lock()
+        self.count_cache = TTLCache()
+        self.query_cache = QueryCache.from_config(param["queryCache"]) \
+            if param.get("queryCache") is not None else None
+        self.etag_cache = None
 
     @staticmethod
     def _read_config_file():
@@ -152,13 +238,30 @@ class Service(object):
         Returns:
             Response: Response
         """
+        args = self._build_request_args(path, query=query, data=data, json=json, headers=headers, stream=stream)
+        return self._do_request(method, **args)
+
+    def _build_request_args(self, path, query=None, data=None, json=None, headers=None, stream=False):
+        # type: (str, dict, Any, dict, dict, bool) -> dict
+        """
+        Build request arguments (url, headers, body etc.) for REST API call.
+        The arguments are keyword arguments of 'requests' library.
+
+        Args:
+            See execute_rest().
+
+        Returns:
+            dict: Request arguments
+        """
         if path.startswith("/"):
             path = path[1:]
 
-        base_url = self.param["baseUrl"].encode("utf-8") if _is_py2 else self.param["baseUrl"]
-        args = {
-            "url": "{}/1/{}/{}".format(base_url, self.param["tenantId"], path)
-        }
+        template = self._template
+        if template is None or template.timeout is not Service._default_timeout:
+            template = self._build_request_template()
+
+        args = template.args.copy()
+        args["url"] = "{}{}".format(template.url_prefix, path)  # format() works with unicode path on py2
 
         # query parameters
         if query is not None:
@@ -166,64 +269,235 @@ class Service(object):
 
         # headers
         if headers is None:
-            headers = {}
+            headers = template.headers.copy()
         else:
             headers = copy.copy(headers)  # shallow copy, do not change original
+            headers.update(template.headers)
         args["headers"] = headers
 
-        headers["X-Application-Id"] = self.param["appId"]
-        headers["X-Application-Key"] = self.param["appKey"]
-
-        if self.session_token is not None:
-            headers["X-Session-Token"] = self.session_token
-
         # set data and decide content-type
         content_type = None
         if data is not None:
             args["data"] = data
             content_type = "application/octet-stream"
         elif json is not None:
-            args["json"] = json
+            if type(self.json_codec) is JsonCodec:
+                args["json"] = json  # encoded by requests library
+            else:
+                args["data"] = self.json_codec.dumps_bytes(json)
+                content_type = "application/json"
 
         if content_type is not None and "Content-Type" not in headers:
             headers["Content-Type"] = content_type
 
+        if stream:
+            args["stream"] = True
+
+        return args
+
+    def _build_request_template(self):
+        # type: () -> _RequestTemplate
+        """
+        Build request template, the part of request arguments common to all requests.
+        The template is cached until param, session token or other settings are changed.
+        """
+        base_url = self.param["baseUrl"].encode("utf-8") if _is_py2 else self.param["baseUrl"]
+        url_prefix = "{}/1/{}/".format(base_url, self.param["tenantId"])
+
+        headers = {
+            "X-Application-Id": self.param["appId"],
+            "X-Application-Key": self.param["appKey"]
+        }
+        if self.session_token is not None:
+            headers["X-Session-Token"] = self.session_token
+
+        args = {}
         if "proxy" in self.param:
             args["proxies"] = self.param["proxy"]
 
         if not self.verify_server_cert:
             args["verify"] = False
 
-        if stream:
-            args["stream"] = True
+        timeout = Service._default_timeout
+        if timeout is not None:
+            args["timeout"] = timeout
 
-        if Service._default_timeout is not None:
-            args["timeout"] = Service._default_timeout
+        template = _RequestTemplate(url_prefix, headers, args, timeout)
+        self._template = template
+        return template
 
-        return self._do_request(method, **args)
+    @property
+    def param(self):
+        # type: () -> dict
+        return self._param
+
+    @param.setter
+    def param(self, param):
+        # type: (dict) -> None
+        self._param = param
+        self._template = None
+
+    @property
+    def session_token(self):
+        # type: () -> str
+        return self._session_token
+
+    @session_token.setter
+    def session_token(self, session_token):
+        # type: (str) -> None
+        self._session_token = session_token
+        self._template = None
+
+    @property
+    def verify_server_cert(self):
+        # type: () -> bool
+        return self._verify_server_cert
+
+    @verify_server_cert.setter
+    def verify_server_cert(self, verify_server_cert):
+        # type: (bool) -> None
+        self._verify_server_cert = verify_server_cert
+        self._template = None
 
     def _do_request(self, method, **kwargs):
         # type: (str, **dict) -> Response
         self.logger.debug("HTTP request: method=%s, url=%s", method, kwargs["url"])
         method = method.upper()
-        if method == 'GET':
-            res = requests.get(**kwargs)
-        elif method == 'POST':
-            res = requests.post(**kwargs)
-        elif method == 'PUT':
-            res = requests.put(**kwargs)
-        elif method == 'DELETE':
-            res = requests.delete(**kwargs)
-        else:
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
             raise Exception('Unsupported method: ' + method)
 
-        status = res.status_code
-        if status >= 400:
-            self.logger.warning("HTTP request error: status=%d, body=%s", status, res.content)
-            res.raise_for_status()
+        policy = self.retry_policy
+        if policy is not None and not self._is_rewindable(kwargs.get("data")):
+            policy = None
+
+        body_pos = self._get_body_position(kwargs.get("data"))
+        retries = 0
+        elapsed = 0.0
+        while True:
+            try:
+                res = self._get_request_transport().request(method, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = None if policy is None else policy.get_retry_delay(method, retries, elapsed, error=True)
+                if delay is None:
+                    self.retry_stats.record(retries, False)
+                    raise
+                self.logger.warning("HTTP request failed, retry after %.3f sec: %s", delay, e)
+            else:
+                status = res.status_code
+                if status < 400:
+                    self.logger.debug("HTTP response: status=%d", status)
+                    self.retry_stats.record(retries, True)
+                    return res
+
+                delay = None if policy is None else \
+                    policy.get_retry_delay(method, retries, elapsed, status=status,
+                                           retry_after=res.headers.get("Retry-After"))
+                if delay is None:
+                    self.logger.warning("HTTP request error: status=%d, body=%s", status, res.content)
+                    self.retry_stats.record(retries, False)
+                    res.raise_for_status()
+                self.logger.warning("HTTP request error: status=%d, retry after %.3f sec", status, delay)
+                res.close()
+
+            time.sleep(delay)
+            elapsed += delay
+            retries += 1
+            if body_pos is not None:
+                kwargs["data"].seek(body_pos)
+
+    @staticmethod
+    def _is_rewindable(data):
+        # type: (Any) -> bool
+        """
+        Check request body can be sent again on retry.
+        """
+        if data is None or not hasattr(data, "read"):
+            return True
+        try:
+            return data.seekable()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _get_body_position(data):
+        # type: (Any) -> int or None
+        if data is None or not hasattr(data, "read"):
+            return None
+        try:
+            return data.tell()
+        except Exception:
+            return None
+
+    def _get_transport(self):
+        # type: () -> Transport
+        if self.transport is not None:
+            return self.transport
+
+        config = self.param.get("connectionPool") or {}
+        pool_args = self._get_pool_args()
+
+        if config.get("shared", False):
+            with Service._shared_transports_lock:
+                transport = Service._shared_transports.get(pool_args)
+                if transport is None:
+                    transport = RequestsTransport(*pool_args)
+                    Service._shared_transports[pool_args] = transport
+            self._own_transport = False
         else:
-            self.logger.debug("HTTP response: status=%d", status)
-        return res
+            transport = RequestsTransport(*pool_args)
+            self._own_transport = True
+
+        self.transport = transport
+        return transport
+
+    def _get_request_transport(self):
+        # type: () -> Transport
+        """
+        Get transport to send request, wrapped with ETag cache if enabled.
+        """
+        transport = self._get_transport()
+        config = self.param.get("etagCache")
+        if config is None:
+            return transport
+
+        cache = self.etag_cache
+        if cache is None:
+            base_url = self.param["baseUrl"].encode("utf-8") if _is_py2 else self.param["baseUrl"]
+            cache = ETagCacheTransport.from_config(transport, "{}/1/{}".format(base_url, self.param["tenantId"]),
+                                                   config)
+            self.etag_cache = cache
+        cache.transport = transport  # transport may be re-created after close()
+        return cache
+
+    def _get_pool_args(self):
+        # type: () -> (int, int, float)
+        """
+        Get connection pool settings.
+
+        Returns:
+            (int, int, float): Tuple of pool_connections, pool_maxsize and idle_timeout
+        """
+        config = self.param.get("connectionPool") or {}
+        return (config.get("poolConnections", DEFAULT_POOLSIZE),
+                config.get("poolMaxsize", DEFAULT_POOLSIZE),
+                config.get("idleTimeout"))
+
+    def close(self):
+        # type: () -> None
+        """
+        Close keep-alive connections of this service.
+        Shared connection pool and transport passed by constructor are not closed.
+        Pending coalesced writes are sent before closing.
+        """
+        with self._coalescers_lock:
+            coalescers = list(self._coalescers.values())
+            self._coalescers = {}
+        for coalescer in coalescers:
+            coalescer.close()
+
+        if self.transport is not None and self._own_transport:
+            self.transport.close()
+            self.transport = None
 
     def load_session_token(self):
         # type: () -> None
@@ -0,0 +1,1226 @@
+# -*- coding: utf-8 -*-
+"""
+Testing support module.
+
+FakeBaasServer is an in-process stand-in of BaaS server, which implements
+the subset of REST API used by this SDK (objects, files, users, login, groups and buckets).
+Data is stored in memory. ACL and authentication are not checked.
+
+It can be used with LocalTransport (no network), or as a local HTTP server::
+
+    server = FakeBaasServer()
+
+    # in-process
+    service = server.create_service()
+
+    # HTTP server
+    with server.serve() as http_server:
+        service = necbaas.Service(server.get_param(http_server.base_url))
+"""
+import copy
+import datetime
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from .service import Service
+from .transport import LocalTransport, LocalRequest, make_response
+
+_number_types = (int, float) if str is not bytes else (int, long, float)  # noqa: F821
+_string_types = (str,) if str is not bytes else (str, unicode)  # noqa: F821
+
+
+class FakeBaasError(Exception):
+    """
+    Error response of FakeBaasServer.
+
+    Args:
+        status (int): HTTP status code
+        message (str): Error message
+        reason_code (str): Reason code (optional)
+    """
+
+    def __init__(self, status, message, reason_code=None):
+        # type: (int, str, str) -> None
+        super(FakeBaasError, self).__init__(message)
+        self.status = status
+        self.reason_code = reason_code
+
+    def to_json(self):
+        # type: () -> dict
+        body = {"error": str(self)}
+        if self.reason_code is not None:
+            body["reasonCode"] = self.reason_code
+        return body
+
+
+def _now():
+    # type: () -> str
+    now = datetime.datetime.utcnow()
+    return now.strftime("%Y-%m-%dT%H:%M:%S.") + "{:03d}Z".format(now.microsecond // 1000)
+
+
+def _new_etag():
+    # type: () -> str
+    return str(uuid.uuid4())
+
+
+def _default_acl(owner=None):
+    # type: (str) -> dict
+    return {"owner": owner, "r": [], "w": [], "c": [], "u": [], "d": [], "admin": []}
+
+
+def _load_json_param(value):
+    # type: (Any) -> Any
+    """
+    Decode query parameter in JSON (where, projection). Already decoded value is returned as is.
+    """
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise FakeBaasError(400, "Bad JSON parameter")
+
+
+# ----------------------------------------------------------------------
+# Query engine (subset of MongoDB query)
+# ----------------------------------------------------------------------
+
+_MISSING = object()
+
+
+def _get_field(doc, path):
+    # type: (dict, str) -> Any
+    value = doc
+    for key in path.split("."):
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            return _MISSING
+    return value
+
+
+def _type_rank(value):
+    # type: (Any) -> int
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, _number_types):
+        return 1
+    if isinstance(value, _string_types):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    return 6
+
+
+def _sort_key(value):
+    # type: (Any) -> tuple
+    rank = _type_rank(value)
+    if rank in (0, 3, 4, 6):
+        return rank, json.dumps(value if value is not _MISSING else None, sort_keys=True)
+    return rank, value
+
+
+def _compare(value, op, operand):
+    # type: (Any, str, Any) -> bool
+    if value is _MISSING or _type_rank(value) != _type_rank(operand):
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    return value <= operand
+
+
+def _values_of(value):
+    # type: (Any) -> list
+    """Values to test for a field, array elements match individually."""
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _match_operator(value, op, operand, condition):
+    # type: (Any, str, Any, dict) -> bool
+    if op == "$eq":
+        return any(v == operand for v in _values_of(value)) or (operand is None and value is _MISSING)
+    if op == "$ne":
+        return not _match_operator(value, "$eq", operand, condition)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        return any(_compare(v, op, operand) for v in _values_of(value))
+    if op == "$in":
+        return any(_match_operator(value, "$eq", o, condition) for o in operand)
+    if op == "$nin":
+        return not _match_operator(value, "$in", operand, condition)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$regex":
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        return any(isinstance(v, _string_types) and re.search(operand, v, flags) is not None
+                   for v in _values_of(value))
+    if op == "$options":
+        return True
+    if op == "$not":
+        return not _match_value(value, operand)
+    if op == "$all":
+        return isinstance(value, list) and all(o in value for o in operand)
+    if op == "$size":
+        return isinstance(value, list) and len(value) == operand
+    raise FakeBaasError(400, "Unsupported operator: " + op)
+
+
+def _match_value(value, condition):
+    # type: (Any, Any) -> bool
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        return all(_match_operator(value, op, operand, condition) for op, operand in condition.items())
+    return _match_operator(value, "$eq", condition, {})
+
+
+def match_query(doc, where):
+    # type: (dict, dict) -> bool
+    """
+    Test the document matches query conditions.
+
+    Args:
+        doc (dict): Document
+        where (dict): Query conditions
+
+    Returns:
+        bool: True if matched
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_query(doc, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(match_query(doc, c) for c in condition):
+                return False
+        elif key == "$nor":
+            if any(match_query(doc, c) for c in condition):
+                return False
+        elif not _match_value(_get_field(doc, key), condition):
+            return False
+    return True
+
+
+def sort_documents(docs, order):
+    # type: (list, list) -> list
+    """
+    Sort documents.
+
+    Args:
+        docs (list): Documents
+        order (list): List of (field, ascending) tuple
+
+    Returns:
+        list: Sorted documents
+    """
+    for field, ascending in reversed(order):
+        docs = sorted(docs, key=lambda d: _sort_key(_get_field(d, field)), reverse=not ascending)
+    return docs
+
+
+def _parse_order(order):
+    # type: (str) -> list
+    result = []
+    for field in order.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        if field.startswith("-"):
+            result.append((field[1:], False))
+        else:
+            result.append((field, True))
+    return result
+
+
+def project_document(doc, projection):
+    # type: (dict, dict) -> dict
+    """
+    Apply projection to document.
+
+    Args:
+        doc (dict): Document
+        projection (dict): Projection, inclusion ({field: 1}) or exclusion ({field: 0})
+
+    Returns:
+        dict: Projected document
+    """
+    if not projection:
+        return doc
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    exclude = [k for k, v in projection.items() if not v and k != "_id"]
+    if include and exclude:
+        raise FakeBaasError(400, "Projection cannot have a mix of inclusion and exclusion")
+
+    if include:
+        result = {}
+        for path in include:
+            value = _get_field(doc, path)
+            if value is _MISSING:
+                continue
+            target = result
+            keys = path.split(".")
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+
+    result = copy.deepcopy(doc)
+    for path in exclude + (["_id"] if not projection.get("_id", 1) else []):
+        target = result
+        keys = path.split(".")
+        for key in keys[:-1]:
+            target = target.get(key) if isinstance(target, dict) else None
+        if isinstance(target, dict):
+            target.pop(keys[-1], None)
+    return result
+
+
+def _eval_expression(doc, expr):
+    # type: (dict, Any) -> Any
+    if isinstance(expr, _string_types) and expr.startswith("$"):
+        value = _get_field(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict):
+        return {k: _eval_expression(doc, v) for k, v in expr.items()}
+    return expr
+
+
+def _group_documents(docs, spec):
+    # type: (list, dict) -> list
+    groups = {}
+    keys = []
+    for doc in docs:
+        key = _eval_expression(doc, spec["_id"])
+        hashable = json.dumps(key, sort_keys=True)
+        if hashable not in groups:
+            groups[hashable] = (key, [])
+            keys.append(hashable)
+        groups[hashable][1].append(doc)
+
+    results = []
+    for hashable in keys:
+        key, members = groups[hashable]
+        result = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            values = [_eval_expression(d, expr) for d in members]
+            numbers = [v for v in values if isinstance(v, _number_types) and not isinstance(v, bool)]
+            if op == "$sum":
+                result[field] = sum(numbers)
+            elif op == "$avg":
+                result[field] = float(sum(numbers)) / len(numbers) if numbers else None
+            elif op == "$min":
+                result[field] = min(values, key=_sort_key) if values else None
+            elif op == "$max":
+                result[field] = max(values, key=_sort_key) if values else None
+            elif op == "$first":
+                result[field] = values[0] if values else None
+            elif op == "$last":
+                result[field] = values[-1] if values else None
+            elif op == "$push":
+                result[field] = values
+            else:
+                raise FakeBaasError(400, "Unsupported accumulator: " + op)
+        results.append(result)
+    return results
+
+
+def aggregate_documents(docs, pipeline):
+    # type: (list, list) -> list
+    """
+    Run aggregation pipeline (subset: $match, $sort, $skip, $limit, $project, $group, $count, $unwind).
+
+    Args:
+        docs (list): Documents
+        pipeline (list): Pipeline
+
+    Returns:
+        list: Results
+    """
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if match_query(d, spec)]
+        elif name == "$sort":
+            docs = sort_documents(docs, [(k, v > 0) for k, v in spec.items()])
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [project_document(d, spec) for d in docs]
+        elif name == "$group":
+            docs = _group_documents(docs, spec)
+        elif name == "$count":
+            docs = [{spec: len(docs)}]
+        elif name == "$unwind":
+            path = spec if isinstance(spec, _string_types) else spec["path"]
+            field = path[1:]
+            unwound = []
+            for d in docs:
+                values = _get_field(d, field)
+                if isinstance(values, list):
+                    for v in values:
+                        item = copy.deepcopy(d)
+                        item[field] = v
+                        unwound.append(item)
+            docs = unwound
+        else:
+            raise FakeBaasError(400, "Unsupported stage: " + name)
+    return docs
+
+
+def _apply_update(doc, data):
+    # type: (dict, dict) -> dict
+    """
+    Update document. If data has update operators ($set, $unset, $inc), they are applied,
+    otherwise user fields are replaced with data.
+    """
+    system = {k: doc[k] for k in ("_id", "createdAt", "updatedAt", "ACL", "etag") if k in doc}
+    if any(k.startswith("$") for k in data):
+        result = copy.deepcopy(doc)
+        for op, fields in data.items():
+            for key, value in fields.items():
+                if op == "$set":
+                    result[key] = value
+                elif op == "$unset":
+                    result.pop(key, None)
+                elif op == "$inc":
+                    result[key] = result.get(key, 0) + value
+                else:
+                    raise FakeBaasError(400, "Unsupported update operator: " + op)
+    else:
+        result = copy.deepcopy(data)
+    if "ACL" in data:
+        system["ACL"] = data["ACL"]
+    result.update(system)
+    return result
+
+
+# ----------------------------------------------------------------------
+# Server
+# ----------------------------------------------------------------------
+
+class _Tenant(object):
+    """Data of a tenant."""
+
+    def __init__(self):
+        self.buckets = {"object": {}, "file": {}}
+        self.objects = {}  # bucket name -> {oid: doc} (ordered by insertion)
+        self.files = {}  # bucket name -> {filename: (meta, data)}
+        self.users = {}  # user id -> user (with password)
+        self.sessions = {}  # session token -> user id
+        self.groups = {}  # group name -> group
+
+
+class FakeBaasServer(object):
+    """
+    In-process stand-in of BaaS server.
+
+    Implemented APIs:
+
+    - objects: query (where/order/skip/limit/count/projection/deleteMark), _query, _batch,
+      _aggregate (subset), insert, get, update, remove, remove with query
+    - files: query, create, update, download, remove, get/update metadata
+    - login, users, request_password_reset, groups, buckets, push/notifications
+
+    The instance is callable as handler of LocalTransport.
+
+    Args:
+        auto_create_buckets (bool): Create bucket automatically on first use (default: True).
+            If False, requests to bucket not created by Buckets.upsert() fail with 404.
+        default_limit (int): Default limit of object query (default: 100)
+        session_lifetime (int): Session token lifetime in seconds (default: 86400)
+
+    Attributes:
+        auto_create_buckets (bool): Create bucket automatically on first use
+        default_limit (int): Default limit of object query
+        request_count (int): Number of requests handled
+    """
+
+    def __init__(self, auto_create_buckets=True, default_limit=100, session_lifetime=86400):
+        # type: (bool, int, int) -> None
+        self.auto_create_buckets = auto_create_buckets
+        self.default_limit = default_limit
+        self.session_lifetime = session_lifetime
+        self.request_count = 0
+        self._tenants = {}
+        self._faults = []
+        self._batch_faults = []
+        self._lock = threading.RLock()
+        self._id_counter = itertools.count(random.randint(0, 1 << 32))
+        self._routes = [(method, re.compile("^" + pattern + "$"), getattr(self, name)) for method, pattern, name in [
+            ("POST", r"login", "_login"),
+            ("DELETE", r"login", "_logout"),
+            ("GET", r"users", "_query_users"),
+            ("POST", r"users", "_register_user"),
+            ("GET", r"users/([^/]+)", "_get_user"),
+            ("PUT", r"users/([^/]+)", "_update_user"),
+            ("DELETE", r"users/([^/]+)", "_remove_user"),
+            ("POST", r"request_password_reset", "_reset_password"),
+            ("GET", r"groups", "_query_groups"),
+            ("GET", r"groups/([^/]+)", "_get_group"),
+            ("PUT", r"groups/([^/]+)", "_upsert_group"),
+            ("DELETE", r"groups/([^/]+)", "_remove_group"),
+            ("PUT", r"groups/([^/]+)/addMembers", "_add_members"),
+            ("PUT", r"groups/([^/]+)/removeMembers", "_remove_members"),
+            ("GET", r"buckets/(object|file)", "_query_buckets"),
+            ("GET", r"buckets/(object|file)/([^/]+)", "_get_bucket"),
+            ("PUT", r"buckets/(object|file)/([^/]+)", "_upsert_bucket"),
+            ("DELETE", r"buckets/(object|file)/([^/]+)", "_remove_bucket"),
+            ("GET", r"objects/([^/]+)", "_query_objects"),
+            ("POST", r"objects/([^/]+)", "_insert_object"),
+            ("DELETE", r"objects/([^/]+)", "_remove_objects"),
+            ("POST", r"objects/([^/]+)/_query", "_long_query_objects"),
+            ("POST", r"objects/([^/]+)/_batch", "_batch"),
+            ("POST", r"objects/([^/]+)/_aggregate", "_aggregate"),
+            ("GET", r"objects/([^/]+)/([^/]+)", "_get_object"),
+            ("PUT", r"objects/([^/]+)/([^/]+)", "_update_object"),
+            ("DELETE", r"objects/([^/]+)/([^/]+)", "_remove_object"),
+            ("GET", r"files/([^/]+)", "_query_files"),
+            ("GET", r"files/([^/]+)/(.+)/meta", "_get_file_meta"),
+            ("PUT", r"files/([^/]+)/(.+)/meta", "_update_file_meta"),
+            ("POST", r"files/([^/]+)/(.+)", "_create_file"),
+            ("PUT", r"files/([^/]+)/(.+)", "_update_file"),
+            ("GET", r"files/([^/]+)/(.+)", "_download_file"),
+            ("DELETE", r"files/([^/]+)/(.+)", "_remove_file"),
+            ("POST", r"push/notifications", "_push"),
+        ]]
+
+    _PATH_RE = re.compile(r"^.*?/1/([^/]+)/(.*)$")
+
+    # ---- public interface ----
+
+    @staticmethod
+    def get_param(base_url="http://localhost/api", tenant_id="tenant1"):
+        # type: (str, str) -> dict
+        """
+        Get service parameters for this server.
+
+        Args:
+            base_url (str): Base URL (optional)
+            tenant_id (str): Tenant ID (optional)
+
+        Returns:
+            dict: Service parameters
+        """
+        return {
+            "baseUrl": base_url,
+            "tenantId": tenant_id,
+            "appId": "app1",
+            "appKey": "key1"
+        }
+
+    def create_transport(self):
+        # type: () -> LocalTransport
+        """
+        Create LocalTransport connected to this server.
+
+        Returns:
+            LocalTransport: Transport
+        """
+        return LocalTransport(self)
+
+    def create_service(self, tenant_id="tenant1", param=None):
+        # type: (str, dict) -> Service
+        """
+        Create Service connected to this server in-process (without network).
+
+        Args:
+            tenant_id (str): Tenant ID (optional)
+            param (dict): Additional service parameters (optional)
+
+        Returns:
+            Service: Service
+        """
+        service_param = self.get_param(tenant_id=tenant_id)
+        if param is not None:
+            service_param.update(param)
+        return Service(service_param, transport=self.create_transport())
+
+    def serve(self, host="127.0.0.1", port=0):
+        # type: (str, int) -> FakeBaasHttpServer
+        """
+        Start HTTP server in background thread.
+
+        Args:
+            host (str): Listen address (default: 127.0.0.1)
+            port (int): Listen port (default: 0, any free port)
+
+        Returns:
+            FakeBaasHttpServer: Running HTTP server. Call shutdown() or use 'with' statement to stop.
+        """
+        server = FakeBaasHttpServer(self, host, port)
+        server.start()
+        return server
+
+    def add_fault(self, method, pattern, status, count=1, headers=None, body=None):
+        # type: (str, str, int, int, dict, Any) -> None
+        """
+        Inject error responses, for testing retries.
+
+        Args:
+            method (str): HTTP method name, or None for any method
+            pattern (str): Regular expression searched in path (after '/1/{tenantId}/')
+            status (int): HTTP status code to respond
+            count (int): Number of errors (default: 1)
+            headers (dict): Response headers (optional)
+            body (Any): Response body (optional)
+        """
+        with self._lock:
+            self._faults.append([method, re.compile(pattern), status, count, headers, body])
+
+    def add_batch_fault(self, status=500, count=1):
+        # type: (int, int) -> None
+        """
+        Inject failures of batch operation items, for testing partial failure of _batch.
+        Next 'count' items of batch requests fail without being processed.
+
+        Args:
+            status (int): HTTP status code corresponding to the item result
+                (400: badRequest, 404: notFound, 409: conflict, others: serverError) (default: 500)
+            count (int): Number of failed items (default: 1)
+        """
+        with self._lock:
+            self._batch_faults.append([status, count])
+
+    def reset(self):
+        # type: () -> None
+        """
+        Clear all data and faults.
+        """
+        with self._lock:
+            self._tenants = {}
+            self._faults = []
+            self._batch_faults = []
+            self.request_count = 0
+
+    def __call__(self, req):
+        # type: (LocalRequest) -> Response
+        """
+        Handle request (LocalTransport handler).
+
+        Args:
+            req (LocalRequest): Request
+
+        Returns:
+            Response: Response
+        """
+        status, body, headers = self.handle(req)
+        return make_response(status, body, headers)
+
+    def handle(self, req):
+        # type: (LocalRequest) -> (int, Any, dict)
+        """
+        Handle request.
+
+        GET responses except objects have ETag header, and 304 is returned
+        if If-None-Match header matches (conditional GET).
+
+        Args:
+            req (LocalRequest): Request
+
+        Returns:
+            (int, Any, dict): Tuple of status, body and headers
+        """
+        status, body, headers = self._handle(req)
+        if req.method != "GET" or status != 200 or not isinstance(body, (dict, list)) \
+                or "/objects/" in req.path:
+            return status, body, headers
+
+        etag = '"{}"'.format(hashlib.md5(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest())
+        headers = dict(headers or {}, ETag=etag)
+        if req.headers.get("If-None-Match") == etag:
+            return 304, None, headers
+        return status, body, headers
+
+    def _handle(self, req):
+        # type: (LocalRequest) -> (int, Any, dict)
+        m = self._PATH_RE.match(req.path)
+        if m is None:
+            return 404, {"error": "Not found"}, None
+        tenant_id, path = m.groups()
+        path = path.lstrip("/")
+
+        with self._lock:
+            self.request_count += 1
+            fault = self._check_fault(req.method, path)
+            if fault is not None:
+                return fault
+
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                tenant = self._tenants[tenant_id] = _Tenant()
+
+            try:
+                for method, pattern, handler in self._routes:
+                    if method != req.method:
+                        continue
+                    route_match = pattern.match(path)
+                    if route_match is not None:
+                        result = handler(tenant, req, *route_match.groups())
+                        if len(result) == 2:
+                            return result[0], result[1], None
+                        return result
+                return 404, {"error": "Not found"}, None
+            except FakeBaasError as e:
+                return e.status, e.to_json(), None
+
+    def _check_fault(self, method, path):
+        # type: (str, str) -> (int, Any, dict) or None
+        for fault in self._faults:
+            fault_method, pattern, status, count, headers, body = fault
+            if (fault_method is None or fault_method == method) and pattern.search(path):
+                fault[3] -= 1
+                if fault[3] <= 0:
+                    self._faults.remove(fault)
+                return status, body if body is not None else {"error": "Injected fault"}, headers
+        return None
+
+    # ---- helpers ----
+
+    def _new_id(self):
+        # type: () -> str
+        return "{:08x}{:016x}".format(int(time.time()), next(self._id_counter))
+
+    def _get_bucket_data(self, tenant, bucket_type, name, create=False):
+        # type: (_Tenant, str, str, bool) -> dict
+        store = tenant.objects if bucket_type == "object" else tenant.files
+        if name not in tenant.buckets[bucket_type]:
+            if not self.auto_create_buckets:
+                raise FakeBaasError(404, "No such bucket")
+            if not create:
+                return {}  # read from bucket not created yet
+            self._create_bucket(tenant, bucket_type, name, {})
+        return store[name]
+
+    def _create_bucket(self, tenant, bucket_type, name, body):
+        # type: (_Tenant, str, str, dict) -> dict
+        bucket = {
+            "name": name,
+            "description": body.get("description", ""),
+            "ACL": body.get("ACL", _default_acl()),
+            "contentACL": body.get("contentACL", _default_acl()),
+        }
+        if bucket_type == "object":
+            bucket["noAcl"] = body.get("noAcl", False)
+        tenant.buckets[bucket_type][name] = bucket
+        store = tenant.objects if bucket_type == "object" else tenant.files
+        store.setdefault(name, {})
+        return bucket
+
+    @staticmethod
+    def _check_etag(current, etag, reason_code="etag_mismatch"):
+        # type: (str, str, str) -> None
+        if etag is not None and etag != current:
+            raise FakeBaasError(409, "ETag mismatch", reason_code)
+
+    @staticmethod
+    def _get_session_user(tenant, req):
+        # type: (_Tenant, LocalRequest) -> str
+        token = req.headers.get("X-Session-Token")
+        return tenant.sessions.get(token) if token is not None else None
+
+    @staticmethod
+    def _public_user(user):
+        # type: (dict) -> dict
+        return {k: v for k, v in user.items() if k != "password"}
+
+    # ---- users ----
+
+    def _login(self, tenant, req):
+        body = req.json() or {}
+        for user in tenant.users.values():
+            if ("username" in body and user.get("username") == body["username"]) or \
+                    ("email" in body and user.get("email") == body["email"]):
+                if user.get("password") == body.get("password"):
+                    token = uuid.uuid4().hex
+                    tenant.sessions[token] = user["_id"]
+                    res = self._public_user(user)
+                    res["sessionToken"] = token
+                    res["expire"] = int(time.time()) + self.session_lifetime
+                    return 201, res
+                break
+        raise FakeBaasError(401, "Login failed")
+
+    def _logout(self, tenant, req):
+        token = req.headers.get("X-Session-Token")
+        if token is None or tenant.sessions.pop(token, None) is None:
+            raise FakeBaasError(401, "No session")
+        return 200, {}
+
+    def _query_users(self, tenant, req):
+        results = [self._public_user(u) for u in tenant.users.values()
+                   if ("username" not in req.query or u.get("username") == req.query["username"]) and
+                   ("email" not in req.query or u.get("email") == req.query["email"])]
+        return 200, {"results": results}
+
+    def _register_user(self, tenant, req):
+        body = req.json() or {}
+        if "password" not in body or ("username" not in body and "email" not in body):
+            raise FakeBaasError(400, "No username/email or password")
+        for user in tenant.users.values():
+            if (body.get("username") is not None and user.get("username") == body.get("username")) or \
+                    (body.get("email") is not None and user.get("email") == body.get("email")):
+                raise FakeBaasError(409, "Duplicated user", "duplicate_user")
+        now = _now()
+        user = dict(body)
+        user.update({"_id": self._new_id(), "createdAt": now, "updatedAt": now, "etag": _new_etag(), "groups": []})
+        tenant.users[user["_id"]] = user
+        return 201, self._public_user(user)
+
+    def _find_user(self, tenant, user_id):
+        if user_id not in tenant.users:
+            raise FakeBaasError(404, "No such user")
+        return tenant.users[user_id]
+
+    def _get_user(self, tenant, req, user_id):
+        if user_id == "current":
+            user_id = self._get_session_user(tenant, req)
+        return 200, self._public_user(self._find_user(tenant, user_id))
+
+    def _update_user(self, tenant, req, user_id):
+        user = self._find_user(tenant, user_id)
+        self._check_etag(user["etag"], req.query.get("etag"))
+        user.update(req.json() or {})
+        user["updatedAt"] = _now()
+        user["etag"] = _new_etag()
+        return 200, self._public_user(user)
+
+    def _remove_user(self, tenant, req, user_id):
+        self._find_user(tenant, user_id)
+        del tenant.users[user_id]
+        for token, uid in list(tenant.sessions.items()):
+            if uid == user_id:
+                del tenant.sessions[token]
+        return 200, {}
+
+    def _reset_password(self, tenant, req):
+        return 200, {}
+
+    # ---- groups ----
+
+    def _find_group(self, tenant, name):
+        if name not in tenant.groups:
+            raise FakeBaasError(404, "No such group")
+        return tenant.groups[name]
+
+    def _query_groups(self, tenant, req):
+        return 200, {"results": list(tenant.groups.values())}
+
+    def _get_group(self, tenant, req, name):
+        return 200, self._find_group(tenant, name)
+
+    def _upsert_group(self, tenant, req, name):
+        body = req.json() or {}
+        now = _now()
+        group = tenant.groups.get(name)
+        if group is None:
+            group = {"_id": self._new_id(), "name": name, "users": [], "groups": [], "ACL": _default_acl(),
+                     "createdAt": now}
+            tenant.groups[name] = group
+        else:
+            self._check_etag(group["etag"], req.query.get("etag"))
+        for key in ("users", "groups", "ACL"):
+            if key in body:
+                group[key] = body[key]
+        group["updatedAt"] = now
+        group["etag"] = _new_etag()
+        return 200, group
+
+    def _remove_group(self, tenant, req, name):
+        self._find_group(tenant, name)
+        del tenant.groups[name]
+        return 200, {}
+
+    def _add_members(self, tenant, req, name):
+        group = self._find_group(tenant, name)
+        body = req.json() or {}
+        for key in ("users", "groups"):
+            for member in body.get(key, []):
+                if member not in group[key]:
+                    group[key].append(member)
+        group["updatedAt"] = _now()
+        group["etag"] = _new_etag()
+        return 200, group
+
+    def _remove_members(self, tenant, req, name):
+        group = self._find_group(tenant, name)
+        body = req.json() or {}
+        for key in ("users", "groups"):
+            group[key] = [m for m in group[key] if m not in body.get(key, [])]
+        group["updatedAt"] = _now()
+        group["etag"] = _new_etag()
+        return 200, group
+
+    # ---- buckets ----
+
+    def _query_buckets(self, tenant, req, bucket_type):
+        return 200, {"results": list(tenant.buckets[bucket_type].values())}
+
+    def _get_bucket(self, tenant, req, bucket_type, name):
+        if name not in tenant.buckets[bucket_type]:
+            raise FakeBaasError(404, "No such bucket")
+        return 200, tenant.buckets[bucket_type][name]
+
+    def _upsert_bucket(self, tenant, req, bucket_type, name):
+        body = req.json() or {}
+        bucket = tenant.buckets[bucket_type].get(name)
+        if bucket is None:
+            return 201, self._create_bucket(tenant, bucket_type, name, body)
+        for key in ("description", "ACL", "contentACL", "noAcl"):
+            if key in body:
+                bucket[key] = body[key]
+        return 200, bucket
+
+    def _remove_bucket(self, tenant, req, bucket_type, name):
+        if name not in tenant.buckets[bucket_type]:
+            raise FakeBaasError(404, "No such bucket")
+        del tenant.buckets[bucket_type][name]
+        store = tenant.objects if bucket_type == "object" else tenant.files
+        store.pop(name, None)
+        return 200, {}
+
+    # ---- objects ----
+
+    def _query_objects(self, tenant, req, bucket):
+        return 200, self._do_query(tenant, bucket, req.query)
+
+    def _long_query_objects(self, tenant, req, bucket):
+        return 200, self._do_query(tenant, bucket, req.json() or {})
+
+    def _do_query(self, tenant, bucket, params):
+        # type: (_Tenant, str, dict) -> dict
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        where = _load_json_param(params.get("where")) or {}
+        projection = _load_json_param(params.get("projection"))
+        delete_mark = str(params.get("deleteMark", "0")) == "1"
+
+        docs = [d for d in objects.values() if (delete_mark or not d.get("_deleted")) and match_query(d, where)]
+        total = len(docs)
+
+        if params.get("order"):
+            docs = sort_documents(docs, _parse_order(params["order"]))
+
+        skip = int(params.get("skip", 0))
+        limit = int(params.get("limit", self.default_limit))
+        docs = docs[skip:] if limit <= 0 else docs[skip:skip + limit]
+
+        res = {"results": [project_document(d, projection) for d in docs]}
+        if str(params.get("count", "0")) == "1":
+            res["count"] = total
+        return res
+
+    def _find_object(self, objects, oid):
+        doc = objects.get(oid)
+        if doc is None:
+            raise FakeBaasError(404, "No such object")
+        return doc
+
+    def _do_insert(self, tenant, req, data):
+        # type: (_Tenant, LocalRequest, dict) -> dict
+        now = _now()
+        doc = copy.deepcopy(data)
+        doc.pop("_id", None)
+        doc["_id"] = self._new_id()
+        doc["createdAt"] = now
+        doc["updatedAt"] = now
+        doc["etag"] = _new_etag()
+        if "ACL" not in doc:
+            doc["ACL"] = _default_acl(self._get_session_user(tenant, req))
+        return doc
+
+    def _insert_object(self, tenant, req, bucket):
+        objects = self._get_bucket_data(tenant, "object", bucket, create=True)
+        doc = self._do_insert(tenant, req, req.json() or {})
+        objects[doc["_id"]] = doc
+        return 201, doc
+
+    def _get_object(self, tenant, req, bucket, oid):
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        doc = self._find_object(objects, oid)
+        if doc.get("_deleted") and req.query.get("deleteMark") != "1":
+            raise FakeBaasError(404, "No such object")
+        return 200, doc
+
+    def _do_update(self, objects, oid, data, etag):
+        # type: (dict, str, dict, str) -> dict
+        doc = self._find_object(objects, oid)
+        self._check_etag(doc["etag"], etag)
+        doc = _apply_update(doc, data)
+        doc["updatedAt"] = _now()
+        doc["etag"] = _new_etag()
+        objects[oid] = doc
+        return doc
+
+    def _update_object(self, tenant, req, bucket, oid):
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        return 200, self._do_update(objects, oid, req.json() or {}, req.query.get("etag"))
+
+    def _do_remove(self, objects, oid, soft_delete, etag=None):
+        # type: (dict, str, bool, str) -> dict
+        doc = self._find_object(objects, oid)
+        self._check_etag(doc["etag"], etag)
+        if soft_delete:
+            doc["_deleted"] = True
+            doc["updatedAt"] = _now()
+            doc["etag"] = _new_etag()
+            return doc
+        del objects[oid]
+        return {}
+
+    def _remove_object(self, tenant, req, bucket, oid):
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        return 200, self._do_remove(objects, oid, req.query.get("deleteMark") == "1", req.query.get("etag"))
+
+    def _remove_objects(self, tenant, req, bucket):
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        where = _load_json_param(req.query.get("where")) or {}
+        soft_delete = req.query.get("deleteMark") == "1"
+        targets = [oid for oid, d in objects.items() if not d.get("_deleted") and match_query(d, where)]
+        for oid in targets:
+            self._do_remove(objects, oid, soft_delete)
+        return 200, {"deletedObjects": len(targets)}
+
+    def _batch(self, tenant, req, bucket):
+        objects = self._get_bucket_data(tenant, "object", bucket, create=True)
+        body = req.json() or {}
+        soft_delete = req.query.get("deleteMark") == "1"
+
+        results = []
+        for request in body.get("requests", []):
+            op = request.get("op")
+            try:
+                if self._batch_faults:
+                    fault = self._batch_faults[0]
+                    fault[1] -= 1
+                    if fault[1] <= 0:
+                        self._batch_faults.pop(0)
+                    raise FakeBaasError(fault[0], "Injected fault")
+                if op == "insert":
+                    doc = self._do_insert(tenant, req, request.get("data") or {})
+                    objects[doc["_id"]] = doc
+                elif op == "update":
+                    doc = self._do_update(objects, request.get("_id"), request.get("data") or {},
+                                          request.get("etag"))
+                elif op == "delete":
+                    oid = request.get("_id")
+                    doc = self._do_remove(objects, oid, soft_delete, request.get("etag")) or {"_id": oid}
+                else:
+                    raise FakeBaasError(400, "Bad op")
+                result = {"result": "ok", "_id": doc["_id"], "data": doc}
+                if "etag" in doc:
+                    result["etag"] = doc["etag"]
+                    result["updatedAt"] = doc["updatedAt"]
+            except FakeBaasError as e:
+                result = {"result": {400: "badRequest", 404: "notFound", 409: "conflict"}.get(e.status, "serverError")}
+                if e.reason_code is not None:
+                    result["reasonCode"] = e.reason_code
+                if "_id" in request:
+                    result["_id"] = request["_id"]
+            results.append(result)
+        return 200, {"results": results}
+
+    def _aggregate(self, tenant, req, bucket):
+        objects = self._get_bucket_data(tenant, "object", bucket)
+        body = req.json() or {}
+        docs = [d for d in objects.values() if not d.get("_deleted")]
+        return 200, {"results": aggregate_documents(docs, body.get("pipeline", []))}
+
+    # ---- files ----
+
+    def _find_file(self, files, filename):
+        if filename not in files:
+            raise FakeBaasError(404, "No such file")
+        return files[filename]
+
+    def _query_files(self, tenant, req, bucket):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        return 200, {"results": [meta for meta, data in files.values()]}
+
+    def _get_file_meta(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        return 200, self._find_file(files, filename)[0]
+
+    def _update_file_meta(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        meta, data = self._find_file(files, filename)
+        self._check_etag(meta["metaETag"], req.query.get("metaETag"))
+        body = req.json() or {}
+        meta = dict(meta)
+        for key in ("contentType", "ACL", "options"):
+            if key in body:
+                meta[key] = body[key]
+        if "filename" in body and body["filename"] != filename:
+            del files[filename]
+            filename = meta["filename"] = body["filename"]
+        meta["updatedAt"] = _now()
+        meta["metaETag"] = _new_etag()
+        files[filename] = (meta, data)
+        return 200, meta
+
+    def _create_file(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket, create=True)
+        if filename in files:
+            raise FakeBaasError(409, "File already exists", "duplicate_file")
+        now = _now()
+        acl = req.headers.get("X-ACL")
+        meta = {
+            "_id": self._new_id(),
+            "filename": filename,
+            "createdAt": now,
+            "ACL": json.loads(acl) if acl else _default_acl(self._get_session_user(tenant, req)),
+        }
+        files[filename] = self._store_file(meta, req, now)
+        return 201, files[filename][0]
+
+    def _update_file(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        meta, data = self._find_file(files, filename)
+        self._check_etag(meta["metaETag"], req.query.get("metaETag"))
+        self._check_etag(meta["fileETag"], req.query.get("fileETag"))
+        files[filename] = self._store_file(dict(meta), req, _now())
+        return 200, files[filename][0]
+
+    @staticmethod
+    def _store_file(meta, req, now):
+        # type: (dict, LocalRequest, str) -> (dict, bytes)
+        data = req.body or b""
+        meta["contentType"] = req.headers.get("Content-Type", "application/octet-stream")
+        meta["length"] = len(data)
+        meta["updatedAt"] = now
+        meta["metaETag"] = _new_etag()
+        meta["fileETag"] = _new_etag()
+        return meta, data
+
+    def _download_file(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        meta, data = self._find_file(files, filename)
+        return 200, data, {"Content-Type": meta["contentType"], "ETag": '"{}"'.format(meta["fileETag"])}
+
+    def _remove_file(self, tenant, req, bucket, filename):
+        files = self._get_bucket_data(tenant, "file", bucket)
+        self._find_file(files, filename)
+        del files[filename]
+        return 200, {}
+
+    # ---- push ----
+
+    def _push(self, tenant, req):
+        return 200, {"installations": 0}
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _handle(self):
+        body = self._read_body()
+        host = self.headers.get("Host", "localhost")
+        req = LocalRequest(self.command, "http://" + host + self.path, dict(self.headers.items()), body)
+        status, res_body, headers = self.server.baas.handle(req)
+        res = make_response(status, res_body, headers)
+
+        content = res.content
+        self.send_response(status)
+        for key, value in res.headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_body(self):
+        # type: () -> bytes
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length > 0 else None
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass  # be quiet
+
+
+class FakeBaasHttpServer(object):
+    """
+    HTTP server of FakeBaasServer, runs in background thread.
+
+    Args:
+        baas (FakeBaasServer): Server
+        host (str): Listen address
+        port (int): Listen port (0: any free port)
+
+    Attributes:
+        base_url (str): Base URL for service parameter (ex: http://127.0.0.1:12345/api)
+    """
+
+    def __init__(self, baas, host="127.0.0.1", port=0):
+        # type: (FakeBaasServer, str, int) -> None
+        self._server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.baas = baas
+        self._thread = None
+        self.base_url = "http://{}:{}/api".format(host, self._server.server_address[1])
+
+    def start(self):
+        # type: () -> None
+        """
+        Start server thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def shutdown(self):
+        # type: () -> None
+        """
+        Stop server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
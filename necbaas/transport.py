@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP transport module
+"""
+import io
+import re
+import json
+import threading
+import time
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from requests.structures import CaseInsensitiveDict
+try:
+    from http.cookiejar import DefaultCookiePolicy
+    from http.client import responses as _reasons
+    from urllib.parse import urlsplit, parse_qsl, unquote
+except ImportError:
+    from cookielib import DefaultCookiePolicy
+    from httplib import responses as _reasons
+    from urlparse import urlsplit, parse_qsl
+    from urllib import unquote
+
+
+class Transport(object):
+    """
+    HTTP transport interface, used by Service to send requests.
+
+    Subclass this and override request() to replace HTTP layer,
+    ex. for recording, HTTP/2 or in-process testing.
+    """
+
+    def request(self, method, url, **kwargs):
+        # type: (str, str, **dict) -> Response
+        """
+        Send HTTP request.
+
+        Args:
+            method (str): HTTP method name (upper case)
+            url (str): URL
+            **kwargs: Keyword arguments of 'requests' library
+                (params, headers, data, json, proxies, verify, stream, timeout)
+
+        Returns:
+            Response: Response of 'requests' library. HTTP error status must not be raised.
+
+        Raises:
+            requests.ConnectionError: Connection error
+            requests.Timeout: Timeout
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        # type: () -> None
+        """
+        Close transport and release resources.
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using 'requests' library, with keep-alive HTTP connection pool.
+
+    The session is created lazily, and re-created when it has been idle
+    longer than 'idle_timeout' seconds (stale keep-alive connections are
+    usually closed by servers or load balancers).
+
+    Args:
+        pool_connections (int): Number of host pools to cache
+        pool_maxsize (int): Max number of connections per host
+        idle_timeout (float): Idle time in seconds before the pool is recycled (None: never)
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE, idle_timeout=None):
+        # type: (int, int, float) -> None
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._session = None
+        self._last_used = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        # type: (str, str, **dict) -> Response
+        return self.get_session().request(method, url, **kwargs)
+
+    def get_session(self):
+        # type: () -> requests.Session
+        """
+        Get session, create or recycle if needed.
+
+        Returns:
+            requests.Session: Session
+        """
+        with self._lock:
+            now = time.time()
+            if self._session is not None and self.idle_timeout is not None \
+                    and now - self._last_used > self.idle_timeout:
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                self._session = self._create_session()
+            self._last_used = now
+            return self._session
+
+    def _create_session(self):
+        # type: () -> requests.Session
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # Do not keep cookies between requests, same as requests.get() etc.
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def close(self):
+        # type: () -> None
+        """
+        Close all connections in pool.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class LocalRequest(object):
+    """
+    Request passed to the handler of LocalTransport.
+
+    Attributes:
+        method (str): HTTP method name (upper case)
+        url (str): Full URL
+        path (str): URL path (decoded)
+        query (dict): Query parameters (str values, last one is used for duplicated keys)
+        headers (CaseInsensitiveDict): Request headers
+        body (bytes): Request body (None if no body)
+        match (re.Match): Match object of route pattern (None for default handler)
+    """
+
+    def __init__(self, method, url, headers, body):
+        # type: (str, str, dict, bytes) -> None
+        self.method = method
+        self.url = url
+        parts = urlsplit(url)
+        self.path = unquote(parts.path)
+        self.query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.match = None
+
+    def json(self):
+        # type: () -> Any
+        """
+        Decode request body as JSON.
+
+        Returns:
+            Any: Decoded object (None if no body)
+        """
+        if not self.body:
+            return None
+        return json.loads(self.body.decode("utf-8"))
+
+
+class LocalTransport(Transport):
+    """
+    In-process transport, answers requests from Python callables without network.
+    Useful for unit tests and benchmarks of SDK overhead.
+
+    Handler is called with LocalRequest, and returns one of the followings:
+
+    - Response of 'requests' library
+    - Tuple of (status, body) or (status, body, headers).
+      body is dict or list (encoded in JSON), bytes, str or None.
+
+    Examples:
+        ::
+
+            transport = necbaas.LocalTransport()
+            transport.add_route("GET", r"/objects/(\\w+)$", lambda req: (200, {"results": []}))
+            service = necbaas.Service(param, transport=transport)
+
+    Args:
+        handler (callable): Default handler, called when no route matches (optional).
+            If not specified, 404 is returned.
+
+    Attributes:
+        requests (list): List of LocalRequest received, if record is True
+        record (bool): Record requests (default: False)
+    """
+
+    def __init__(self, handler=None):
+        # type: (callable) -> None
+        self.handler = handler
+        self.routes = []
+        self.record = False
+        self.requests = []
+
+    def add_route(self, method, pattern, handler):
+        # type: (str, str, callable) -> None
+        """
+        Add route. Routes are checked in order of addition.
+
+        Args:
+            method (str): HTTP method name, or None for any method
+            pattern (str): Regular expression searched in URL path
+            handler (callable): Handler
+        """
+        self.routes.append((method.upper() if method is not None else None, re.compile(pattern), handler))
+
+    def request(self, method, url, **kwargs):
+        # type: (str, str, **dict) -> Response
+        # prepare request same as 'requests' library, to encode query parameters and body
+        prepared = requests.Request(method, url, params=kwargs.get("params"), headers=kwargs.get("headers"),
+                                    data=kwargs.get("data"), json=kwargs.get("json")).prepare()
+        body = prepared.body
+        if hasattr(body, "read"):
+            body = body.read()
+        if body is not None and not isinstance(body, bytes):
+            body = body.encode("utf-8")
+
+        req = LocalRequest(prepared.method, prepared.url, prepared.headers, body)
+        if self.record:
+            self.requests.append(req)
+
+        handler = self.handler
+        for route_method, pattern, route_handler in self.routes:
+            if route_method is not None and route_method != req.method:
+                continue
+            m = pattern.search(req.path)
+            if m is not None:
+                req.match = m
+                handler = route_handler
+                break
+
+        if handler is None:
+            result = (404, {"error": "Not found"})
+        else:
+            result = handler(req)
+
+        if isinstance(result, Response):
+            res = result
+        else:
+            res = make_response(*result)
+        res.url = prepared.url
+        res.request = prepared
+        return res
+
+
+def make_response(status, body=None, headers=None):
+    # type: (int, Any, dict) -> Response
+    """
+    Create Response of 'requests' library.
+
+    Args:
+        status (int): HTTP status code
+        body (Any): Response body. dict or list is encoded in JSON. bytes, str or None.
+        headers (dict): Response headers (optional)
+
+    Returns:
+        Response: Response
+    """
+    res = Response()
+    res.status_code = status
+    res.reason = _reasons.get(status, "")
+    res.headers = CaseInsensitiveDict(headers or {})
+
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode("utf-8")
+        res.headers.setdefault("Content-Type", "application/json")
+    elif body is None:
+        body = b""
+    elif not isinstance(body, bytes):
+        body = body.encode("utf-8")
+        res.headers.setdefault("Content-Type", "text/plain; charset=utf-8")
+
+    res.headers.setdefault("Content-Length", str(len(body)))
+    res.encoding = "utf-8"
+    res.raw = io.BytesIO(body)
+    return res
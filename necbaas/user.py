@@ -59,6 +59,18 @@ class User(object):
         Returns:
             dict: Response JSON
         """
+        params = User._get_login_params(username, email, password, params)
+
+        r = service.execute_rest("POST", "/login", json=params)
+        res = service.json_codec.loads(r.content)
+
+        service.session_token = res["sessionToken"]
+        service.session_token_expire = res["expire"]
+        return res
+
+    @staticmethod
+    def _get_login_params(username=None, email=None, password=None, params=None):
+        # type: (str, str, str, dict) -> dict
         if params is None:
             if password is None:
                 raise ValueError("No password nor params")
@@ -69,13 +81,7 @@ class User(object):
                 params["email"] = email
             else:
                 raise ValueError("No username nor email")
-
-        r = service.execute_rest("POST", "/login", json=params)
-        res = r.json()
-
-        service.session_token = res["sessionToken"]
-        service.session_token_expire = res["expire"]
-        return res
+        return params
 
     @staticmethod
     def logout(service):
@@ -89,7 +95,7 @@ class User(object):
             dict: Response JSON in dictionary
         """
         r = service.execute_rest("DELETE", "/login")
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         service.session_token = None
         service.session_token_expire = None
         return res
@@ -123,7 +129,7 @@ class User(object):
             body["options"] = self.options
 
         r = self.service.execute_rest("POST", "/users", json=body)
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res
 
     def update(self, user_id, etag=None):
@@ -153,7 +159,7 @@ class User(object):
             body["options"] = self.options
 
         r = self.service.execute_rest("PUT", "/users/{}".format(user_id), query=query, json=body)
-        res = r.json()
+        res = self.service.json_codec.loads(r.content)
         return res
 
     @staticmethod
@@ -176,7 +182,7 @@ class User(object):
             query["email"] = email
 
         r = service.execute_rest("GET", "/users", query=query)
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res["results"]
 
     @staticmethod
@@ -192,7 +198,7 @@ class User(object):
             dict: User info
         """
         r = service.execute_rest("GET", "/users/{}".format(user_id))
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res
 
     @staticmethod
@@ -208,7 +214,7 @@ class User(object):
             dict: Response JSON
         """
         r = service.execute_rest("DELETE", "/users/{}".format(user_id))
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res
 
     @staticmethod
@@ -231,5 +237,5 @@ class User(object):
             body["email"] = email
 
         r = service.execute_rest("POST", "/request_password_reset", json=body)
-        res = r.json()
+        res = service.json_codec.loads(r.content)
         return res
@@ -6,7 +6,8 @@ import os
 from codecs import open
 
 requires = [
-    'requests>=2.18.0'
+    'requests>=2.18.0',
+    'futures; python_version < "3"'
 ]
 
 test_requires = [
@@ -17,6 +18,15 @@ test_requires = [
     'coverage'
 ]
 
+async_requires = [
+    'aiohttp>=3.3'
+]
+
+dataframe_requires = [
+    'numpy',
+    'pandas'
+]
+
 doc_requires = [
     'sphinx',
     'sphinx-rtd-theme'
@@ -47,7 +57,9 @@ setup(
     install_requires=requires,
     extras_require={
         'test': test_requires,
-        'doc': doc_requires
+        'doc': doc_requires,
+        'async': async_requires,
+        'dataframe': dataframe_requires
     },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
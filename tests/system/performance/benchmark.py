@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+SDK throughput / latency benchmark suite.
+
+Runs SDK APIs against FakeBaasServer (necbaas.testing) and reports ops/sec and
+latency percentiles in JSON, to track regressions between releases.
+
+Usage::
+
+    python -m tests.system.performance.benchmark [--mode http|local] [--iterations N]
+        [--output result.json] [--baseline old_result.json] [--threshold 10]
+
+    --mode local : in-process transport, measures SDK overhead only
+    --mode http  : HTTP server on loopback, includes HTTP stack (default)
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from datetime import datetime
+
+import necbaas as baas
+from necbaas.__version__ import __version__
+from necbaas.testing import FakeBaasServer
+
+if hasattr(time, "perf_counter"):
+    _clock = time.perf_counter
+else:
+    _clock = time.time
+
+QUERY_PAGE_SIZES = [10, 100, 1000]
+BATCH_SIZES = [10, 100, 500]
+FILE_SIZES = [1024, 100 * 1024, 1024 * 1024]
+
+
+def percentile(sorted_values, p):
+    # type: (list, float) -> float
+    """
+    Get percentile (nearest-rank method).
+
+    Args:
+        sorted_values (list): Sorted values
+        p (float): Percentile (0 - 100)
+
+    Returns:
+        float: Value
+    """
+    if not sorted_values:
+        return 0.0
+    rank = int(math.ceil(p / 100.0 * len(sorted_values))) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def summarize(name, params, latencies, total_time):
+    # type: (str, dict, list, float) -> dict
+    """
+    Summarize measurement.
+
+    Args:
+        name (str): Benchmark name
+        params (dict): Benchmark parameters
+        latencies (list): Latency of each operation in seconds
+        total_time (float): Total time in seconds
+
+    Returns:
+        dict: Result
+    """
+    values = sorted(latencies)
+    ms = 1000.0
+    return {
+        "name": name,
+        "params": params,
+        "iterations": len(values),
+        "opsPerSec": len(values) / total_time if total_time > 0 else 0.0,
+        "latencyMs": {
+            "min": values[0] * ms,
+            "mean": sum(values) / len(values) * ms,
+            "p50": percentile(values, 50) * ms,
+            "p95": percentile(values, 95) * ms,
+            "p99": percentile(values, 99) * ms,
+            "max": values[-1] * ms
+        }
+    }
+
+
+class BenchmarkSuite(object):
+    """
+    Benchmark suite.
+
+    Args:
+        mode (str): "http" or "local"
+        iterations (int): Number of measured operations for each benchmark
+        warmup (int): Number of warm-up operations (not measured)
+    """
+
+    def __init__(self, mode="http", iterations=200, warmup=10):
+        # type: (str, int, int) -> None
+        self.mode = mode
+        self.iterations = iterations
+        self.warmup = warmup
+        self.server = FakeBaasServer()
+        self._http_server = None
+        self.service = None
+        self.results = []
+
+    def setup(self):
+        # type: () -> None
+        if self.mode == "http":
+            self._http_server = self.server.serve()
+            self.service = baas.Service(self.server.get_param(self._http_server.base_url))
+        elif self.mode == "local":
+            self.service = self.server.create_service()
+        else:
+            raise ValueError("Unknown mode: " + self.mode)
+
+    def teardown(self):
+        # type: () -> None
+        self.service.close()
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server = None
+
+    def measure(self, name, params, func):
+        # type: (str, dict, callable) -> dict
+        """
+        Measure function. func is called with iteration index.
+
+        Args:
+            name (str): Benchmark name
+            params (dict): Benchmark parameters
+            func (callable): Function to measure
+
+        Returns:
+            dict: Result
+        """
+        for i in range(self.warmup):
+            func(-i - 1)
+
+        latencies = []
+        start = _clock()
+        for i in range(self.iterations):
+            t = _clock()
+            func(i)
+            latencies.append(_clock() - t)
+        total = _clock() - start
+
+        result = summarize(name, params, latencies, total)
+        self.results.append(result)
+        return result
+
+    def run(self):
+        # type: () -> list
+        """
+        Run all benchmarks.
+
+        Returns:
+            list: Results
+        """
+        self.setup()
+        try:
+            self.bench_insert()
+            self.bench_query()
+            self.bench_batch()
+            self.bench_aggregate()
+            self.bench_file()
+            self.bench_login()
+        finally:
+            self.teardown()
+        return self.results
+
+    def bench_insert(self):
+        bucket = baas.ObjectBucket(self.service, "insert")
+        self.measure("ObjectBucket.insert", {}, lambda i: bucket.insert({"n": i, "data": "x" * 100}))
+
+    def bench_query(self):
+        bucket = baas.ObjectBucket(self.service, "query")
+        for start in range(0, max(QUERY_PAGE_SIZES), 500):
+            bucket.batch([{"op": "insert", "data": {"n": n, "data": "x" * 100}} for n in range(start, start + 500)])
+
+        for size in QUERY_PAGE_SIZES:
+            self.measure("ObjectBucket.query", {"pageSize": size}, lambda i: bucket.query(limit=size))
+
+    def bench_batch(self):
+        bucket = baas.ObjectBucket(self.service, "batch")
+        for size in BATCH_SIZES:
+            requests = [{"op": "insert", "data": {"n": n, "data": "x" * 100}} for n in range(size)]
+            self.measure("ObjectBucket.batch", {"batchSize": size}, lambda i: bucket.batch(requests))
+            bucket.remove_with_query()
+
+    def bench_aggregate(self):
+        bucket = baas.ObjectBucket(self.service, "aggregate")
+        bucket.batch([{"op": "insert", "data": {"n": n, "group": n % 10}} for n in range(500)])
+        pipeline = [
+            {"$match": {"n": {"$gte": 100}}},
+            {"$group": {"_id": "$group", "total": {"$sum": "$n"}}},
+            {"$sort": {"_id": 1}}
+        ]
+        self.measure("ObjectBucket.aggregate", {"objects": 500}, lambda i: bucket.aggregate(pipeline))
+
+    def bench_file(self):
+        bucket = baas.FileBucket(self.service, "file")
+        for size in FILE_SIZES:
+            data = b"x" * size
+            self.measure("FileBucket.create", {"size": size},
+                         lambda i: bucket.create("file{}-{}".format(size, i), data, "application/octet-stream"))
+
+            bucket.create("download{}".format(size), data, "application/octet-stream")
+            self.measure("FileBucket.download", {"size": size},
+                         lambda i: bucket.download("download{}".format(size)).content)
+
+    def bench_login(self):
+        user = baas.User(self.service)
+        user.username = "user1"
+        user.password = "Passw0rD"
+        user.register()
+        self.measure("User.login", {}, lambda i: baas.User.login(self.service, username="user1", password="Passw0rD"))
+
+
+def create_report(suite, results):
+    # type: (BenchmarkSuite, list) -> dict
+    """
+    Create benchmark report.
+    """
+    return {
+        "sdkVersion": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": suite.mode,
+        "iterations": suite.iterations,
+        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "results": results
+    }
+
+
+def compare(baseline, report, threshold):
+    # type: (dict, dict, float) -> list
+    """
+    Compare ops/sec with baseline report.
+
+    Args:
+        baseline (dict): Baseline report
+        report (dict): Current report
+        threshold (float): Allowed slowdown in percent
+
+    Returns:
+        list: List of (name, params, baseline ops/sec, current ops/sec) of regressions
+    """
+    def key(r):
+        return r["name"], json.dumps(r["params"], sort_keys=True)
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        if r["opsPerSec"] < b["opsPerSec"] * (1 - threshold / 100.0):
+            regressions.append((r["name"], r["params"], b["opsPerSec"], r["opsPerSec"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NEC BaaS SDK benchmark")
+    parser.add_argument("--mode", choices=["http", "local"], default="http")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--output", help="Output JSON file (default: stdout)")
+    parser.add_argument("--baseline", help="Baseline JSON file to compare")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent (default: 10)")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(args.mode, args.iterations, args.warmup)
+    report = create_report(suite, suite.run())
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, params, old, new in regressions:
+            print("REGRESSION: {} {}: {:.1f} -> {:.1f} ops/sec".format(name, json.dumps(params), old, new),
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
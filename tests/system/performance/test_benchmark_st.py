@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+
+from tests.system.performance.benchmark import BenchmarkSuite, create_report, compare, percentile
+
+
+class TestBenchmark(object):
+    """ベンチマークスイートの動作確認"""
+
+    def test_percentile(self):
+        """パーセンタイルが算出されること"""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([1], 99) == 1
+
+    @pytest.mark.parametrize("mode", ["local", "http"])
+    def test_run(self, mode):
+        """全ベンチマークが実行され、JSON で出力できること"""
+        suite = BenchmarkSuite(mode, iterations=3, warmup=1)
+        report = create_report(suite, suite.run())
+        report = json.loads(json.dumps(report))
+
+        names = set(r["name"] for r in report["results"])
+        assert names == {"ObjectBucket.insert", "ObjectBucket.query", "ObjectBucket.batch", "ObjectBucket.aggregate",
+                         "FileBucket.create", "FileBucket.download", "User.login"}
+        for r in report["results"]:
+            assert r["iterations"] == 3
+            assert r["opsPerSec"] > 0
+            assert r["latencyMs"]["p50"] <= r["latencyMs"]["p99"]
+
+        assert compare(report, report, 10) == []
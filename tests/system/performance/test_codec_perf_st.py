@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+import pytest
+
+from necbaas.codec import get_codec
+
+
+def create_query_response(count, size):
+    """ObjectBucket.query(limit=-1) 相当の応答データを生成する"""
+    results = []
+    for i in range(count):
+        results.append({
+            "_id": "{:024x}".format(i),
+            "createdAt": "2018-05-21T00:00:00.000Z",
+            "updatedAt": "2018-05-21T00:00:00.000Z",
+            "ACL": {"owner": "user1", "r": ["g:authenticated"], "w": ["g:authenticated"],
+                    "c": [], "u": [], "d": [], "admin": []},
+            "etag": "etag{}".format(i),
+            "DATA_ID": i,
+            "SCORE": i * 0.5,
+            "DATA": "x" * size
+        })
+    return {"results": results, "count": count}
+
+
+class TestCodecPerformance(object):
+    """JSON コーデック性能比較"""
+
+    COUNT = 10000
+    SIZE = 1024
+    LOOP = 5
+
+    @pytest.mark.parametrize("name", ["json", "orjson", "ujson"])
+    def test_codec(self, name):
+        """大量結果セット(1KB x 10,000件)のエンコード・デコード性能"""
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            pytest.skip(name + " is not installed")
+
+        data = create_query_response(self.COUNT, self.SIZE)
+        body = get_codec("json").dumps_bytes(data)
+
+        start = time.time()
+        for _ in range(self.LOOP):
+            results = codec.loads(body)
+        decode_time = (time.time() - start) / self.LOOP
+        assert len(results["results"]) == self.COUNT
+
+        start = time.time()
+        for _ in range(self.LOOP):
+            codec.dumps_bytes(data)
+        encode_time = (time.time() - start) / self.LOOP
+
+        print("Codec {}: body = {} bytes, decode = {:.4f} sec, encode = {:.4f} sec".format(
+            name, len(body), decode_time, encode_time))
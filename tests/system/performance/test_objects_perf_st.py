@@ -29,7 +29,7 @@ class TestObjectsPerformance(object):
 
         self.bucket = baas.ObjectBucket(self.service, self.TEST_BUCKET)
 
-        (res, total) = self.bucket.query_with_count(limit=1)
+        total = self.bucket.count()
         if total == 10000:
             # ok, test data exists
             return
@@ -43,19 +43,8 @@ class TestObjectsPerformance(object):
     def create_test_data_10000(self):
         """10,000件のテストデータを生成する"""
         # do batch operation: 500 * 20 = 10,000 objects
-        requests = []
-        for i in range(500):
-            requests.append({
-                "op": "insert",
-                "data": {
-                    "key": i
-                }
-            })
-        # execute batch
-        for i in range(20):
-            # print("batch = {}".format(500 * (i+1)), flush=True)
-            results = self.bucket.batch(requests)
-            assert len(results) == 500
+        results = self.bucket.bulk_insert(({"key": i % 500} for i in range(10000)), chunk_size=500)
+        assert len(results) == 10000
 
     def drop_test_object_bucket(self):
         buckets = baas.Buckets(self.master_service, "object")
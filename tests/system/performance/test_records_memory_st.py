@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+
+from necbaas.records import make_record_type
+from .test_codec_perf_st import create_query_response
+
+tracemalloc = pytest.importorskip("tracemalloc")
+
+
+def measure(func):
+    """func の戻り値が保持するメモリ量(bytes)を計測する"""
+    tracemalloc.start()
+    try:
+        result = func()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+class TestRecordsMemory(object):
+    """クエリ結果の dict とコンパクトレコードのメモリ使用量比較"""
+
+    COUNT = 100000
+    SIZE = 16
+
+    def test_memory(self):
+        """大量結果セット(100,000件)の保持メモリ量"""
+        body = json.dumps(create_query_response(self.COUNT, self.SIZE))
+        record_type = make_record_type(["DATA_ID", "SCORE", "DATA"])
+
+        dicts, dict_size = measure(lambda: json.loads(body)["results"])
+        records, record_size = measure(lambda: [record_type(obj) for obj in json.loads(body)["results"]])
+
+        assert len(dicts) == len(records) == self.COUNT
+        print("dict = {} bytes, record = {} bytes ({:.1f}%)".format(
+            dict_size, record_size, 100.0 * record_size / dict_size))
+        assert record_size < dict_size / 2
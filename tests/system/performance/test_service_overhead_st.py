@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import time
+from mock import patch
+
+import necbaas as baas
+from necbaas.transport import LocalTransport, make_response
+
+
+class TestServiceOverhead(object):
+    """execute_rest() のクライアント側オーバーヘッド測定 (通信なし)"""
+
+    COUNT = 100000
+
+    def _create_service(self, transport=None):
+        service = baas.Service({
+            "baseUrl": "http://localhost/api",
+            "tenantId": "tenant1",
+            "appId": "app1",
+            "appKey": "key1",
+            "proxy": {"http": "proxy.example.com:8080"}
+        }, transport=transport)
+        service.session_token = "token1"
+        return service
+
+    def _measure(self, name, func, count=COUNT):
+        start = time.time()
+        for _ in range(count):
+            func()
+        elapsed = time.time() - start
+        print("{}: {:.3f} usec/call".format(name, elapsed / count * 1000000))
+
+    def test_execute_rest_overhead(self):
+        """execute_rest() 1回あたりのオーバーヘッド"""
+        service = self._create_service()
+        query = {"where": '{"key": 1}', "limit": 100}
+        body = {"key": "value"}
+
+        with patch.object(service, "_do_request", lambda method, **kwargs: kwargs):
+            self._measure("GET with query", lambda: service.execute_rest("GET", "/objects/bucket1", query=query))
+            self._measure("POST with json", lambda: service.execute_rest("POST", "/objects/bucket1", json=body))
+            self._measure("GET with headers", lambda: service.execute_rest(
+                "GET", "/files/bucket1/file1", headers={"Range": "bytes=0-99"}))
+
+    def test_sdk_overhead(self):
+        """ObjectBucket API 1回あたりのオーバーヘッド (in-process transport)"""
+        response_body = {"results": [{"_id": "id{}".format(i), "key": i} for i in range(10)]}
+        transport = LocalTransport(lambda req: make_response(200, response_body))
+        bucket = baas.ObjectBucket(self._create_service(transport), "bucket1")
+
+        self._measure("ObjectBucket.query", lambda: bucket.query(where={"key": 1}, limit=10), 10000)
+        self._measure("ObjectBucket.insert", lambda: bucket.insert({"key": "value"}), 10000)
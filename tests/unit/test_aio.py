@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+import sys
+import json
+import pytest
+
+if sys.version_info < (3, 5):
+    pytest.skip("asyncio is not supported", allow_module_level=True)
+
+aiohttp = pytest.importorskip("aiohttp")
+
+import asyncio
+from mock import MagicMock, AsyncMock, patch
+
+from necbaas.codec import JsonCodec
+from necbaas.aio import AiohttpTransport, AsyncService, AsyncObjectBucket, AsyncFileBucket, AsyncUser, AsyncGroup, AsyncApigw
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def mock_async_service_json_resp(json_resp):
+    """
+    AsyncService mock を返す。JSON 応答をセットする。
+    """
+    response = MagicMock()
+    response.read = AsyncMock(return_value=json.dumps(json_resp).encode("utf-8"))
+
+    service = MagicMock()
+    service.execute_rest = AsyncMock(return_value=response)
+    service.json_codec = JsonCodec()
+    return service
+
+
+def get_rest_args(service):
+    return service.execute_rest.call_args[0]
+
+
+def get_rest_kwargs(service):
+    return service.execute_rest.call_args[1]
+
+
+class TestAsyncService(object):
+    def get_sample_param(self):
+        return {
+            "baseUrl": "http://localhost/api",
+            "tenantId": "tenant1",
+            "appId": "app1",
+            "appKey": "key1",
+            "proxy": {"http": "proxy.example.com:8080"}
+        }
+
+    def _mock_response(self, status):
+        response = MagicMock()
+        response.status = status
+        response.read = AsyncMock(return_value=b"{}")
+        response.headers = {}
+        return response
+
+    def test_execute_rest(self):
+        """正常に REST API を呼び出せること"""
+        service = AsyncService(self.get_sample_param())
+        service.session_token = "token1"
+        response = self._mock_response(200)
+
+        with patch("aiohttp.ClientSession.request", new_callable=AsyncMock) as mock:
+            mock.return_value = response
+            ret = run(service.execute_rest("GET", "a/b/c", query={"a": 1, "b": "x"}))
+            run(service.close())
+
+        assert ret is response
+        response.read.assert_called_once()
+
+        assert mock.call_args[0][0] == "GET"
+        assert mock.call_args[0][1] == "http://localhost/api/1/tenant1/a/b/c"
+        kwargs = mock.call_args[1]
+        assert kwargs["params"] == {"a": "1", "b": "x"}
+        assert kwargs["proxy"] == "http://proxy.example.com:8080"
+        headers = kwargs["headers"]
+        assert headers["X-Application-Id"] == "app1"
+        assert headers["X-Application-Key"] == "key1"
+        assert headers["X-Session-Token"] == "token1"
+
+    def test_execute_rest_stream(self):
+        """stream 指定時は応答ボディを読まないこと"""
+        service = AsyncService(self.get_sample_param())
+        response = self._mock_response(200)
+
+        with patch("aiohttp.ClientSession.request", new_callable=AsyncMock) as mock:
+            mock.return_value = response
+            run(service.execute_rest("GET", "a/b/c", stream=True))
+            run(service.close())
+
+        response.read.assert_not_called()
+
+    def test_execute_rest_error(self):
+        """エラー応答時は例外が raise されること"""
+        service = AsyncService(self.get_sample_param())
+        response = self._mock_response(404)
+        response.raise_for_status.side_effect = Exception("404")
+
+        with patch("aiohttp.ClientSession.request", new_callable=AsyncMock) as mock:
+            mock.return_value = response
+            with pytest.raises(Exception):
+                run(service.execute_rest("GET", "a/b/c"))
+            run(service.close())
+
+    def test_execute_rest_retry(self):
+        """リトライ対象エラー時にリトライされること"""
+        param = self.get_sample_param()
+        param["retry"] = {"maxRetries": 2}
+        service = AsyncService(param)
+        error_response = self._mock_response(503)
+        error_response.headers = {"Retry-After": "1"}
+        response = self._mock_response(200)
+
+        with patch("aiohttp.ClientSession.request", new_callable=AsyncMock) as mock, \
+                patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            mock.side_effect = [aiohttp.ClientConnectionError(), error_response, response]
+            ret = run(service.execute_rest("GET", "a/b/c"))
+            run(service.close())
+
+        assert ret is response
+        assert mock.call_count == 3
+        assert mock_sleep.call_args[0][0] == 1
+        assert service.retry_stats.retries == 2
+
+    def test_execute_rest_invalid_method(self):
+        """不正なメソッドはエラーとなること"""
+        service = AsyncService(self.get_sample_param())
+
+        with pytest.raises(Exception):
+            run(service.execute_rest("PATCH", "/a/b/c"))
+
+    def test_to_aiohttp_args(self):
+        """requests 形式の引数が aiohttp 形式に変換されること"""
+        args = AiohttpTransport._to_aiohttp_args("https://localhost/api/1/tenant1/a", {
+            "headers": {},
+            "json": {"a": 1},
+            "proxies": {"https": "https://proxy.example.com:8443"},
+            "verify": False,
+            "timeout": (3.05, 27)
+        })
+        assert args["json"] == {"a": 1}
+        assert args["proxy"] == "https://proxy.example.com:8443"
+        assert args["ssl"] is False
+        assert args["timeout"].sock_connect == 3.05
+        assert args["timeout"].sock_read == 27
+
+
+class TestAsyncObjectBucket(object):
+    def get_bucket(self, expected_result):
+        service = mock_async_service_json_resp(expected_result)
+        bucket = AsyncObjectBucket(service, "bucket1")
+        return service, bucket
+
+    def test_query(self):
+        """正常にクエリできること"""
+        expected_results = [{"key1": 1}, {"key1": 2}]
+        service, bucket = self.get_bucket({"results": expected_results, "count": 2})
+
+        where = {"key1": 12345}
+        results, count = run(bucket.query_with_count(where=where, limit=100))
+        assert results == expected_results
+        assert count == 2
+
+        assert get_rest_args(service) == ("GET", "/objects/bucket1")
+        query = get_rest_kwargs(service)["query"]
+        assert query["where"] == json.dumps(where)
+        assert query["limit"] == 100
+        assert query["count"] == 1
+
+    def test_long_query(self):
+        """正常にロングクエリできること"""
+        service, bucket = self.get_bucket({"results": []})
+
+        where = {"key1": "a" * 1500}
+        run(bucket.query(where=where))
+
+        assert get_rest_args(service) == ("POST", "/objects/bucket1/_query")
+        assert get_rest_kwargs(service)["json"]["where"] == json.dumps(where)
+
+    def test_insert(self):
+        """正常に INSERT できること"""
+        service, bucket = self.get_bucket({"_id": "id1"})
+
+        result = run(bucket.insert({"key1": 1}))
+        assert result == {"_id": "id1"}
+
+        assert get_rest_args(service) == ("POST", "/objects/bucket1")
+        assert get_rest_kwargs(service)["json"] == {"key1": 1}
+
+    def test_batch(self):
+        """正常に batch できること"""
+        expected_result = [{"result": "ok", "_id": "id1"}]
+        service, bucket = self.get_bucket({"results": expected_result})
+
+        requests = [{"op": "insert", "data": {"key": "val"}}]
+        assert run(bucket.batch(requests)) == expected_result
+
+        assert get_rest_args(service) == ("POST", "/objects/bucket1/_batch")
+        kwargs = get_rest_kwargs(service)
+        assert kwargs["json"] == {"requests": requests}
+        assert kwargs["query"] == {"deleteMark": 0}
+
+    def test_aggregate(self):
+        """正常に aggregate できること"""
+        expected_result = [{"data": 123}]
+        service, bucket = self.get_bucket({"results": expected_result})
+
+        pipeline = [{"$match": {"key": 1}}]
+        assert run(bucket.aggregate(pipeline)) == expected_result
+
+        assert get_rest_args(service) == ("POST", "/objects/bucket1/_aggregate")
+        assert get_rest_kwargs(service)["json"] == {"pipeline": pipeline}
+
+
+class TestAsyncFileBucket(object):
+    def test_create(self):
+        """正常に新規アップロードできること"""
+        service = mock_async_service_json_resp({"filename": "file1"})
+        bucket = AsyncFileBucket(service, "bucket1")
+
+        result = run(bucket.create("file1", b"TEST DATA", content_type="text/plain", acl={"r": ["g:anonymous"]}))
+        assert result == {"filename": "file1"}
+
+        assert get_rest_args(service) == ("POST", "/files/bucket1/file1")
+        kwargs = get_rest_kwargs(service)
+        assert kwargs["data"] == b"TEST DATA"
+        assert kwargs["headers"]["Content-Type"] == "text/plain"
+        assert json.loads(kwargs["headers"]["X-ACL"]) == {"r": ["g:anonymous"]}
+
+    def test_download(self):
+        """正常にダウンロードできること"""
+        service = mock_async_service_json_resp({})
+        bucket = AsyncFileBucket(service, "bucket1")
+
+        run(bucket.download("file1", stream=True))
+
+        assert get_rest_args(service) == ("GET", "/files/bucket1/file1")
+        assert get_rest_kwargs(service)["stream"] is True
+
+
+class TestAsyncUser(object):
+    def test_login(self):
+        """正常にログインできること"""
+        service = mock_async_service_json_resp({"sessionToken": "token1", "expire": 12345})
+
+        run(AsyncUser.login(service, username="user1", password="pass1"))
+
+        assert get_rest_args(service) == ("POST", "/login")
+        assert get_rest_kwargs(service)["json"] == {"username": "user1", "password": "pass1"}
+        assert service.session_token == "token1"
+        assert service.session_token_expire == 12345
+
+
+class TestAsyncGroup(object):
+    def test_get(self):
+        """正常にグループを取得できること"""
+        service = mock_async_service_json_resp({"name": "group1"})
+        group = AsyncGroup(service, "group1")
+
+        assert run(group.get()) == {"name": "group1"}
+        assert get_rest_args(service) == ("GET", "/groups/group1")
+
+
+class TestAsyncApigw(object):
+    def test_execute(self):
+        """正常に API Gateway を実行できること"""
+        service = mock_async_service_json_resp({})
+        api = AsyncApigw(service, "api1", "POST", "/a/b")
+
+        run(api.execute(json={"a": 1}, query={"q": 1}))
+
+        assert get_rest_args(service) == ("POST", "api/api1/a/b")
+        kwargs = get_rest_kwargs(service)
+        assert kwargs["json"] == {"a": 1}
+        assert kwargs["query"] == {"q": 1}
+
+
+class TestAsyncUnsupported(object):
+    def test_sync_methods(self):
+        """コルーチン版が無い同期メソッドは TypeError となること"""
+        service = mock_async_service_json_resp({})
+        bucket = AsyncObjectBucket(service, "bucket1")
+
+        for call in [lambda: bucket.update("id1", {}), lambda: bucket.remove("id1"), lambda: bucket.count(),
+                     lambda: AsyncUser.logout(service), lambda: AsyncGroup(service, "g1").remove()]:
+            with pytest.raises(TypeError):
+                call()
+        assert not service.execute_rest.called
+
+    @pytest.mark.parametrize("name", ["writeCoalescing", "queryCache", "etagCache"])
+    def test_unsupported_params(self, name):
+        """未対応のパラメータが指定された場合は ValueError となること"""
+        param = {"baseUrl": "http://localhost/api", "tenantId": "tenant1", "appId": "app1", "appKey": "key1",
+                 name: {}}
+        with pytest.raises(ValueError):
+            AsyncService(param)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from necbaas.batch_sizer import AdaptiveBatchSizer
+
+
+class TestAdaptiveBatchSizer(object):
+    def test_grow(self):
+        """レイテンシが目標内でスループットが向上する間はサイズが増加すること"""
+        sizer = AdaptiveBatchSizer(initial_size=100, max_size=1000, target_latency=1.0)
+        assert sizer.record(100, 0.1) == 151
+        assert sizer.record(151, 0.1) == 227
+        assert sizer.docs == 251
+        assert sizer.batches == 2
+
+    def test_max_size(self):
+        """最大サイズを超えないこと"""
+        sizer = AdaptiveBatchSizer(initial_size=100, max_size=120)
+        assert sizer.record(100, 0.1) == 120
+
+    def test_shrink(self):
+        """レイテンシが目標を超えた場合はサイズが減少すること"""
+        sizer = AdaptiveBatchSizer(initial_size=100, min_size=30, target_latency=1.0)
+        assert sizer.record(100, 2.0) == 50
+        assert sizer.record(50, 2.0) == 30
+
+    def test_revert(self):
+        """サイズ増加でスループットが低下した場合は元に戻すこと"""
+        sizer = AdaptiveBatchSizer(initial_size=100, target_latency=10.0)
+        assert sizer.record(100, 0.1) == 151  # 1000 docs/sec
+        assert sizer.record(151, 0.5) == 100  # 302 docs/sec
+
+    def test_short_batch(self):
+        """端数バッチではサイズを変更しないこと"""
+        sizer = AdaptiveBatchSizer(initial_size=100)
+        assert sizer.record(10, 0.01) == 100
+
+    def test_max_bytes(self):
+        """平均ドキュメントサイズから最大バイト数を超えないよう制限されること"""
+        sizer = AdaptiveBatchSizer(initial_size=100, max_bytes=10000)
+        assert sizer.record(100, 0.1, nbytes=100 * 200) == 50
+        assert sizer.avg_doc_bytes == 200
+
+    def test_to_dict(self):
+        """状態を dict で取得できること"""
+        sizer = AdaptiveBatchSizer(initial_size=100)
+        sizer.record(100, 0.5)
+        d = sizer.to_dict()
+        assert d["batchSize"] == 151
+        assert d["docsPerSec"] == pytest.approx(200, rel=0.1)
+        assert d["requestDocsPerSec"] == 200
+        assert d["docs"] == 100
+
+    def test_docs_per_sec_concurrent(self, monkeypatch):
+        """並列リクエスト時は docs_per_sec が全体の実スループットとなること"""
+        now = [1.0]
+        monkeypatch.setattr("necbaas.batch_sizer.time.time", lambda: now[0])
+        sizer = AdaptiveBatchSizer(initial_size=100)
+        sizer.record(100, 1.0)  # 0.0 - 1.0
+        sizer.record(100, 1.0)  # 0.0 - 1.0, in parallel
+        assert sizer.docs_per_sec == 200
+        assert sizer.request_docs_per_sec == 100
+
+        now[0] = 2.0
+        sizer.record(100, 1.0)  # 1.0 - 2.0
+        assert sizer.docs_per_sec == 150
+
+    def test_bad_limits(self):
+        """不正なサイズ制限はエラーとなること"""
+        with pytest.raises(ValueError):
+            AdaptiveBatchSizer(initial_size=10, min_size=20)
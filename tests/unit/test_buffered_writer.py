@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import pytest
+import requests
+
+import necbaas as baas
+from necbaas.testing import FakeBaasServer
+from necbaas.buffered_writer import BufferedWriter
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class TestBufferedWriter(object):
+    def setup_method(self, method):
+        self.server = FakeBaasServer()
+        self.service = self.server.create_service()
+        self.service.transport.record = True
+        self.bucket = baas.ObjectBucket(self.service, "bucket1")
+
+    def get_batch_sizes(self):
+        return [len(req.json()["requests"]) for req in self.service.transport.requests if req.path.endswith("_batch")]
+
+    def test_write(self):
+        """insert/update/remove がバッチで送信されること"""
+        obj = self.bucket.insert({"a": 1})
+        removed = self.bucket.insert({"a": 2})
+
+        with self.bucket.buffered_writer(max_docs=10, max_delay=10) as writer:
+            f1 = writer.insert({"a": 3})
+            f2 = writer.update(obj["_id"], {"$set": {"a": 10}})
+            f3 = writer.remove(removed["_id"])
+
+        assert f1.result()["result"] == "ok"
+        assert f2.result()["data"]["a"] == 10
+        assert f3.result()["result"] == "ok"
+        assert self.get_batch_sizes() == [3]
+        assert sorted(o["a"] for o in self.bucket.query()) == [3, 10]
+        assert writer.batches == 1
+        assert writer.ops == 3
+
+    def test_max_docs(self):
+        """max_docs 件毎に送信されること"""
+        with self.bucket.buffered_writer(max_docs=4, max_delay=10) as writer:
+            futures = [writer.insert({"n": i}) for i in range(10)]
+        assert [f.result()["data"]["n"] for f in futures] == list(range(10))
+        assert self.get_batch_sizes() == [4, 4, 2]
+
+    def test_max_bytes(self):
+        """max_bytes を超えないよう分割されること"""
+        with self.bucket.buffered_writer(max_bytes=500, max_delay=10) as writer:
+            for i in range(5):
+                writer.insert({"s": "x" * 200})
+        assert self.get_batch_sizes() == [2, 2, 1]
+
+    def test_max_delay(self):
+        """max_delay 経過後に送信されること"""
+        writer = self.bucket.buffered_writer(max_delay=0.05)
+        future = writer.insert({"a": 1})
+        assert future.result(timeout=5)["result"] == "ok"
+        writer.close()
+
+    def test_flush(self):
+        """flush で送信完了を待てること"""
+        writer = self.bucket.buffered_writer(max_delay=10)
+        future = writer.insert({"a": 1})
+        writer.flush(timeout=5)
+        assert future.done()
+        assert len(self.bucket.query()) == 1
+        writer.close()
+
+        with pytest.raises(ValueError):
+            writer.insert({"a": 2})
+
+    def test_error(self):
+        """バッチ要求失敗時は Future に例外がセットされること"""
+        self.server.add_fault("POST", r"_batch$", 500)
+        with self.bucket.buffered_writer(max_delay=10) as writer:
+            future = writer.insert({"a": 1})
+        with pytest.raises(requests.HTTPError):
+            future.result()
+        assert writer.errors == 1
+
+    def test_backpressure(self):
+        """キューが満杯の場合はブロックすること"""
+        def slow(req):
+            time.sleep(0.5)
+            return 500, {}
+        self.service.transport.add_route("POST", r"_batch$", slow)
+
+        writer = BufferedWriter(self.bucket, max_docs=1, max_delay=0, max_queue=1)
+        writer.insert({"a": 1})  # being sent
+        writer.insert({"a": 2}, timeout=1)  # queued
+        with pytest.raises(queue.Full):
+            writer.insert({"a": 3}, timeout=0.01)
+        writer.close()
+
+    def test_close_race(self):
+        """close() と並行した書き込みは完了するかエラーとなり、結果待ちでハングしないこと"""
+        writer = BufferedWriter(self.bucket, max_docs=10, max_delay=0.01)
+        futures = []
+
+        def write():
+            try:
+                while True:
+                    futures.append(writer.insert({"a": 1}))
+            except ValueError:
+                pass
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        writer.close()
+        for thread in threads:
+            thread.join()
+
+        assert futures
+        assert all(future.result(timeout=5)["result"] == "ok" for future in futures)
+        with pytest.raises(ValueError):
+            writer.insert({"a": 1})
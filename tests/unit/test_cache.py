@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from mock import patch
+from necbaas.cache import TTLCache, QueryCache
+
+
+class TestTTLCache(object):
+    def test_expire(self):
+        """TTL 経過後はエントリが取得できないこと"""
+        cache = TTLCache(ttl=10)
+        with patch("time.time", return_value=1000.0):
+            cache.put("a", 1)
+            cache.put("b", 2, ttl=100)
+        with patch("time.time", return_value=1011.0):
+            assert cache.get("a") is None
+            assert cache.get("a", 0) == 0
+            assert cache.get("b") == 2
+
+    def test_lru(self):
+        """最大エントリ数を超えると最も使われていないエントリが削除されること"""
+        cache = TTLCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert len(cache) == 2
+        with pytest.raises(ValueError):
+            TTLCache(max_entries=0)
+
+    def test_invalidate(self):
+        """条件に一致するエントリを削除できること"""
+        cache = TTLCache()
+        for key in [("x", 1), ("x", 2), ("y", 1)]:
+            cache.put(key, 0)
+
+        assert cache.invalidate(lambda key: key[0] == "x") == 2
+        assert cache.get(("y", 1)) == 0
+        assert cache.invalidate() == 1
+        assert len(cache) == 0
+
+    def test_max_bytes(self):
+        """合計サイズを超えると古いエントリが削除され、統計が取得できること"""
+        cache = TTLCache(max_bytes=10)
+        cache.put("a", "a", size=4)
+        cache.put("b", "b", size=4)
+        cache.put("c", "c", size=4)
+        cache.put("d", "d", size=11)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "b"
+        assert cache.get("d") is None
+        assert cache.to_dict() == {"entries": 2, "bytes": 8, "hits": 1, "misses": 2, "evictions": 1,
+                                   "hitRatio": 1.0 / 3}
+
+
+class TestQueryCache(object):
+    def test_generation(self):
+        """書き込み後は書き込み前に開始したクエリ結果がキャッシュされないこと"""
+        cache = QueryCache.from_config({"ttl": 10, "maxEntries": 5, "maxBytes": 100})
+        assert (cache.ttl, cache.max_entries, cache.max_bytes) == (10, 5, 100)
+
+        cache.put_query("b1", cache.generation("b1"), ("b1", 1), "x", 1)
+        generation = cache.generation("b1")
+        cache.put_query("b2", cache.generation("b2"), ("b2", 1), "y", 1)
+        assert cache.invalidate_bucket("b1") == 1
+
+        cache.put_query("b1", generation, ("b1", 2), "z", 1)
+        assert cache.get(("b1", 2)) is None
+        assert cache.get(("b2", 1)) == "y"
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import os
+
+from necbaas.checkpoint import load_checkpoint, save_checkpoint, remove_checkpoint
+
+
+class TestCheckpoint(object):
+    def test_save_load(self, tmpdir):
+        """チェックポイントを保存・読み込み・削除できること"""
+        path = str(tmpdir.join("checkpoint"))
+        assert load_checkpoint(path) is None
+
+        save_checkpoint(path, {"lastId": "id1", "count": 1})
+        save_checkpoint(path, {"lastId": "id2", "count": 2})
+        assert load_checkpoint(path) == {"lastId": "id2", "count": 2}
+        assert not os.path.exists(path + ".tmp")
+
+        remove_checkpoint(path)
+        remove_checkpoint(path)
+        assert not os.path.exists(path)
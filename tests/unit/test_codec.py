@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+
+import necbaas as baas
+from necbaas.codec import JsonCodec, get_codec
+
+
+class TestJsonCodec(object):
+    data = {"key": u"値", "list": [1, 2.5, None, True], "nested": {"a": "b"}}
+
+    def _test_codec(self, codec):
+        assert json.loads(codec.dumps(self.data)) == self.data
+        assert json.loads(codec.dumps_bytes(self.data).decode("utf-8")) == self.data
+        assert codec.loads(json.dumps(self.data)) == self.data
+        assert codec.loads(json.dumps(self.data).encode("utf-8")) == self.data
+
+    def test_json(self):
+        """標準 JSON コーデックで正常にエンコード・デコードできること"""
+        codec = get_codec("json")
+        assert type(codec) is JsonCodec
+        assert codec.dumps(self.data) == json.dumps(self.data)
+        self._test_codec(codec)
+
+    @pytest.mark.parametrize("name", ["orjson", "ujson"])
+    def test_other_codec(self, name):
+        """外部ライブラリのコーデックで正常にエンコード・デコードできること"""
+        pytest.importorskip(name)
+        codec = get_codec(name)
+        assert codec.name == name
+        self._test_codec(codec)
+
+    def test_unknown_codec(self):
+        """不明なコーデック名はエラーとなること"""
+        with pytest.raises(ValueError):
+            get_codec("xxx")
+
+
+class TestServiceCodec(object):
+    def get_sample_param(self):
+        return {
+            "baseUrl": "http://localhost/api",
+            "tenantId": "tenant1",
+            "appId": "app1",
+            "appKey": "key1"
+        }
+
+    def test_default_codec(self):
+        """デフォルトは標準 JSON コーデックであること"""
+        service = baas.Service(self.get_sample_param())
+        assert type(service.json_codec) is JsonCodec
+
+    def test_custom_codec(self):
+        """コーデック指定時はリクエストボディがコーデックでエンコードされること"""
+        class Codec(JsonCodec):
+            def dumps(self, obj):
+                return "ENCODED"
+
+        service = baas.Service(self.get_sample_param())
+        service.json_codec = Codec()
+
+        args = service._build_request_args("a/b/c", json={"a": 1})
+        assert "json" not in args
+        assert args["data"] == b"ENCODED"
+        assert args["headers"]["Content-Type"] == "application/json"
+
+    def test_codec_param(self):
+        """jsonCodec パラメータでコーデックを指定できること"""
+        pytest.importorskip("orjson")
+        param = self.get_sample_param()
+        param["jsonCodec"] = "orjson"
+        service = baas.Service(param)
+        assert service.json_codec.name == "orjson"
+
+    def test_bucket_codec(self):
+        """バケットがサービスのコーデックを使用すること"""
+        class Codec(JsonCodec):
+            def dumps(self, obj):
+                return "ENCODED"
+
+            def loads(self, s):
+                return {"results": ["DECODED"]}
+
+        service = baas.Service(self.get_sample_param())
+        service.json_codec = Codec()
+        service.execute_rest = lambda *args, **kwargs: type("Res", (), {"content": b"{}", "kwargs": kwargs})
+
+        bucket = baas.ObjectBucket(service, "bucket1")
+        method, path, kwargs = bucket._query_request(where={"a": 1}, projection={"b": 1})
+        assert kwargs["query"]["where"] == "ENCODED"
+        assert kwargs["query"]["projection"] == "ENCODED"
+        assert bucket.query() == ["DECODED"]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import math
+from array import array
+import pytest
+
+from necbaas import columns as columns_module
+from necbaas.columns import ColumnBuilder
+
+
+class TestColumnBuilder(object):
+    def test_build(self):
+        """型指定に従いカラムが生成されること"""
+        builder = ColumnBuilder(["i", "f", "b", "s", "o.x"], {"i": "int", "f": "float", "b": "bool"})
+        builder.extend([
+            {"i": 1, "f": 1.5, "b": True, "s": "a", "o": {"x": [1]}},
+            {"i": 2, "f": 2, "b": False, "s": "b"},
+        ])
+        columns = builder.to_dict()
+
+        assert isinstance(columns["i"], array) and columns["i"].itemsize == 8
+        assert list(columns["i"]) == [1, 2]
+        assert columns["f"] == array("d", [1.5, 2.0])
+        assert columns["b"] == array("b", [1, 0])
+        assert columns["s"] == ["a", "b"]
+        assert columns["o.x"] == [[1], None]
+        assert builder.count == 2
+
+    def test_infer(self):
+        """型推論・昇格が行われること"""
+        builder = ColumnBuilder(["a", "b", "c", "d", "e"])
+        builder.extend([
+            {"a": 1, "b": 1, "c": "x", "d": True},
+            {"b": 2.5, "c": 1, "d": False},
+            {"a": 3, "b": 3, "d": None},
+        ])
+        columns = builder.to_dict()
+
+        assert isinstance(columns["a"], array) and columns["a"].typecode == "d"
+        assert columns["a"][0] == 1 and math.isnan(columns["a"][1]) and columns["a"][2] == 3
+        assert list(columns["b"]) == [1.0, 2.5, 3.0]
+        assert columns["c"] == ["x", 1, None]
+        assert columns["d"] == [True, False, None]
+        assert columns["e"] == [None, None, None]
+        assert builder.dtypes == {"a": "float", "b": "float", "c": "object", "d": "object", "e": "object"}
+
+    def test_bad_value(self):
+        """型指定されたカラムに不正な値がある場合はエラーとなること"""
+        builder = ColumnBuilder(["i"], {"i": "int"})
+        with pytest.raises(ValueError):
+            builder.append({"i": "x"})
+        with pytest.raises(ValueError):
+            builder.append({})
+        with pytest.raises(ValueError):
+            ColumnBuilder(["i"], {"i": "int32"})
+
+    def test_to_numpy(self):
+        """NumPy 配列に変換できること"""
+        numpy = pytest.importorskip("numpy")
+        builder = ColumnBuilder(["i", "b", "s"])
+        builder.extend([{"i": 1, "b": True, "s": "a"}, {"i": 2, "b": False, "s": "b"}])
+        arrays = builder.to_numpy()
+
+        assert arrays["i"].dtype == numpy.int64
+        assert list(arrays["i"]) == [1, 2]
+        assert list(arrays["b"]) == [True, False]
+        assert list(arrays["s"]) == ["a", "b"]
+
+    def test_int_typecode_fallback(self, monkeypatch):
+        """'q' が使えない環境 (Python 2) では 'l' またはリストで格納されること"""
+        def py2_array(typecode, *args):
+            if typecode == "q":
+                raise ValueError("bad typecode")
+            return array(typecode, *args)
+        monkeypatch.setattr(columns_module, "array", py2_array)
+        assert columns_module._int_typecode() == ("l" if array("l").itemsize == 8 else None)
+
+        monkeypatch.setitem(columns_module._TYPECODES, "int", None)
+        builder = ColumnBuilder(["i"], {"i": "int"})
+        builder.extend([{"i": 1}, {"i": 2}])
+        assert builder.to_dict()["i"] == [1, 2]
+
+        numpy = pytest.importorskip("numpy")
+        arrays = builder.to_numpy()
+        assert arrays["i"].dtype == numpy.int64
+        assert list(arrays["i"]) == [1, 2]
+
+    def test_to_dataframe(self):
+        """DataFrame に変換できること"""
+        pytest.importorskip("pandas")
+        builder = ColumnBuilder(["i", "s"])
+        builder.extend([{"i": 1, "s": "a"}, {"i": 2, "s": "b"}])
+        df = builder.to_dataframe()
+
+        assert list(df.columns) == ["i", "s"]
+        assert list(df["i"]) == [1, 2]
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from mock import patch
+
+import necbaas as baas
+from necbaas.testing import FakeBaasServer
+
+
+class TestETagCache(object):
+    def create_service(self, config):
+        server = FakeBaasServer()
+        service = server.create_service(param={"etagCache": config})
+        service.transport.record = True
+        return service
+
+    def test_revalidate(self):
+        """ETag で再検証され、304 の場合はキャッシュから応答されること"""
+        service = self.create_service({})
+        group = baas.Group(service, "group1")
+        group.upsert(users=["user1"])
+
+        first = group.get()
+        assert group.get() == first
+        req = service.transport.requests[-1]
+        assert req.headers["If-None-Match"]
+
+        group.add_members(users=["user2"])
+        assert group.get()["users"] == ["user1", "user2"]
+
+        stats = service.etag_cache.to_dict()
+        assert stats["revalidated"] == 1
+        assert stats["freshHits"] == 0
+
+    def test_policies(self):
+        """パスプレフィックス毎のポリシーで、maxAge 期間中はリクエストしないこと"""
+        service = self.create_service({"policies": {"/groups/": {"maxAge": 10}, "/groups/group2": None}})
+        group = baas.Group(service, "group1")
+        group.upsert(users=["user1"])
+        group2 = baas.Group(service, "group2")
+        group2.upsert(users=["user1"])
+
+        with patch("time.time", return_value=1000.0):
+            group.get()
+            group2.get()
+            sent = len(service.transport.requests)
+            group.get()
+            assert len(service.transport.requests) == sent
+            group2.get()
+            assert "If-None-Match" not in service.transport.requests[-1].headers
+        with patch("time.time", return_value=1011.0):
+            group.get()
+            assert "If-None-Match" in service.transport.requests[-1].headers
+        assert service.etag_cache.to_dict()["freshHits"] == 1
+
+    def test_not_cached(self):
+        """ポリシー対象外のパスはキャッシュされないこと"""
+        service = self.create_service({"policies": {"/users/": {}}})
+        bucket = baas.ObjectBucket(service, "bucket1")
+        bucket.insert({"a": 1})
+        bucket.query()
+        bucket.query()
+
+        assert service.etag_cache.to_dict()["entries"] == 0
+        assert "If-None-Match" not in service.transport.requests[-1].headers
+
+    def test_file_download_not_cached(self):
+        """デフォルトではファイルメタデータのみキャッシュされ、ダウンロードはキャッシュされないこと"""
+        service = self.create_service({})
+        bucket = baas.FileBucket(service, "bucket1")
+        bucket.create("file1", b"data")
+
+        assert bucket.download("file1").content == b"data"
+        assert bucket.download("file1").content == b"data"
+        assert "If-None-Match" not in service.transport.requests[-1].headers
+
+        bucket.get_metadata("file1")
+        bucket.get_metadata("file1")
+        assert "If-None-Match" in service.transport.requests[-1].headers
+        assert service.etag_cache.to_dict()["entries"] == 1
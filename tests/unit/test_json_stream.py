@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+
+from necbaas.json_stream import JsonArrayStream, iter_json_array
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonArrayStream(object):
+    def test_decode(self):
+        """配列要素が逐次デコードされること"""
+        doc = {"count": 12345, "results": [{"a": i, "s": u"日本語\"{}]", "f": 1.5e10, "n": None} for i in range(20)],
+               "after": [1, 2]}
+        data = json.dumps(doc, ensure_ascii=False).encode("utf-8")
+
+        for size in (1, 2, 3, 7, 64, len(data)):
+            stream = JsonArrayStream(split(data, size))
+            assert list(stream) == doc["results"]
+            assert stream.extras == {"count": 12345, "after": [1, 2]}
+
+    def test_lazy(self):
+        """全データ受信前に要素が返却されること"""
+        received = []
+
+        def chunks():
+            for chunk in [b'{"results": [{"a": 1}, ', b'{"a": 2}', b"]}"]:
+                received.append(chunk)
+                yield chunk
+
+        it = iter_json_array(chunks())
+        assert next(it) == {"a": 1}
+        assert len(received) == 1
+        assert list(it) == [{"a": 2}]
+
+    def test_empty(self):
+        """空配列・空オブジェクトを処理できること"""
+        assert list(iter_json_array([b' { "results" : [ ] } '])) == []
+        assert list(iter_json_array([b"{}"])) == []
+
+    def test_number_split(self):
+        """チャンク境界で分割された数値が正しくデコードされること"""
+        stream = JsonArrayStream([b'{"count": 12', b'34, "results": [56', b"78]}"])
+        assert list(stream) == [5678]
+        assert stream.extras["count"] == 1234
+
+    @pytest.mark.parametrize("data", [b'{"results": [1, 2', b'{"results": [1 2]}', b'[1, 2]', b'{"results": [{"a": }]}'])
+    def test_error(self, data):
+        """不正な JSON はエラーとなること"""
+        with pytest.raises(ValueError):
+            list(iter_json_array(split(data, 3)))
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import gzip
 import json
+import os
+import threading
 import pytest
+import requests
 
 import necbaas as baas
 
+from mock import patch
+from necbaas.cache import QueryCache
 from .util import *
 
 
@@ -154,3 +160,596 @@ class TestObjectBucket(object):
         assert get_rest_args(service) == ("POST", "/objects/bucket1/_aggregate")
         kwargs = get_rest_kwargs(service)
         assert kwargs["json"] == {"pipeline": pipeline, "options": options}
+
+
+class TestObjectBucketIteration(object):
+    def get_bucket(self, count):
+        _, service, bucket = create_fake_bucket([{"n": i} for i in range(count)])
+        return service, bucket
+
+    def test_iter_query(self):
+        """ページ単位で遅延取得しながら全件イテレートできること"""
+        service, bucket = self.get_bucket(25)
+
+        it = bucket.iter_query(where={"n": {"$gte": 0}}, order="n", page_size=10)
+        assert next(it)["n"] == 0
+        assert len(service.transport.requests) == 1
+
+        results = [obj["n"] for obj in it]
+        assert results == list(range(1, 25))
+        queries = [req.query for req in service.transport.requests]
+        assert [(q.get("skip"), q["limit"]) for q in queries] == [(None, "10"), ("10", "10"), ("20", "10")]
+
+    def test_iter_query_exact_page(self):
+        """件数がページサイズの倍数の場合、最後に空ページを取得して終了すること"""
+        service, bucket = self.get_bucket(20)
+
+        assert len(list(bucket.iter_query(order="n", page_size=10))) == 20
+        assert len(service.transport.requests) == 3
+
+    def test_iter_query_limit(self):
+        """skip/limit 指定時は範囲内のみイテレートすること"""
+        service, bucket = self.get_bucket(25)
+
+        results = [obj["n"] for obj in bucket.iter_query(order="n", page_size=10, skip=5, limit=12)]
+        assert results == list(range(5, 17))
+        assert [req.query["limit"] for req in service.transport.requests] == ["10", "2"]
+
+    def test_iter_query_bad_page_size(self):
+        """page_size が不正な場合はエラーとなること"""
+        service, bucket = self.get_bucket(0)
+        with pytest.raises(ValueError):
+            next(bucket.iter_query(page_size=0))
+
+    def test_scan(self):
+        """_id をキーにキーセットページングで全件スキャンできること"""
+        service, bucket = self.get_bucket(25)
+
+        results = list(bucket.scan(where={"n": {"$ne": 3}}, page_size=10))
+        assert sorted(obj["n"] for obj in results) == [n for n in range(25) if n != 3]
+        assert [obj["_id"] for obj in results] == sorted(obj["_id"] for obj in results)
+
+        queries = [req.query for req in service.transport.requests]
+        assert len(queries) == 3
+        assert "skip" not in queries[1]
+        assert queries[1]["order"] == "_id"
+        assert json.loads(queries[1]["where"]) == {"$and": [{"n": {"$ne": 3}}, {"_id": {"$gt": results[9]["_id"]}}]}
+
+    def test_scan_with_key(self):
+        """重複のあるキーでも重複・欠落なくスキャンできること"""
+        service, bucket = self.get_bucket(0)
+        bucket.batch([{"op": "insert", "data": {"n": i, "group": i % 3}} for i in range(20)])
+
+        results = list(bucket.scan(key="group", page_size=4, projection={"n": 1}, descending=True))
+        assert sorted(obj["n"] for obj in results) == list(range(20))
+        assert [obj["group"] for obj in results] == sorted((obj["group"] for obj in results), reverse=True)
+        assert service.transport.requests[-1].query["order"] == "-group,-_id"
+
+    def test_scan_missing_key(self):
+        """キーが無い・null のオブジェクトはスキャン対象外となること"""
+        service, bucket = self.get_bucket(0)
+        bucket.batch([{"op": "insert", "data": {"x": i}} for i in range(3)] +
+                     [{"op": "insert", "data": {"k": None}}] +
+                     [{"op": "insert", "data": {"k": i}} for i in range(5)])
+
+        assert [obj["k"] for obj in bucket.scan(key="k", page_size=2)] == list(range(5))
+        assert [obj["k"] for obj in bucket.scan(key="k", page_size=2, descending=True)] == list(range(4, -1, -1))
+        assert sorted(obj["k"] for obj in bucket.parallel_scan(key="k", partitions=2, page_size=2)) == list(range(5))
+
+    def test_scan_resume(self):
+        """start_after 指定で途中から再開できること"""
+        service, bucket = self.get_bucket(10)
+        first = list(bucket.scan(page_size=3))
+
+        assert list(bucket.scan(page_size=3, start_after=first[4]["_id"])) == first[5:]
+        assert list(bucket.scan(key="n", page_size=3, start_after=first[4])) == first[5:]
+
+    def test_scan_bad_args(self):
+        """不正な引数はエラーとなること"""
+        service, bucket = self.get_bucket(0)
+        with pytest.raises(ValueError):
+            next(bucket.scan(page_size=0))
+        with pytest.raises(ValueError):
+            next(bucket.scan(key="n", projection={"n": 0}))
+        with pytest.raises(ValueError):
+            next(bucket.scan(key="n", start_after="id1"))
+
+    def test_parallel_scan(self):
+        """_id 範囲を分割して並列スキャンできること"""
+        service, bucket = self.get_bucket(100)
+
+        results = list(bucket.parallel_scan(where={"n": {"$ne": 3}}, partitions=4, workers=2, page_size=10))
+        assert sorted(obj["n"] for obj in results) == [n for n in range(100) if n != 3]
+
+        ordered = list(bucket.parallel_scan(partitions=4, page_size=10, ordered=True))
+        assert [obj["_id"] for obj in ordered] == sorted(obj["_id"] for obj in ordered)
+        assert len(ordered) == 100
+
+    def test_parallel_scan_numeric_key(self):
+        """数値キーの範囲を分割して並列スキャンできること"""
+        service, bucket = self.get_bucket(50)
+
+        results = list(bucket.parallel_scan(key="n", partitions=3, page_size=7, ordered=True, projection={"n": 1}))
+        assert [obj["n"] for obj in results] == list(range(50))
+
+        wheres = [json.loads(req.query["where"]) for req in service.transport.requests if "where" in req.query]
+        has_key = {"n": {"$exists": True, "$ne": None}}
+        assert {"$and": [{"n": {"$lt": 16}}, has_key]} in wheres
+        assert {"$and": [{"n": {"$gte": 16, "$lt": 32}}, has_key]} in wheres
+        assert {"$and": [{"n": {"$gte": 32}}, has_key]} in wheres
+
+    def test_parallel_scan_date_key(self):
+        """日付キーの範囲を分割できること"""
+        service, bucket = self.get_bucket(0)
+        bucket.batch([{"op": "insert", "data": {"date": "2020-01-0{}T00:00:00.000Z".format(i)}} for i in range(1, 6)])
+
+        assert bucket._get_partition_boundaries(None, "date", 2, False) == ["2020-01-03T00:00:00.000Z"]
+        assert len(list(bucket.parallel_scan(key="date", partitions=2))) == 5
+
+    def test_parallel_scan_boundaries(self):
+        """境界値を指定して並列スキャンできること"""
+        service, bucket = self.get_bucket(30)
+
+        results = list(bucket.parallel_scan(key="n", boundaries=[10, 20], ordered=True, page_size=4))
+        assert [obj["n"] for obj in results] == list(range(30))
+
+        bucket.insert({"tag": "a"})
+        with pytest.raises(ValueError):
+            next(bucket.parallel_scan(key="tag"))
+
+    def test_parallel_scan_error(self):
+        """スキャン中のエラーが呼び出し元に伝搬されること"""
+        server, _, bucket = create_fake_bucket([{"n": i} for i in range(30)])
+        server.add_fault("GET", r"^objects/", 500, count=1000)
+
+        with pytest.raises(requests.HTTPError):
+            list(bucket.parallel_scan(key="n", boundaries=[10, 20]))
+
+    def test_parallel_scan_close(self):
+        """途中でイテレーションを終了できること"""
+        service, bucket = self.get_bucket(100)
+
+        it = bucket.parallel_scan(partitions=4, page_size=5, max_pages_in_flight=4)
+        assert next(it) is not None
+        it.close()
+        count = len(service.transport.requests)
+        assert count < 20
+
+    def test_stream_query(self):
+        """クエリ結果をストリーミングでデコードできること"""
+        service, bucket = self.get_bucket(30)
+
+        it = bucket.stream_query(where={"n": {"$lt": 20}}, order="n", limit=-1, chunk_size=16)
+        assert [obj["n"] for obj in it] == list(range(20))
+        assert service.transport.requests[-1].query["limit"] == "-1"
+
+    def test_stream_aggregate(self):
+        """aggregate 結果をストリーミングでデコードできること"""
+        service, bucket = self.get_bucket(30)
+
+        pipeline = [{"$match": {"n": {"$gte": 25}}}, {"$sort": {"n": -1}}]
+        assert [obj["n"] for obj in bucket.stream_aggregate(pipeline, chunk_size=10)] == [29, 28, 27, 26, 25]
+
+    def test_stream_lazy(self):
+        """イテレーション開始までリクエストを送信しないこと"""
+        service, bucket = self.get_bucket(5)
+
+        it = bucket.stream_query(limit=-1)
+        it2 = bucket.stream_aggregate([{"$match": {}}])
+        assert service.transport.requests == []
+        assert next(it)["n"] == 0
+        assert len(service.transport.requests) == 1
+        it.close()
+        it2.close()
+        assert len(service.transport.requests) == 1
+
+    def test_bulk_insert(self):
+        """件数で分割して一括 INSERT できること"""
+        service, bucket = self.get_bucket(0)
+
+        results = bucket.bulk_insert(({"n": i} for i in range(25)), chunk_size=10, max_in_flight=2)
+        assert len(results) == 25
+        assert all(r["result"] == "ok" for r in results)
+        assert [r["data"]["n"] for r in results] == list(range(25))
+
+        batches = [req.json()["requests"] for req in service.transport.requests]
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert len(bucket.query(limit=-1)) == 25
+
+    def test_bulk_insert_max_bytes(self):
+        """シリアライズサイズで分割されること"""
+        service, bucket = self.get_bucket(0)
+
+        data = [{"s": "x" * 100}] * 10
+        items = list(bucket.bulk_insert_iter(data, chunk_size=100, max_bytes=350))
+        assert [index for index, _ in items] == list(range(10))
+
+        batches = [req.json()["requests"] for req in service.transport.requests]
+        assert [len(b) for b in batches] == [3, 3, 3, 1]
+
+    def test_bulk_insert_error(self):
+        """バッチ要求のエラーが呼び出し元に伝搬されること"""
+        server, _, bucket = create_fake_bucket()
+        server.add_fault("POST", r"_batch$", 500)
+
+        with pytest.raises(requests.HTTPError):
+            bucket.bulk_insert([{"n": i} for i in range(10)], chunk_size=2)
+
+    def test_bulk_insert_lazy(self):
+        """入力を遅延読み出しし、in-flight 数を超えて先読みしないこと"""
+        service, bucket = self.get_bucket(0)
+        consumed = []
+
+        def generate():
+            for i in range(100):
+                consumed.append(i)
+                yield {"n": i}
+
+        it = bucket.bulk_insert_iter(generate(), chunk_size=10, max_in_flight=2)
+        assert next(it)[0] == 0
+        assert len(consumed) <= 31
+        it.close()
+
+    def test_bulk_insert_adaptive(self):
+        """AdaptiveBatchSizer でバッチサイズが調整されること"""
+        service, bucket = self.get_bucket(0)
+        sizer = baas.AdaptiveBatchSizer(initial_size=10, min_size=10, max_size=40, target_latency=60)
+
+        results = bucket.bulk_insert(({"n": i} for i in range(200)), max_in_flight=1, sizer=sizer)
+        assert [r["data"]["n"] for r in results] == list(range(200))
+
+        sizes = [len(req.json()["requests"]) for req in service.transport.requests]
+        assert sizes[0] == 10
+        assert max(sizes) > 10
+        assert sizer.docs == 200
+        assert sizer.avg_doc_bytes > 0
+
+
+class TestObjectBucketCoalescing(object):
+    def setup_method(self, method):
+        self.server, self.service, _ = create_fake_bucket(
+            param={"writeCoalescing": {"maxDelay": 0.05, "maxDocs": 50}})
+
+    def test_coalescing(self):
+        """並行した書き込みが1つのバッチ要求にまとめられること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        results = {}
+
+        def insert(i):
+            results[i] = baas.ObjectBucket(self.service, "bucket1").insert({"n": i})
+
+        threads = [threading.Thread(target=insert, args=(i,)) for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(r["n"] for r in results.values()) == list(range(10))
+        paths = [req.path for req in self.service.transport.requests]
+        assert paths == ["/api/1/tenant1/objects/bucket1/_batch"]
+
+        obj = results[0]
+        updated = bucket.update(obj["_id"], {"$set": {"n": 100}}, etag=obj["etag"])
+        assert updated["n"] == 100
+        assert bucket.remove(obj["_id"], soft_delete=True)["_deleted"] is True
+        assert self.service.transport.requests[-1].query["deleteMark"] == "1"
+        self.service.close()
+
+    def test_coalescing_error(self):
+        """個別の操作の失敗は HTTPError となること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        obj = bucket.insert({"n": 1})
+
+        with pytest.raises(requests.HTTPError) as e:
+            bucket.update(obj["_id"], {"n": 2}, etag="bad")
+        assert e.value.response.status_code == 409
+
+        with pytest.raises(requests.HTTPError) as e:
+            bucket.remove("unknown")
+        assert e.value.response.status_code == 404
+        self.service.close()
+
+
+class TestObjectBucketBatchRetry(object):
+    def setup_method(self, method):
+        self.server, self.service, self.bucket = create_fake_bucket()
+        self.policy = baas.RetryPolicy(max_retries=3, backoff_factor=0)
+
+    def test_batch_with_retry(self):
+        """失敗した項目のみ再送され、元の順序で結果が返ること"""
+        obj = self.bucket.insert({"n": 0})
+        self.service.transport.requests = []
+        self.server.add_batch_fault(500, count=2)
+
+        requests = [
+            {"op": "insert", "data": {"n": 1}},
+            {"op": "insert", "data": {"n": 2}},
+            {"op": "update", "_id": obj["_id"], "data": {"n": 3}, "etag": "bad"},
+            {"op": "insert", "data": {"n": 4}}
+        ]
+        results = self.bucket.batch_with_retry(requests, retry_policy=self.policy)
+        assert [r["result"] for r in results] == ["ok", "ok", "conflict", "ok"]
+        assert [r["data"]["n"] for r in results if r["result"] == "ok"] == [1, 2, 4]
+
+        batches = [req.json()["requests"] for req in self.service.transport.requests]
+        assert [len(b) for b in batches] == [4, 2]
+        assert len(self.bucket.query()) == 4
+
+    def test_batch_with_retry_exhausted(self):
+        """リトライ上限を超えた項目は最後の結果が返ること"""
+        self.server.add_batch_fault(500, count=100)
+
+        with patch("time.sleep") as mock_sleep:
+            results = self.bucket.batch_with_retry([{"op": "insert", "data": {"n": 1}}],
+                                                   retry_policy=baas.RetryPolicy(max_retries=2))
+        assert results[0]["result"] == "serverError"
+        assert len(self.service.transport.requests) == 3
+        assert mock_sleep.call_count == 2
+
+    def test_bulk_insert_retry(self):
+        """bulk_insert で失敗項目が再送されること"""
+        self.server.add_batch_fault(500, count=3)
+
+        results = self.bucket.bulk_insert(({"n": i} for i in range(20)), chunk_size=5, max_in_flight=1,
+                                          retry_policy=self.policy)
+        assert [r["data"]["n"] for r in results] == list(range(20))
+        assert len(self.bucket.query()) == 20
+
+
+class TestObjectBucketColumns(object):
+    def test_query_to_columns(self):
+        """クエリ結果をカラム形式で取得できること(射影が指定されること)"""
+        _, service, bucket = create_fake_bucket([{"n": i, "score": i * 0.5, "name": "x{}".format(i), "other": i}
+                                                 for i in range(10)])
+
+        columns = bucket.query_to_columns(["n", "score", "name"], where={"n": {"$lt": 5}}, order="n", limit=-1)
+        assert list(columns["n"]) == [0, 1, 2, 3, 4]
+        assert list(columns["score"]) == [0.0, 0.5, 1.0, 1.5, 2.0]
+        assert columns["name"] == ["x0", "x1", "x2", "x3", "x4"]
+
+        projection = json.loads(service.transport.requests[-1].query["projection"])
+        assert projection == {"n": 1, "score": 1, "name": 1, "_id": 0}
+
+    def test_query_records(self):
+        """クエリ結果をコンパクトなレコードで取得できること(射影が指定されること)"""
+        _, service, bucket = create_fake_bucket([{"n": i, "name": "x{}".format(i), "other": i} for i in range(5)])
+
+        records = bucket.query_records(["n", "name"], where={"n": {"$lt": 3}}, order="n", limit=-1)
+        assert [(r.n, r.name) for r in records] == [(0, "x0"), (1, "x1"), (2, "x2")]
+        assert all(r._id and r.createdAt and r.ACL for r in records)
+        assert records[0].get("other") is None
+
+        projection = json.loads(service.transport.requests[-1].query["projection"])
+        assert projection == {"_id": 1, "createdAt": 1, "updatedAt": 1, "etag": 1, "ACL": 1, "n": 1, "name": 1}
+
+
+class TestObjectBucketExport(object):
+    @staticmethod
+    def create_bucket(count):
+        return create_fake_bucket([{"n": i} for i in range(count)])[2]
+
+    @staticmethod
+    def read_ndjson(path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            return [json.loads(line.decode("utf-8")) for line in f]
+
+    @pytest.mark.parametrize("name", ["out.ndjson", "out.ndjson.gz"])
+    def test_export(self, tmpdir, name):
+        """NDJSON ファイル(gzip 圧縮含む)にエクスポートできること"""
+        bucket = self.create_bucket(25)
+        path = str(tmpdir.join(name))
+
+        assert bucket.export(path, where={"n": {"$gte": 5}}, page_size=10) == 20
+        assert [obj["n"] for obj in self.read_ndjson(path)] == list(range(5, 25))
+
+    def test_export_partitions(self, tmpdir):
+        """パーティション並列取得でも _id 順にエクスポートされること"""
+        bucket = self.create_bucket(30)
+        path = str(tmpdir.join("out.ndjson"))
+
+        assert bucket.export(path, page_size=4, partitions=3) == 30
+        assert [obj["n"] for obj in self.read_ndjson(path)] == list(range(30))
+
+    @pytest.mark.parametrize("name", ["out.ndjson", "out.ndjson.gz"])
+    def test_export_resume(self, tmpdir, name):
+        """中断したエクスポートをチェックポイントから重複なく再開できること"""
+        bucket = self.create_bucket(25)
+        path = str(tmpdir.join(name))
+        checkpoint = str(tmpdir.join("export.checkpoint"))
+        scan = bucket.scan
+
+        def broken_scan(**kwargs):
+            for i, obj in enumerate(scan(**kwargs)):
+                if i == 15:
+                    raise IOError("interrupted")
+                yield obj
+
+        with patch.object(bucket, "scan", broken_scan):
+            with pytest.raises(IOError):
+                bucket.export(path, page_size=10, checkpoint=checkpoint)
+        assert json.load(open(checkpoint))["count"] == 10
+
+        assert bucket.export(path, page_size=10, checkpoint=checkpoint) == 15
+        assert [obj["n"] for obj in self.read_ndjson(path)] == list(range(25))
+        assert not os.path.exists(checkpoint)
+
+
+class TestObjectBucketImport(object):
+    def test_import_csv(self, tmpdir):
+        """CSV ファイルを変換してインポートでき、進捗が通知されること"""
+        path = tmpdir.join("a.csv")
+        path.write("n,name\n" + "".join("{},x{}\n".format(i, i) for i in range(12)))
+        bucket = create_fake_bucket()[2]
+        reports = []
+
+        def transform(record):
+            n = int(record["n"])
+            return None if n % 4 == 3 else {"n": n, "name": record["name"]}
+
+        summary = bucket.import_file(str(path), chunk_size=4, workers=2, transform=transform,
+                                     progress=reports.append)
+        assert summary["processed"] == 12
+        assert summary["inserted"] == 9
+        assert summary["skipped"] == 0
+        assert summary["failed"] == 0
+        assert reports[-1] == summary and len(reports) == 4  # 3 chunks and completion
+        assert sorted(obj["n"] for obj in bucket.query(limit=-1)) == [0, 1, 2, 4, 5, 6, 8, 9, 10]
+
+    def test_import_resume(self, tmpdir):
+        """中断したインポートをチェックポイントから重複なく再開できること"""
+        path = tmpdir.join("a.ndjson")
+        path.write("".join('{{"key": {}}}\n'.format(i) for i in range(20)))
+        checkpoint = str(tmpdir.join("import.checkpoint"))
+        bucket = create_fake_bucket()[2]
+
+        def interrupt(stats):
+            raise KeyboardInterrupt()
+
+        with pytest.raises(KeyboardInterrupt):
+            bucket.import_file(str(path), chunk_size=5, workers=2, checkpoint=checkpoint, progress=interrupt)
+        assert json.load(open(checkpoint))["processed"] == 5
+
+        summary = bucket.import_file(str(path), chunk_size=5, workers=2, checkpoint=checkpoint, key="key")
+        assert summary["processed"] == 20
+        assert summary["inserted"] + summary["skipped"] == 20
+        assert sorted(obj["key"] for obj in bucket.query(limit=-1)) == list(range(20))
+        assert not os.path.exists(checkpoint)
+
+    def test_import_resume_sizer(self, tmpdir):
+        """バッチサイズが chunk_size より大きい場合も重複なく再開できること"""
+        path = tmpdir.join("a.ndjson")
+        path.write("".join('{{"key": {}}}\n'.format(i) for i in range(200)))
+        checkpoint = str(tmpdir.join("import.checkpoint"))
+        bucket = create_fake_bucket()[2]
+
+        def interrupt(stats):
+            raise KeyboardInterrupt()
+
+        with pytest.raises(KeyboardInterrupt):
+            bucket.import_file(str(path), chunk_size=5, workers=2, checkpoint=checkpoint, progress=interrupt,
+                               sizer=baas.AdaptiveBatchSizer(20, 20, 20))
+        state = json.load(open(checkpoint))
+        assert state["processed"] == 20
+        assert state["read"] > 40
+
+        summary = bucket.import_file(str(path), chunk_size=5, workers=2, checkpoint=checkpoint, key="key",
+                                     sizer=baas.AdaptiveBatchSizer(20, 20, 20))
+        assert summary["processed"] == 200
+        assert summary["inserted"] + summary["skipped"] == 200
+        assert sorted(obj["key"] for obj in bucket.query(limit=-1)) == list(range(200))
+
+
+class TestObjectBucketCount(object):
+    def test_count(self):
+        """件数のみ取得できること(オブジェクトを取得しないこと)"""
+        _, service, bucket = create_fake_bucket()
+        bucket.batch([{"op": "insert", "data": {"n": i}} for i in range(10)])
+
+        assert bucket.count() == 10
+        assert bucket.count(where={"n": {"$lt": 3}}) == 3
+
+        query = service.transport.requests[-1].query
+        assert query["count"] == "1" and query["limit"] == "1"
+        assert json.loads(query["projection"]) == {"_id": 1}
+
+    def test_count_cache(self):
+        """TTL 期間中はキャッシュされた件数が返ること"""
+        _, service, bucket = create_fake_bucket()
+        bucket.insert({"n": 1})
+
+        with patch("time.time", return_value=1000.0):
+            assert bucket.count(cache_ttl=10) == 1
+            bucket.insert({"n": 2})
+            sent = len(service.transport.requests)
+            assert baas.ObjectBucket(service, "bucket1").count(cache_ttl=10) == 1
+            assert bucket.count(where={"n": 2}, cache_ttl=10) == 1
+            assert len(service.transport.requests) == sent + 1
+        with patch("time.time", return_value=1011.0):
+            assert bucket.count(cache_ttl=10) == 2
+
+    def test_count_cache_session(self):
+        """キャッシュはセッショントークン単位で分離されること"""
+        _, service, bucket = create_fake_bucket()
+        bucket.insert({"n": 1})
+
+        assert bucket.count(cache_ttl=10) == 1
+        sent = len(service.transport.requests)
+        service.session_token = "token2"
+        assert bucket.count(cache_ttl=10) == 1
+        assert len(service.transport.requests) == sent + 1
+        assert service.transport.requests[-1].headers["X-Session-Token"] == "token2"
+
+
+class TestObjectBucketGetMany(object):
+    def test_get_many(self):
+        """ID 指定で複数オブジェクトを取得でき、URL 長に収まるよう分割されること"""
+        _, service, bucket = create_fake_bucket()
+        results = bucket.batch([{"op": "insert", "data": {"n": i}} for i in range(150)])
+        ids = [result["data"]["_id"] for result in results]
+        unknown = ["{:024x}".format(i) for i in range(2)]
+
+        del service.transport.requests[:]
+        objects, missing = bucket.get_many(ids + unknown + ids[:10], projection={"n": 1})
+        assert len(objects) == 150
+        assert all(objects[oid]["n"] == i for i, oid in enumerate(ids))
+        assert missing == unknown
+
+        requests = service.transport.requests
+        assert len(requests) > 1
+        assert all(req.method == "GET" for req in requests)
+
+    def test_get_many_group_size(self):
+        """グループサイズ指定で分割されること"""
+        _, service, bucket = create_fake_bucket()
+        ids = [bucket.insert({"n": i})["_id"] for i in range(10)]
+
+        del service.transport.requests[:]
+        objects, missing = bucket.get_many(ids, group_size=3, workers=1)
+        assert sorted(objects) == sorted(ids) and missing == []
+        assert len(service.transport.requests) == 4
+
+        with pytest.raises(ValueError):
+            bucket.get_many(ids, projection={"_id": 0})
+
+    def test_get_many_large_projection(self):
+        """射影が大きく POST でクエリされる場合も取得できること"""
+        _, service, bucket = create_fake_bucket()
+        ids = [bucket.insert({"field000": i})["_id"] for i in range(5)]
+        projection = {"field%03d" % i: 1 for i in range(120)}
+
+        del service.transport.requests[:]
+        objects, missing = bucket.get_many(ids, projection=projection)
+        assert sorted(objects) == sorted(ids) and missing == []
+        assert [req.method for req in service.transport.requests] == ["POST"]
+
+        del service.transport.requests[:]
+        bucket.get_many(ids, projection=projection, group_size=2, workers=1)
+        assert len(service.transport.requests) == 3
+
+
+class TestObjectBucketQueryCache(object):
+    def test_query_cache(self):
+        """クエリ結果がキャッシュされ、書き込みで無効化されること"""
+        _, service, bucket = create_fake_bucket()
+        service.query_cache = QueryCache()
+        other = baas.ObjectBucket(service, "bucket2")
+        oid = bucket.insert({"n": 1})["_id"]
+        other.insert({"n": 1})
+
+        results = bucket.query(where={"n": 1, "_id": oid})
+        results[0]["n"] = 100  # results are not shared
+        other.query()
+        sent = len(service.transport.requests)
+        assert bucket.query(where={"_id": oid, "n": 1}) == [dict(results[0], n=1)]
+        assert other.query()[0]["n"] == 1
+        assert len(service.transport.requests) == sent
+
+        bucket.update(oid, {"$set": {"n": 2}})
+        assert bucket.query(where={"_id": oid})[0]["n"] == 2
+        assert other.query()[0]["n"] == 1
+        stats = service.query_cache.to_dict()
+        assert stats["hits"] == 3 and stats["misses"] == 3
+
+        bucket.batch([{"op": "insert", "data": {"n": 3}}])
+        assert len(bucket.query()) == 2
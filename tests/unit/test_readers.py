@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import gzip
+import pytest
+
+from necbaas.readers import guess_format, read_records
+
+
+class TestReaders(object):
+    def test_guess_format(self):
+        """拡張子から形式を判定できること"""
+        assert guess_format("a.ndjson") == "ndjson"
+        assert guess_format("a.jsonl.gz") == "ndjson"
+        assert guess_format("a.csv.gz") == "csv"
+        with pytest.raises(ValueError):
+            guess_format("a.txt")
+
+    def test_read_ndjson(self, tmpdir):
+        """NDJSON ファイル(gzip 圧縮含む)を読み込めること"""
+        path = str(tmpdir.join("a.ndjson.gz"))
+        with gzip.open(path, "wb") as f:
+            f.write(u'{"a": 1}\n\n{"a": "あ"}\n'.encode("utf-8"))
+
+        assert list(read_records(path)) == [{"a": 1}, {"a": u"あ"}]
+
+    def test_read_csv(self, tmpdir):
+        """CSV ファイルを読み込めること"""
+        path = tmpdir.join("a.csv")
+        path.write_binary(u'name,price\n"x,y",100\nあ,\n'.encode("utf-8"))
+
+        assert list(read_records(str(path))) == [{"name": "x,y", "price": "100"}, {"name": u"あ", "price": ""}]
+        with pytest.raises(ValueError):
+            read_records(str(path), format="xml")
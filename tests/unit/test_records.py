@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from necbaas.records import Record, make_record_type
+
+OBJ = {
+    "_id": "id1",
+    "createdAt": "2018-05-21T00:00:00.000Z",
+    "updatedAt": "2018-05-22T00:00:00.000Z",
+    "ACL": {"owner": "user1", "r": ["g:anonymous"], "w": []},
+    "etag": "etag1",
+    "name": "orange",
+    "stock": {"count": 10},
+    "unused": 1
+}
+
+
+class TestRecord(object):
+    def test_access(self):
+        """属性・フィールド名でアクセスできること"""
+        Product = make_record_type(["name", "stock.count", "price"], "Product")
+        record = Product(OBJ)
+
+        assert isinstance(record, Record)
+        assert type(record).__name__ == "Product"
+        assert record._id == "id1"
+        assert record.createdAt == "2018-05-21T00:00:00.000Z"
+        assert record.etag == "etag1"
+        assert record.name == "orange"
+        assert record["stock.count"] == 10
+        assert record.price is None
+        assert record.get("price", 0) == 0
+        assert record.get("unused") is None
+        assert record.ACL == OBJ["ACL"]
+
+    def test_compact(self):
+        """インスタンス辞書を持たず、同一 ACL は共有されること"""
+        Product = make_record_type(["name"])
+        r1 = Product(OBJ)
+        r2 = Product(dict(OBJ, _id="id2"))
+
+        assert not hasattr(r1, "__dict__")
+        with pytest.raises(AttributeError):
+            r1.name = "x"
+        assert r1[0] is r2[0]
+
+    def test_to_dict(self):
+        """dict に変換できること"""
+        Product = make_record_type(["name", "stock.count"], system_fields=False)
+        record = Product(OBJ)
+
+        assert record.to_dict() == {"_id": "id1", "ACL": OBJ["ACL"], "name": "orange", "stock.count": 10}
+        assert Product.projection == {"_id": 1, "ACL": 1, "name": 1, "stock.count": 1}
+        assert "createdAt" not in repr(record)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import time
+import pytest
+from email.utils import formatdate
+
+from necbaas.retry import RetryPolicy, RetryStats
+
+
+class TestRetryPolicy(object):
+    def test_from_config(self):
+        """設定パラメータから正常にリトライポリシーを生成できること"""
+        policy = RetryPolicy.from_config({
+            "maxRetries": 5,
+            "statuses": [503],
+            "methods": ["get", "post"],
+            "backoffFactor": 1,
+            "maxBackoff": 10,
+            "respectRetryAfter": False,
+            "budget": 20,
+            "retryOnConnectionError": False
+        })
+        assert policy.max_retries == 5
+        assert policy.statuses == frozenset([503])
+        assert policy.methods == frozenset(["GET", "POST"])
+        assert policy.backoff_factor == 1
+        assert policy.max_backoff == 10
+        assert not policy.respect_retry_after
+        assert policy.budget == 20
+        assert not policy.retry_on_connection_error
+
+    def test_from_config_unknown_key(self):
+        """不明なパラメータはエラーとなること"""
+        with pytest.raises(ValueError):
+            RetryPolicy.from_config({"maxRetry": 1})
+
+    def test_backoff(self):
+        """バックオフ時間が上限付き指数関数の範囲内であること"""
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3)
+        for _ in range(100):
+            assert 0 <= policy.get_backoff(0) <= 0.5
+            assert 0 <= policy.get_backoff(2) <= 2
+            assert 0 <= policy.get_backoff(10) <= 3
+
+    def test_retry_status(self):
+        """リトライ対象ステータス・メソッドのみリトライすること"""
+        policy = RetryPolicy()
+        assert policy.get_retry_delay("GET", 0, 0, status=503) is not None
+        assert policy.get_retry_delay("delete", 0, 0, status=429) is not None
+        assert policy.get_retry_delay("GET", 0, 0, status=500) is None
+        assert policy.get_retry_delay("POST", 0, 0, status=503) is None
+        assert policy.get_retry_delay("GET", 0, 0, error=True) is not None
+        assert policy.get_retry_delay("POST", 0, 0, error=True) is None
+
+    def test_max_retries(self):
+        """最大リトライ回数を超えたらリトライしないこと"""
+        policy = RetryPolicy(max_retries=2)
+        assert policy.get_retry_delay("GET", 1, 0, status=503) is not None
+        assert policy.get_retry_delay("GET", 2, 0, status=503) is None
+
+    def test_retry_after(self):
+        """Retry-After ヘッダが使用されること"""
+        policy = RetryPolicy()
+        assert policy.get_retry_delay("GET", 0, 0, status=503, retry_after="7") == 7
+
+        date = formatdate(time.time() + 100, usegmt=True)
+        assert 90 < policy.get_retry_delay("GET", 0, 0, status=503, retry_after=date) <= 100
+
+        # 不正値はバックオフ
+        assert policy.get_retry_delay("GET", 0, 0, status=503, retry_after="xxx") <= 0.5
+
+        policy = RetryPolicy(respect_retry_after=False)
+        assert policy.get_retry_delay("GET", 0, 0, status=503, retry_after="7") <= 0.5
+
+    def test_budget(self):
+        """リトライバジェットを超える場合はリトライしないこと"""
+        policy = RetryPolicy(budget=10)
+        assert policy.get_retry_delay("GET", 0, 0, status=503, retry_after="10") == 10
+        assert policy.get_retry_delay("GET", 0, 0, status=503, retry_after="11") is None
+        assert policy.get_retry_delay("GET", 1, 5, status=503, retry_after="6") is None
+
+
+class TestRetryStats(object):
+    def test_record(self):
+        """正常に統計情報が記録されること"""
+        stats = RetryStats()
+        stats.record(0, True)
+        stats.record(2, True)
+        stats.record(3, False)
+        stats.record(0, False)
+        assert stats.to_dict() == {"requests": 4, "retries": 5, "retriedRequests": 2, "exhausted": 1}
+
+        stats.reset()
+        assert stats.to_dict() == {"requests": 0, "retries": 0, "retriedRequests": 0, "exhausted": 0}
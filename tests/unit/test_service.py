@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from mock import patch, mock_open
+from mock import MagicMock, patch, mock_open
 import pytest
 import json
 import yaml
@@ -7,6 +7,8 @@ import time
 import sys
 import os
 import io
+import requests
+from requests import Response
 
 import necbaas as baas
 
@@ -196,6 +198,19 @@ class TestService(object):
         kwargs = mock.call_args[1]
         assert kwargs["url"] == "http://ホスト名/api/1/tenant1/a/b/c"
 
+    @patch("necbaas.Service._do_request")
+    def test_execute_rest_jp_unicode_path(self, mock):
+        """日本語 baseUrl と unicode パス(バケット名)で REST API を呼び出せること"""
+        param = self.get_sample_param()
+        param["baseUrl"] = u"http://ホスト名/api"
+        service = baas.Service(param)
+
+        mock.return_value = MagicMock(content=b'{"results": []}')
+        assert baas.ObjectBucket(service, u"bucket1").query() == []
+
+        kwargs = mock.call_args[1]
+        assert kwargs["url"] == "http://ホスト名/api/1/tenant1/objects/bucket1"
+
     @patch("necbaas.Service._do_request")
     def test_execute_rest_with_headers(self, mock):
         """ヘッダ付きで正常に REST API を呼び出せること"""
@@ -238,6 +253,210 @@ class TestService(object):
         headers = kwargs["headers"]
         assert headers["Content-Type"] == "application/octet-stream"
 
+    @patch("requests.Session.request", autospec=True)
+    def test_connection_pool_reuse(self, mock):
+        """同一 Service ではコネクションプールが再利用されること"""
+        mock.return_value.status_code = 200
+        service = baas.Service(self.get_sample_param())
+
+        service.execute_rest("GET", "a/b/c")
+        service.execute_rest("POST", "a/b/c", json={"a": 1})
+
+        sessions = [c[0][0] for c in mock.call_args_list]
+        assert len(sessions) == 2
+        assert sessions[0] is sessions[1]
+        assert mock.call_args_list[1][0][1] == "POST"
+
+    def test_connection_pool_config(self):
+        """コネクションプール設定が反映されること"""
+        param = self.get_sample_param()
+        param["connectionPool"] = {"poolConnections": 2, "poolMaxsize": 50, "idleTimeout": 30}
+        service = baas.Service(param)
+
+        transport = service._get_transport()
+        assert transport.idle_timeout == 30
+
+        adapter = transport.get_session().get_adapter("https://localhost/")
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 50
+
+    def test_connection_pool_idle_timeout(self):
+        """アイドルタイムアウト経過後はセッションが再生成されること"""
+        param = self.get_sample_param()
+        param["connectionPool"] = {"idleTimeout": 10}
+        service = baas.Service(param)
+        transport = service._get_transport()
+
+        with patch("time.time") as mock_time:
+            mock_time.return_value = 1000
+            session1 = transport.get_session()
+            mock_time.return_value = 1005
+            assert transport.get_session() is session1
+            mock_time.return_value = 1016
+            assert transport.get_session() is not session1
+
+    def test_connection_pool_shared(self):
+        """shared 指定時はコネクションプールが共有されること"""
+        param = self.get_sample_param()
+        param["connectionPool"] = {"shared": True}
+        service1 = baas.Service(param)
+        service2 = baas.Service(dict(param))
+        service3 = baas.Service(self.get_sample_param())
+
+        assert service1._get_transport() is service2._get_transport()
+        assert service1._get_transport() is not service3._get_transport()
+        session = service2._get_transport().get_session()
+
+        # 共有プールは close されない
+        service1.close()
+        assert service2._get_transport().get_session() is session
+
+    def test_request_template(self):
+        """リクエストテンプレートがキャッシュされ、設定変更時に再生成されること"""
+        service = baas.Service(self.get_sample_param())
+
+        args = service._build_request_args("a")
+        template = service._template
+        assert template is not None
+        assert "X-Session-Token" not in args["headers"]
+        assert "verify" not in args
+
+        service._build_request_args("b")
+        assert service._template is template
+
+        # セッショントークン変更
+        service.session_token = "token1"
+        assert service._template is None
+        args = service._build_request_args("a")
+        assert args["headers"]["X-Session-Token"] == "token1"
+
+        # サーバ証明書検証
+        service.verify_server_cert = False
+        args = service._build_request_args("a")
+        assert args["verify"] is False
+
+        # タイムアウト
+        baas.Service.set_default_timeout(5)
+        try:
+            args = service._build_request_args("a")
+            assert args["timeout"] == 5
+        finally:
+            baas.Service.set_default_timeout(None)
+        assert "timeout" not in service._build_request_args("a")
+
+        # パラメータ変更
+        param = self.get_sample_param()
+        param["tenantId"] = "tenant2"
+        param["proxy"] = {"http": "proxy.example.com:8080"}
+        service.param = param
+        args = service._build_request_args("a")
+        assert args["url"] == "http://localhost/api/1/tenant2/a"
+        assert args["proxies"] == {"http": "proxy.example.com:8080"}
+
+    def test_request_template_not_modified(self):
+        """リクエストごとの引数がテンプレートを変更しないこと"""
+        service = baas.Service(self.get_sample_param())
+
+        args = service._build_request_args("a", query={"q": 1}, data=b"x", headers={"X-ACL": "{}"}, stream=True)
+        assert args["headers"]["Content-Type"] == "application/octet-stream"
+        assert args["headers"]["X-ACL"] == "{}"
+
+        args = service._build_request_args("a")
+        assert set(args.keys()) == {"url", "headers"}
+        assert set(args["headers"].keys()) == {"X-Application-Id", "X-Application-Key"}
+
+    def _mock_response(self, status, headers=None):
+        res = Response()
+        res.status_code = status
+        res.headers.update(headers or {})
+        res._content = b"{}"
+        res.raw = io.BytesIO(b"{}")
+        return res
+
+    @patch("time.sleep")
+    @patch("requests.Session.request")
+    def test_retry(self, mock, mock_sleep):
+        """リトライ対象エラー時にリトライされること"""
+        param = self.get_sample_param()
+        param["retry"] = {"maxRetries": 3, "backoffFactor": 0.1}
+        service = baas.Service(param)
+
+        mock.side_effect = [
+            self._mock_response(503),
+            requests.ConnectionError("reset"),
+            self._mock_response(429, {"Retry-After": "2"}),
+            self._mock_response(200)
+        ]
+        res = service.execute_rest("GET", "a/b/c")
+        assert res.status_code == 200
+        assert mock.call_count == 4
+
+        delays = [c[0][0] for c in mock_sleep.call_args_list]
+        assert delays[0] <= 0.1
+        assert delays[1] <= 0.2
+        assert delays[2] == 2
+        assert service.retry_stats.to_dict() == {"requests": 1, "retries": 3, "retriedRequests": 1, "exhausted": 0}
+
+    @patch("time.sleep")
+    @patch("requests.Session.request")
+    def test_retry_exhausted(self, mock, mock_sleep):
+        """リトライ回数超過時は例外が raise されること"""
+        param = self.get_sample_param()
+        param["retry"] = {"maxRetries": 2}
+        service = baas.Service(param)
+
+        mock.return_value = self._mock_response(503)
+        with pytest.raises(requests.HTTPError):
+            service.execute_rest("DELETE", "a/b/c")
+        assert mock.call_count == 3
+        assert service.retry_stats.exhausted == 1
+
+    @patch("time.sleep")
+    @patch("requests.Session.request")
+    def test_retry_not_idempotent(self, mock, mock_sleep):
+        """POST はデフォルトでリトライされないこと"""
+        param = self.get_sample_param()
+        param["retry"] = {}
+        service = baas.Service(param)
+
+        mock.return_value = self._mock_response(503)
+        with pytest.raises(requests.HTTPError):
+            service.execute_rest("POST", "a/b/c", json={})
+        assert mock.call_count == 1
+        mock_sleep.assert_not_called()
+
+    @patch("time.sleep")
+    @patch("requests.Session.request")
+    def test_retry_rewind_body(self, mock, mock_sleep):
+        """リトライ時にファイルボディが巻き戻されること"""
+        param = self.get_sample_param()
+        param["retry"] = {}
+        service = baas.Service(param)
+
+        positions = []
+
+        def request(method, url, **kwargs):
+            positions.append(kwargs["data"].tell())
+            kwargs["data"].read()
+            return self._mock_response(503 if len(positions) == 1 else 200)
+
+        mock.side_effect = request
+        data = io.BytesIO(b"0123456789")
+        data.seek(2)
+        service.execute_rest("PUT", "a/b/c", data=data)
+        assert positions == [2, 2]
+
+    @patch("requests.Session.request")
+    def test_no_retry(self, mock):
+        """リトライポリシー未設定時はリトライされないこと"""
+        service = baas.Service(self.get_sample_param())
+        assert service.retry_policy is None
+
+        mock.return_value = self._mock_response(503)
+        with pytest.raises(requests.HTTPError):
+            service.execute_rest("GET", "a/b/c")
+        assert mock.call_count == 1
+
     def test_execute_rest_invalid_method(self):
         """不正なメソッドはエラーとなること"""
         service = baas.Service(self.get_sample_param())
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import pytest
+import requests
+
+import necbaas as baas
+from necbaas.testing import FakeBaasServer, match_query, aggregate_documents, project_document
+
+
+class TestFakeBaasServer(object):
+    def setup_method(self, method):
+        self.server = FakeBaasServer()
+        self.service = self.server.create_service()
+
+    def insert_sample(self, bucket):
+        for i in range(10):
+            bucket.insert({"n": i, "tag": "even" if i % 2 == 0 else "odd", "nested": {"v": i * 10}})
+
+    def test_insert_query(self):
+        """INSERT したデータをクエリできること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        res = bucket.insert({"a": 1})
+        assert res["a"] == 1
+        assert "_id" in res
+        assert "etag" in res
+
+        results = bucket.query()
+        assert results == [res]
+
+    def test_query_conditions(self):
+        """where/order/skip/limit/projection/count が処理されること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        self.insert_sample(bucket)
+
+        results, count = bucket.query_with_count(where={"tag": "even", "n": {"$gte": 4}}, order="-n", skip=1,
+                                                 limit=1, projection={"n": 1})
+        assert count == 3
+        assert len(results) == 1
+        assert results[0]["n"] == 6
+        assert set(results[0].keys()) == {"_id", "n"}
+
+        results = bucket.query(where={"nested.v": {"$in": [10, 30]}})
+        assert [r["n"] for r in results] == [1, 3]
+
+    def test_long_query(self):
+        """ロングクエリが処理されること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        self.insert_sample(bucket)
+
+        results = bucket.query(where={"$or": [{"n": 1}, {"tag": "x" * 1500}]})
+        assert [r["n"] for r in results] == [1]
+
+    def test_update_remove(self):
+        """更新・削除できること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        obj = bucket.insert({"a": 1, "b": 2})
+
+        updated = bucket.update(obj["_id"], {"$set": {"a": 10}}, etag=obj["etag"])
+        assert updated["a"] == 10
+        assert updated["b"] == 2
+        assert updated["etag"] != obj["etag"]
+
+        with pytest.raises(requests.HTTPError) as e:
+            bucket.update(obj["_id"], {"a": 20}, etag=obj["etag"])
+        assert e.value.response.status_code == 409
+
+        bucket.remove(obj["_id"], soft_delete=True)
+        assert bucket.query() == []
+        assert len(bucket.query(delete_mark=True)) == 1
+
+        self.insert_sample(bucket)
+        assert bucket.remove_with_query({"tag": "odd"}) == {"deletedObjects": 5}
+        assert len(bucket.query()) == 5
+
+    def test_batch(self):
+        """batch が処理されること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        obj = bucket.insert({"a": 1})
+
+        results = bucket.batch([
+            {"op": "insert", "data": {"a": 2}},
+            {"op": "update", "_id": obj["_id"], "data": {"a": 3}, "etag": "bad"},
+            {"op": "delete", "_id": "unknown"}
+        ])
+        assert [r["result"] for r in results] == ["ok", "conflict", "notFound"]
+
+    def test_aggregate(self):
+        """aggregate が処理されること"""
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        self.insert_sample(bucket)
+
+        results = bucket.aggregate([
+            {"$match": {"n": {"$lt": 6}}},
+            {"$group": {"_id": "$tag", "total": {"$sum": "$n"}}},
+            {"$sort": {"_id": 1}}
+        ])
+        assert results == [{"_id": "even", "total": 6}, {"_id": "odd", "total": 9}]
+
+    def test_file(self):
+        """ファイルのアップロード・ダウンロードができること"""
+        bucket = baas.FileBucket(self.service, "bucket1")
+        meta = bucket.create("file1", b"TEST DATA", content_type="text/plain")
+        assert meta["length"] == 9
+
+        with pytest.raises(requests.HTTPError):
+            bucket.create("file1", b"TEST DATA", content_type="text/plain")
+
+        r = bucket.download("file1")
+        assert r.content == b"TEST DATA"
+        assert r.headers["Content-Type"] == "text/plain"
+
+        assert [m["filename"] for m in bucket.query()] == ["file1"]
+        bucket.remove("file1")
+        assert bucket.query() == []
+
+    def test_user_login(self):
+        """ユーザ登録・ログイン・ログアウトできること"""
+        user = baas.User(self.service)
+        user.username = "user1"
+        user.password = "pass1"
+        res = user.register()
+        assert "password" not in res
+
+        with pytest.raises(requests.HTTPError) as e:
+            baas.User.login(self.service, username="user1", password="bad")
+        assert e.value.response.status_code == 401
+
+        baas.User.login(self.service, username="user1", password="pass1")
+        assert self.service.session_token is not None
+        assert baas.User.get(self.service, "current")["_id"] == res["_id"]
+        baas.User.logout(self.service)
+
+    def test_group_bucket(self):
+        """グループ・バケットを操作できること"""
+        group = baas.Group(self.service, "group1")
+        group.upsert(users=["u1"])
+        group.add_members(users=["u2"])
+        assert group.get()["users"] == ["u1", "u2"]
+
+        buckets = baas.Buckets(self.service, "object")
+        buckets.upsert("bucket2", desc="test")
+        assert buckets.get("bucket2")["description"] == "test"
+        assert [b["name"] for b in buckets.query()] == ["bucket2"]
+
+    def test_no_auto_create(self):
+        """auto_create_buckets=False の場合、未作成バケットは 404 となること"""
+        self.server.auto_create_buckets = False
+        bucket = baas.ObjectBucket(self.service, "bucket1")
+        with pytest.raises(requests.HTTPError) as e:
+            bucket.insert({"a": 1})
+        assert e.value.response.status_code == 404
+
+    def test_fault(self):
+        """エラー注入でリトライされること"""
+        service = self.server.create_service(param={"retry": {"backoffFactor": 0}})
+        self.server.add_fault("GET", r"^objects/", 503, count=2)
+
+        bucket = baas.ObjectBucket(service, "bucket1")
+        bucket.query()
+        assert service.retry_stats.retries == 2
+
+    def test_tenant(self):
+        """テナント毎にデータが分離されること"""
+        baas.ObjectBucket(self.service, "bucket1").insert({"a": 1})
+        other = self.server.create_service(tenant_id="tenant2")
+        assert baas.ObjectBucket(other, "bucket1").query() == []
+
+    def test_serve(self):
+        """HTTP サーバとして動作すること"""
+        with self.server.serve() as http_server:
+            service = baas.Service(self.server.get_param(http_server.base_url))
+            bucket = baas.ObjectBucket(service, "bucket1")
+            bucket.insert({"a": 1})
+            bucket.insert({"a": 2})
+            assert [r["a"] for r in bucket.query(order="-a")] == [2, 1]
+            service.close()
+
+
+class TestQueryEngine(object):
+    def test_match_query(self):
+        """クエリ条件が評価されること"""
+        doc = {"a": 1, "b": "hello", "c": [1, 2, 3], "d": {"e": None}}
+        assert match_query(doc, {"a": 1})
+        assert match_query(doc, {"c": 2})
+        assert match_query(doc, {"b": {"$regex": "^HE", "$options": "i"}})
+        assert match_query(doc, {"x": {"$exists": False}})
+        assert match_query(doc, {"$or": [{"a": 2}, {"d.e": None}]})
+        assert match_query(doc, {"a": {"$not": {"$gt": 1}}})
+        assert not match_query(doc, {"a": {"$gt": "0"}})
+        assert not match_query(doc, {"c": {"$nin": [3]}})
+
+    def test_project_document(self):
+        """射影が処理されること"""
+        doc = {"_id": "1", "a": 1, "b": {"c": 2, "d": 3}}
+        assert project_document(doc, {"b.c": 1}) == {"_id": "1", "b": {"c": 2}}
+        assert project_document(doc, {"b.c": 0, "_id": 0}) == {"a": 1, "b": {"d": 3}}
+
+    def test_aggregate_count(self):
+        """$count が処理されること"""
+        assert aggregate_documents([{"a": 1}, {"a": 2}], [{"$count": "total"}]) == [{"total": 2}]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import pytest
+from requests import HTTPError, Response
+
+import necbaas as baas
+from necbaas.transport import LocalTransport, make_response
+
+
+class TestLocalTransport(object):
+    def get_service(self, transport):
+        return baas.Service({
+            "baseUrl": "http://localhost/api",
+            "tenantId": "tenant1",
+            "appId": "app1",
+            "appKey": "key1"
+        }, transport=transport)
+
+    def test_route(self):
+        """ルートに一致したハンドラが呼び出されること"""
+        transport = LocalTransport()
+        transport.record = True
+        transport.add_route("GET", r"/objects/(\w+)$",
+                            lambda req: (200, {"results": [{"bucket": req.match.group(1), "query": req.query}]}))
+        service = self.get_service(transport)
+
+        bucket = baas.ObjectBucket(service, "bucket1")
+        results = bucket.query(where={"a": 1}, limit=10)
+        assert results == [{"bucket": "bucket1", "query": {"where": '{"a": 1}', "limit": "10"}}]
+
+        req = transport.requests[0]
+        assert req.method == "GET"
+        assert req.path == "/api/1/tenant1/objects/bucket1"
+        assert req.headers["X-Application-Id"] == "app1"
+        assert req.body is None
+
+    def test_request_body(self):
+        """リクエストボディがハンドラに渡されること"""
+        bodies = []
+
+        def handler(req):
+            bodies.append((req.headers.get("Content-Type"), req.body))
+            return 201, {"_id": "id1"}
+
+        transport = LocalTransport(handler)
+        service = self.get_service(transport)
+
+        assert baas.ObjectBucket(service, "bucket1").insert({"a": 1}) == {"_id": "id1"}
+        baas.FileBucket(service, "bucket1").create("file1", io.BytesIO(b"DATA"), content_type="text/plain")
+
+        assert bodies[0][0] == "application/json"
+        assert json.loads(bodies[0][1].decode("utf-8")) == {"a": 1}
+        assert bodies[1] == ("text/plain", b"DATA")
+
+    def test_not_found(self):
+        """ハンドラがない場合は 404 となること"""
+        service = self.get_service(LocalTransport())
+
+        with pytest.raises(HTTPError) as e:
+            service.execute_rest("GET", "/objects/bucket1")
+        assert e.value.response.status_code == 404
+
+    def test_response(self):
+        """Response を返すハンドラが使用できること"""
+        transport = LocalTransport(lambda req: make_response(200, b"BINARY", {"Content-Type": "image/png"}))
+        service = self.get_service(transport)
+
+        res = baas.FileBucket(service, "bucket1").download("file1", stream=True)
+        assert isinstance(res, Response)
+        assert res.headers["Content-Type"] == "image/png"
+        assert b"".join(res.iter_content(2)) == b"BINARY"
+
+    def test_make_response(self):
+        """正常に Response を生成できること"""
+        res = make_response(200, {"a": 1})
+        assert res.json() == {"a": 1}
+        assert res.headers["Content-Type"] == "application/json"
+
+        res = make_response(204)
+        assert res.content == b""
+
+        res = make_response(409, u"エラー")
+        assert res.text == u"エラー"
+        assert res.reason == "Conflict"
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
+import json as json_lib
 from mock import MagicMock
+import necbaas as baas
+from necbaas.codec import JsonCodec
+from necbaas.testing import FakeBaasServer
 
 
 def mock_service_json_resp(json):
@@ -14,12 +18,37 @@ def mock_service_json_resp(json):
     """
     response = MagicMock()
     response.json.return_value = json
+    response.content = json_lib.dumps(json).encode("utf-8")
 
     service = MagicMock()
     service.execute_rest.return_value = response
+    service.json_codec = JsonCodec()
+    service.write_coalescing = None
+    service.query_cache = None
     return service
 
 
+def create_fake_bucket(objects=None, param=None, bucket_name="bucket1"):
+    """
+    FakeBaasServer 上の ObjectBucket を返す。オブジェクト登録後のリクエストを記録する。
+
+    Args:
+        objects: 登録するオブジェクトのリスト (optional)
+        param: サービスパラメータ (optional)
+        bucket_name: バケット名 (optional)
+
+    Returns:
+        (server, service, bucket)
+    """
+    server = FakeBaasServer()
+    service = server.create_service(param=param)
+    bucket = baas.ObjectBucket(service, bucket_name)
+    if objects:
+        bucket.batch([{"op": "insert", "data": data} for data in objects])
+    service.transport.record = True
+    return server, service, bucket
+
+
 def mock_service_resp(response):
     """
     Service mock を返す。応答をセットする。
@@ -32,6 +61,9 @@ def mock_service_resp(response):
     """
     service = MagicMock()
     service.execute_rest.return_value = response
+    service.json_codec = JsonCodec()
+    service.write_coalescing = None
+    service.query_cache = None
     return service
 
 